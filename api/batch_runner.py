@@ -0,0 +1,78 @@
+"""
+Bounded-concurrency fan-out for batches of independent provider calls.
+"""
+
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+DEFAULT_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "4"))
+
+# One entry per input item, in input order.
+# value is the function's return value, error is the exception (or None).
+BatchResult = namedtuple("BatchResult", ["index", "item", "value", "error", "elapsed"])
+
+
+def run_batch(func, items, max_workers=None, timeout=None, poll_interval=0.5):
+    """
+    Run func(item) for every item on a bounded thread pool.
+
+    Results come back in input order regardless of completion order. A failing
+    or timed-out item is reported in its own BatchResult and never aborts the
+    rest of the batch.
+
+    :param func: Callable invoked once per item
+    :param items: Iterable of inputs
+    :param max_workers: Maximum number of concurrent calls (default: BATCH_MAX_WORKERS)
+    :param timeout: Per-item timeout in seconds, measured from when the item starts running
+    :param poll_interval: How often to check running items against their timeout
+    :return: List of BatchResult, one per item, in input order
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    max_workers = max(1, min(max_workers or DEFAULT_MAX_WORKERS, len(items)))
+    started = {}
+    results = [None] * len(items)
+
+    def call(index, item):
+        started[index] = time.monotonic()
+        return func(item)
+
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {pool.submit(call, i, item): i for i, item in enumerate(items)}
+        pending = set(futures)
+
+        while pending:
+            done, pending = wait(
+                pending,
+                timeout=poll_interval if timeout else None,
+                return_when=FIRST_COMPLETED,
+            )
+            now = time.monotonic()
+
+            for future in done:
+                index = futures[future]
+                elapsed = now - started.get(index, now)
+                try:
+                    results[index] = BatchResult(index, items[index], future.result(), None, elapsed)
+                except Exception as e:
+                    results[index] = BatchResult(index, items[index], None, e, elapsed)
+
+            if timeout:
+                for future in list(pending):
+                    index = futures[future]
+                    if index in started and now - started[index] > timeout:
+                        # The worker thread cannot be interrupted; we stop waiting
+                        # for it and let it finish in the background.
+                        pending.discard(future)
+                        error = TimeoutError(f"Item {index} timed out after {timeout}s")
+                        results[index] = BatchResult(index, items[index], None, error, now - started[index])
+    finally:
+        # Do not block on timed-out workers.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    return results
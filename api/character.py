@@ -1,24 +1,26 @@
 import json
 import os
-from google import genai
 from google.genai import types
 from PIL import Image
 from io import BytesIO
 from dotenv import load_dotenv
-
+from batch_runner import run_batch
+from image_cache import image_cache, write_cached_image
+from metrics import track_call, record_bytes
+from gemini_client import client, IMAGE_MODEL
 
 load_dotenv()
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-
-client = genai.Client(api_key=GEMINI_API_KEY)
-
-def generate_character_image(character_data, output_dir="character_images"):
+def generate_character_image(character_data, output_dir="character_images", bypass_cache=False):
     """
     Generate an image for a character based on their description, personality, and role.
     
+    Identical prompts are served from the on-disk image cache unless
+    bypass_cache is set.
+    
     :param character_data: Dictionary containing character information
     :param output_dir: Directory to save the generated images
+    :param bypass_cache: Always call the API and refresh the cached entry
     """
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
@@ -46,20 +48,36 @@ Lighting: Professional studio lighting that highlights the character's features.
         print(f"Generating image for {name}...")
         print(f"Prompt: {prompt}")
         
-        response = client.models.generate_content(
-            model="gemini-2.0-flash-preview-image-generation",
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                response_modalities=['TEXT', 'IMAGE']
-            )
+        config = types.GenerateContentConfig(
+            response_modalities=['TEXT', 'IMAGE']
         )
+        filename = f"{output_dir}/{name.replace(' ', '_')}.png"
+        
+        cache_key = image_cache.make_key(IMAGE_MODEL, prompt, config)
+        cached = None if bypass_cache else image_cache.get(cache_key)
+        if cached:
+            write_cached_image(*cached, filename)
+            print(f"Cache hit for {name}: {filename}")
+            return filename
+        
+        with track_call("gemini", "generate_content"):
+            response = client.models.generate_content(
+                model=IMAGE_MODEL,
+                contents=prompt,
+                config=config
+            )
 
         # Save the generated image
         for part in response.candidates[0].content.parts:
             if part.inline_data is not None:
+                record_bytes("gemini", "in", len(part.inline_data.data))
                 image = Image.open(BytesIO(part.inline_data.data))
-                filename = f"{output_dir}/{name.replace(' ', '_')}.png"
                 image.save(filename)
+                image_cache.put(cache_key, part.inline_data.data, {
+                    "model": IMAGE_MODEL,
+                    "mime_type": part.inline_data.mime_type,
+                    "character": name,
+                })
                 print(f"Saved {name}'s image to {filename}")
                 return filename
             elif part.text is not None:
@@ -72,11 +90,23 @@ Lighting: Professional studio lighting that highlights the character's features.
         print(f"Error generating image for {name}: {e}")
         return None
 
-def generate_all_character_images(json_file="/Users/chengyibo/hackathon/src/app/api/story_elements.json"):
+def generate_all_character_images(json_file="/Users/chengyibo/hackathon/src/app/api/story_elements.json",
+                                  output_dir="character_images",
+                                  max_workers=None,
+                                  timeout=None,
+                                  bypass_cache=False):
     """
     Read the story elements JSON file and generate images for all characters.
     
+    Characters are rendered concurrently on a bounded pool; a failed character
+    is reported on its own and does not stop the others.
+    
     :param json_file: Path to the story elements JSON file
+    :param output_dir: Directory to save the generated images
+    :param max_workers: Maximum number of concurrent Gemini requests
+    :param timeout: Per-character timeout in seconds (None waits indefinitely)
+    :param bypass_cache: Always call the API instead of reusing cached images
+    :return: List of generated character dictionaries, in story order
     """
     try:
         # Read the story elements JSON file
@@ -91,19 +121,36 @@ def generate_all_character_images(json_file="/Users/chengyibo/hackathon/src/app/
         
         print(f"Found {len(characters)} characters. Generating images...")
         
+        results = run_batch(
+            lambda character: generate_character_image(character, output_dir, bypass_cache),
+            characters,
+            max_workers=max_workers,
+            timeout=timeout,
+        )
+        
         generated_images = []
+        failed_characters = []
         
-        for character in characters:
-            image_path = generate_character_image(character)
-            if image_path:
+        for result in results:
+            if result.value:
                 generated_images.append({
-                    "character": character["Name"],
-                    "image_path": image_path
+                    "character": result.item["Name"],
+                    "image_path": result.value
+                })
+            else:
+                failed_characters.append({
+                    "character": result.item["Name"],
+                    "error": str(result.error) if result.error else "No image returned"
                 })
         
         print(f"\nSuccessfully generated {len(generated_images)} character images:")
         for item in generated_images:
             print(f"- {item['character']}: {item['image_path']}")
+        
+        if failed_characters:
+            print(f"\n{len(failed_characters)} character(s) failed:")
+            for item in failed_characters:
+                print(f"- {item['character']}: {item['error']}")
             
         return generated_images
         
@@ -13,6 +13,12 @@ def main():
                        help='Output directory for generated images (default: character_images)')
     parser.add_argument('--all', action='store_true',
                        help='Generate images for all characters')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Maximum number of characters to generate concurrently')
+    parser.add_argument('--timeout', type=float, default=None,
+                       help='Per-character timeout in seconds')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Bypass the image cache and always call the API')
     
     args = parser.parse_args()
     
@@ -32,7 +38,7 @@ def main():
             
             if target_character:
                 print(f"Generating image for {target_character['Name']}...")
-                image_path = generate_character_image(target_character, args.output_dir)
+                image_path = generate_character_image(target_character, args.output_dir, args.no_cache)
                 if image_path:
                     print(f"Successfully generated image: {image_path}")
                 else:
@@ -52,12 +58,14 @@ def main():
     
     elif args.all:
         # Generate images for all characters
-        generate_all_character_images(args.json_file)
+        generate_all_character_images(args.json_file, args.output_dir, args.workers, args.timeout,
+                                      args.no_cache)
     
     else:
         # Default behavior: generate all characters
         print("No specific character specified. Generating images for all characters...")
-        generate_all_character_images(args.json_file)
+        generate_all_character_images(args.json_file, args.output_dir, args.workers, args.timeout,
+                                      args.no_cache)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,124 @@
+"""
+Dialogue audio stage: synthesize every scene's dialogue lines concurrently.
+
+Lines go through the on-disk TTS cache in single_voice_line, so re-rendering a
+film whose dialogue did not change makes no text-to-speech calls at all.
+"""
+
+import argparse
+import json
+import os
+import re
+from collections import namedtuple
+from batch_runner import run_batch
+from single_voice_line import text_to_speech_file, DEFAULT_VOICE_ID
+
+DIALOGUE_TTS_WORKERS = int(os.getenv("DIALOGUE_TTS_WORKERS", "4"))
+
+# One spoken line; speaker is None when the dialogue has no "Name:" prefix
+DialogueLine = namedtuple("DialogueLine", ["scene", "index", "speaker", "text"])
+
+_SPEAKER_LINE = re.compile(r"^\s*([^:\n]{1,40}):\s*(.+)$")
+_STAGE_DIRECTION = re.compile(r"\([^)]*\)|\[[^\]]*\]")
+_EMPTY_DIALOGUE = {"", "none", "n/a", "no dialogue", "-"}
+
+
+def extract_dialogue_lines(story_data):
+    """
+    Split every scene's Dialogue into speakable lines.
+
+    Handles "Name: line" entries separated by newlines, plain strings and lists
+    of strings. Stage directions in brackets or parentheses are dropped.
+
+    :param story_data: Story dictionary with Scenes
+    :return: List of DialogueLine in scene order
+    """
+    lines = []
+    for scene in story_data.get("Scenes", []):
+        dialogue = scene.get("Dialogue") or ""
+        entries = dialogue if isinstance(dialogue, list) else str(dialogue).splitlines()
+
+        index = 0
+        for entry in entries:
+            entry = str(entry).strip()
+            if entry.lower().strip(" .") in _EMPTY_DIALOGUE:
+                continue
+
+            match = _SPEAKER_LINE.match(entry)
+            speaker, text = (match.group(1).strip(), match.group(2)) if match else (None, entry)
+            text = _STAGE_DIRECTION.sub("", text).strip().strip('"').strip()
+            if not text:
+                continue
+
+            lines.append(DialogueLine(scene["Scene"], index, speaker, text))
+            index += 1
+    return lines
+
+
+def generate_dialogue_audio(story_data, voices=None, default_voice=DEFAULT_VOICE_ID,
+                            max_workers=DIALOGUE_TTS_WORKERS, timeout=None, bypass_cache=False):
+    """
+    Synthesize all dialogue lines of a story on a bounded thread pool.
+
+    :param story_data: Story dictionary with Scenes
+    :param voices: Optional mapping of speaker name to ElevenLabs voice id
+    :param default_voice: Voice for speakers not in voices
+    :param max_workers: Maximum concurrent text-to-speech calls
+    :param timeout: Per-line timeout in seconds
+    :param bypass_cache: Always call the API
+    :return: Dictionary mapping scene number to its audio file paths in line order
+    """
+    voices = voices or {}
+    lines = extract_dialogue_lines(story_data)
+    if not lines:
+        print("🔇 No dialogue to synthesize")
+        return {}
+
+    print(f"🎙️ Synthesizing {len(lines)} dialogue lines with up to {max_workers} workers...")
+
+    def synthesize(line):
+        voice_id = voices.get(line.speaker, default_voice)
+        return text_to_speech_file(line.text, voice_id=voice_id, bypass_cache=bypass_cache)
+
+    results = run_batch(synthesize, lines, max_workers=max_workers, timeout=timeout)
+
+    audio = {}
+    failed = 0
+    for result in results:
+        line = result.item
+        if result.error is not None:
+            failed += 1
+            print(f"❌ Scene {line.scene} line {line.index + 1} failed: {result.error}")
+            continue
+        audio.setdefault(line.scene, []).append(result.value)
+
+    print(f"✅ Dialogue audio ready: {len(lines) - failed}/{len(lines)} lines")
+    return audio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthesize the dialogue of a story JSON file.")
+    parser.add_argument("story", help="Path to the story_elements.json file")
+    parser.add_argument("--voices", help="JSON file mapping speaker names to voice ids")
+    parser.add_argument("--output", default="dialogue_audio.json", help="Where to write the scene -> audio paths map")
+    parser.add_argument("--workers", type=int, default=DIALOGUE_TTS_WORKERS)
+    parser.add_argument("--timeout", type=float)
+    parser.add_argument("--no-cache", action="store_true", help="Always call the text-to-speech API")
+    args = parser.parse_args()
+
+    with open(args.story, "r", encoding="utf-8") as f:
+        story_data = json.load(f)
+    voices = None
+    if args.voices:
+        with open(args.voices, "r", encoding="utf-8") as f:
+            voices = json.load(f)
+
+    audio = generate_dialogue_audio(story_data, voices, max_workers=args.workers,
+                                    timeout=args.timeout, bypass_cache=args.no_cache)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(audio, f, indent=2)
+    print(f"💾 Saved audio map to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""
+Process-wide Gemini client shared by the character and scene image generators.
+"""
+
+import os
+from google import genai
+from google.genai import types
+from dotenv import load_dotenv
+
+load_dotenv()
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# Point at a local stand-in server (scripts/provider-stubs.py) for benchmarks
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
+
+IMAGE_MODEL = "gemini-2.0-flash-preview-image-generation"
+
+# One client (and one HTTP connection pool) per process, however many
+# services are mounted in it
+client = genai.Client(
+    api_key=GEMINI_API_KEY,
+    http_options=types.HttpOptions(base_url=GEMINI_BASE_URL) if GEMINI_BASE_URL else None,
+)
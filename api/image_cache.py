@@ -0,0 +1,193 @@
+"""
+Content-addressed on-disk cache for Gemini image generations.
+
+Entries are keyed on a SHA-256 of the model name, the full prompt contents
+(text and reference-image bytes) and the generation config, so a byte-identical
+request is served from disk instead of calling the API again.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from io import BytesIO
+
+from PIL import Image
+
+from metrics import record_cache
+
+DEFAULT_CACHE_DIR = os.getenv(
+    "GEMINI_IMAGE_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".cache", "gemini_images"),
+)
+DEFAULT_MAX_BYTES = int(os.getenv("GEMINI_IMAGE_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+
+def _update_hash(digest, value):
+    """Feed a prompt content part into the digest in a type-tagged way."""
+    if value is None:
+        digest.update(b"none:")
+    elif isinstance(value, str):
+        digest.update(b"text:")
+        digest.update(value.encode("utf-8"))
+    elif isinstance(value, (bytes, bytearray)):
+        digest.update(b"bytes:")
+        digest.update(value)
+    elif isinstance(value, Image.Image):
+        digest.update(f"image:{value.mode}:{value.size}:".encode("utf-8"))
+        digest.update(value.tobytes())
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"list:{len(value)}:".encode("utf-8"))
+        for item in value:
+            _update_hash(digest, item)
+    elif getattr(value, "inline_data", None) is not None:
+        # google.genai types.Part carrying image bytes
+        digest.update(f"blob:{value.inline_data.mime_type}:".encode("utf-8"))
+        digest.update(value.inline_data.data)
+    elif getattr(value, "text", None) is not None:
+        digest.update(b"text:")
+        digest.update(value.text.encode("utf-8"))
+    elif hasattr(value, "model_dump_json"):
+        # pydantic models such as types.GenerateContentConfig
+        digest.update(b"model:")
+        digest.update(value.model_dump_json(exclude_none=True).encode("utf-8"))
+    else:
+        digest.update(b"repr:")
+        digest.update(repr(value).encode("utf-8"))
+    digest.update(b"\x00")
+
+
+class ImageCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Initializes the ImageCache.
+
+        :param cache_dir: Directory holding cached image bytes and metadata.
+        :param max_bytes: Size cap for the cache; least recently used entries are evicted beyond it.
+        """
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model, contents, config=None):
+        """
+        Build the cache key for a generate_content call.
+
+        :param model: Model name
+        :param contents: Prompt contents (string or list of text/image parts)
+        :param config: Generation config
+        :return: Hex SHA-256 digest
+        """
+        digest = hashlib.sha256()
+        _update_hash(digest, model)
+        _update_hash(digest, contents)
+        _update_hash(digest, config)
+        return digest.hexdigest()
+
+    def _paths(self, key):
+        return (
+            os.path.join(self.cache_dir, f"{key}.bin"),
+            os.path.join(self.cache_dir, f"{key}.json"),
+        )
+
+    def get(self, key):
+        """
+        Look up a cached generation.
+
+        :param key: Cache key from make_key
+        :return: Tuple of (image bytes, metadata dict) or None on a miss
+        """
+        data_path, meta_path = self._paths(key)
+        try:
+            with open(data_path, "rb") as f:
+                data = f.read()
+            with open(meta_path, "r", encoding="utf-8") as f:
+                metadata = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            record_cache("gemini_images", False)
+            return None
+
+        record_cache("gemini_images", True)
+        # Bump the access time used for LRU eviction
+        now = time.time()
+        try:
+            os.utime(data_path, (now, now))
+        except OSError:
+            pass
+        return data, metadata
+
+    def put(self, key, data, metadata=None):
+        """
+        Store image bytes and metadata, then enforce the size cap.
+
+        :param key: Cache key from make_key
+        :param data: Image bytes returned by the model
+        :param metadata: JSON-serialisable metadata to store alongside the bytes
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        data_path, meta_path = self._paths(key)
+        metadata = dict(metadata or {}, key=key, size=len(data), cached_at=time.time())
+
+        # Write to temp files and rename so readers never see partial entries
+        for path, payload in ((meta_path, json.dumps(metadata).encode("utf-8")), (data_path, data)):
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits under max_bytes."""
+        with self._lock:
+            try:
+                names = os.listdir(self.cache_dir)
+            except FileNotFoundError:
+                return
+
+            entries = []
+            total = 0
+            for name in names:
+                if not name.endswith(".bin"):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name[:-4]))
+                total += stat.st_size
+
+            entries.sort()
+            for _, size, key in entries:
+                if total <= self.max_bytes:
+                    break
+                for path in self._paths(key):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                total -= size
+
+
+def write_cached_image(data, metadata, filename):
+    """
+    Write cached image bytes to filename as PNG.
+
+    PNG payloads are copied verbatim; anything else is converted with Pillow.
+
+    :param data: Image bytes from the cache
+    :param metadata: Metadata stored with the entry
+    :param filename: Destination path
+    """
+    if (metadata or {}).get("mime_type") == "image/png":
+        with open(filename, "wb") as f:
+            f.write(data)
+    else:
+        Image.open(BytesIO(data)).save(filename)
+
+
+image_cache = ImageCache()
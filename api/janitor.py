@@ -0,0 +1,301 @@
+"""
+Disk janitor: keeps caches, stored assets and scratch directories within quotas.
+
+Each Quota names a directory with an optional size cap and maximum age. A sweep
+removes entries that were not used for longer than the age limit, then evicts
+the least recently used entries until the directory fits its size cap. Paths
+pinned by running jobs, and anything touched within a short grace period, are
+never removed.
+
+The services start one background janitor per process with start_janitor().
+"""
+
+import fnmatch
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from metrics import janitor_reclaimed_bytes, janitor_removed, janitor_usage_bytes, janitor_sweep_duration
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(ROOT_DIR, ".cache")
+
+JANITOR_ENABLED = os.getenv("JANITOR_ENABLED", "1") not in ("0", "false", "no")
+JANITOR_INTERVAL = float(os.getenv("JANITOR_INTERVAL", "600"))
+# Entries modified this recently may still be written to
+JANITOR_GRACE = float(os.getenv("JANITOR_GRACE", "300"))
+
+MB = 1024 * 1024
+HOUR = 3600
+
+_pins = Counter()
+_pins_lock = threading.Lock()
+
+
+def _normalize(path):
+    return os.path.realpath(os.path.abspath(path))
+
+
+@contextmanager
+def pinned(*paths):
+    """
+    Keep files or directories (and everything below them) from being removed while the block runs.
+
+    :param paths: Paths in use; None entries are ignored
+    """
+    paths = [_normalize(path) for path in paths if path]
+    with _pins_lock:
+        _pins.update(paths)
+    try:
+        yield
+    finally:
+        with _pins_lock:
+            _pins.subtract(paths)
+            for path in paths:
+                if _pins[path] <= 0:
+                    del _pins[path]
+
+
+def is_pinned(path):
+    """True if path, one of its parents, or something inside it is pinned"""
+    path = _normalize(path)
+    with _pins_lock:
+        pins = list(_pins)
+    return any(
+        path == pin or path.startswith(pin + os.sep) or pin.startswith(path + os.sep)
+        for pin in pins
+    )
+
+
+class Quota:
+    def __init__(self, name, path, max_bytes=None, max_age=None, patterns=("*",), exclude=(),
+                 entries=False):
+        """
+        Initializes the Quota.
+
+        :param name: Label used in metrics and logs, also the prefix of its environment overrides
+        :param path: Directory to manage
+        :param max_bytes: Size cap for the directory, None for no cap
+        :param max_age: Seconds since last use after which entries are removed, None to keep them
+        :param patterns: Glob patterns of the names to manage
+        :param exclude: Glob patterns of names to leave alone
+        :param entries: Treat each top-level entry (file or directory) as one unit instead of
+            every file below the directory; used for scratch dirs and per-render work dirs
+        """
+        self.name = name
+        self.path = os.path.abspath(path)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.patterns = tuple(patterns)
+        self.exclude = tuple(exclude)
+        self.entries = entries
+
+    @classmethod
+    def from_env(cls, name, path, max_mb=None, max_age_hours=None, **kwargs):
+        """
+        Build a quota whose limits can be overridden with JANITOR_<NAME>_MAX_MB and
+        JANITOR_<NAME>_MAX_AGE_HOURS (0 disables a limit).
+        """
+        prefix = f"JANITOR_{name.upper()}_"
+        max_mb = float(os.getenv(prefix + "MAX_MB", max_mb or 0))
+        max_age_hours = float(os.getenv(prefix + "MAX_AGE_HOURS", max_age_hours or 0))
+        return cls(name, path, max_bytes=int(max_mb * MB) or None,
+                   max_age=max_age_hours * HOUR or None, **kwargs)
+
+    def _matches(self, name):
+        return (any(fnmatch.fnmatch(name, pattern) for pattern in self.patterns)
+                and not any(fnmatch.fnmatch(name, pattern) for pattern in self.exclude))
+
+    def units(self):
+        """
+        List the removable units of the directory.
+
+        :return: List of (path, size in bytes, last use timestamp)
+        """
+        units = []
+        if not os.path.isdir(self.path):
+            return units
+
+        if self.entries:
+            for entry in os.scandir(self.path):
+                if self._matches(entry.name):
+                    units.append((entry.path,) + _usage(entry.path))
+            return units
+
+        for directory, _, files in os.walk(self.path):
+            for name in files:
+                if self._matches(name):
+                    path = os.path.join(directory, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    units.append((path, stat.st_size, max(stat.st_atime, stat.st_mtime)))
+        return units
+
+
+def _usage(path):
+    """Size and last use of a file or a whole directory tree"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return 0, 0.0
+    if not os.path.isdir(path):
+        return stat.st_size, max(stat.st_atime, stat.st_mtime)
+
+    size, last_used = 0, stat.st_mtime
+    for directory, _, files in os.walk(path):
+        for name in files:
+            try:
+                stat = os.stat(os.path.join(directory, name))
+            except OSError:
+                continue
+            size += stat.st_size
+            last_used = max(last_used, stat.st_atime, stat.st_mtime)
+    return size, last_used
+
+
+def _remove(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    else:
+        os.remove(path)
+
+
+def default_quotas(asset_root=None):
+    """
+    Quotas for everything the services write to disk.
+
+    :param asset_root: Root of the filesystem asset storage, if that backend is used
+    """
+    quotas = [
+        Quota.from_env("clips", os.getenv("VIDEO_CLIP_CACHE_DIR", os.path.join(CACHE_DIR, "clips")),
+                       max_mb=10240, max_age_hours=14 * 24),
+        Quota.from_env("segments", os.getenv("VIDEO_SEGMENT_CACHE_DIR", os.path.join(CACHE_DIR, "segments")),
+                       max_mb=10240, max_age_hours=14 * 24),
+        Quota.from_env("tts", os.getenv("TTS_CACHE_DIR", os.path.join(CACHE_DIR, "tts")),
+                       max_mb=1024, max_age_hours=30 * 24),
+        Quota.from_env("renders", os.getenv("RENDERS_DIR", os.path.join(ROOT_DIR, "renders")),
+                       max_mb=10240, max_age_hours=7 * 24, exclude=("upload_manifest.json",), entries=True),
+        # Only a size cap, and the checked-in sample keyframe is never touched
+        Quota.from_env("scene_images", os.path.join(ROOT_DIR, "scene_images"), max_mb=1024,
+                       exclude=("scene_01.png",)),
+        # Scratch files of compilations and transitions that did not clean up after themselves
+        Quota.from_env("temp", tempfile.gettempdir(), max_mb=5120, max_age_hours=6, entries=True,
+                       patterns=("directorai-*", "compiled_*.mp4", "transition_*.mp4", "transition-*")),
+    ]
+    if asset_root:
+        quotas.append(Quota.from_env("assets", asset_root, max_mb=20480, max_age_hours=30 * 24))
+    return quotas
+
+
+class Janitor:
+    def __init__(self, quotas, interval=JANITOR_INTERVAL, grace=JANITOR_GRACE):
+        """
+        Initializes the Janitor.
+
+        :param quotas: List of Quota to enforce
+        :param interval: Seconds between background sweeps
+        :param grace: Entries used within this many seconds are never removed
+        """
+        self.quotas = list(quotas)
+        self.interval = interval
+        self.grace = grace
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sweep(self):
+        """
+        Enforce every quota once.
+
+        :return: Dictionary mapping quota name to bytes reclaimed
+        """
+        return {quota.name: self.sweep_quota(quota) for quota in self.quotas}
+
+    def sweep_quota(self, quota):
+        started = time.perf_counter()
+        now = time.time()
+        reclaimed = 0
+        units = quota.units()
+        total = sum(size for _, size, _ in units)
+
+        # Oldest first, so size eviction is least recently used
+        evictable = []
+        for path, size, last_used in sorted(units, key=lambda unit: unit[2]):
+            idle = now - last_used
+            if idle < self.grace or is_pinned(path):
+                continue
+            if quota.max_age and idle > quota.max_age and self._evict(quota, path, size, "age"):
+                reclaimed += size
+                total -= size
+                continue
+            evictable.append((path, size))
+
+        if quota.max_bytes and total > quota.max_bytes:
+            for path, size in evictable:
+                if total <= quota.max_bytes:
+                    break
+                if self._evict(quota, path, size, "size"):
+                    reclaimed += size
+                    total -= size
+
+        janitor_usage_bytes.labels(quota.name).set(total)
+        janitor_sweep_duration.labels(quota.name).observe(time.perf_counter() - started)
+        if reclaimed:
+            print(f"🧹 {quota.name}: reclaimed {reclaimed / MB:.1f} MB, {total / MB:.1f} MB in use")
+        return reclaimed
+
+    @staticmethod
+    def _evict(quota, path, size, reason):
+        try:
+            _remove(path)
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            print(f"⚠️ Could not remove {path}: {e}")
+            return False
+        janitor_removed.labels(quota.name, reason).inc()
+        janitor_reclaimed_bytes.labels(quota.name, reason).inc(size)
+        return True
+
+    def start(self):
+        """Sweep in a background daemon thread until stop() is called"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="janitor", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"❌ Janitor sweep failed: {e}")
+            self._stop.wait(self.interval)
+
+
+_janitor = None
+_janitor_lock = threading.Lock()
+
+
+def start_janitor(asset_root=None):
+    """
+    Start this process's background janitor (once) unless JANITOR_ENABLED is off.
+
+    :param asset_root: Root of the filesystem asset storage, if that backend is used
+    :return: The Janitor, or None when disabled
+    """
+    global _janitor
+    if not JANITOR_ENABLED:
+        return None
+    with _janitor_lock:
+        if _janitor is None:
+            _janitor = Janitor(default_quotas(asset_root)).start()
+        return _janitor
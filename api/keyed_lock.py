@@ -0,0 +1,42 @@
+"""
+Per-key locks for work that must not run twice at once for the same input,
+such as downloading one clip or encoding one segment.
+
+A key's lock only exists while some thread holds or waits for it, so the
+table does not grow with every URL or cache key a long-running service sees.
+"""
+
+import threading
+from contextlib import contextmanager
+
+
+class KeyedLock:
+    def __init__(self):
+        """
+        Initializes the KeyedLock.
+        """
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> [lock, number of holders and waiters]
+
+    @contextmanager
+    def hold(self, key):
+        """
+        Hold the lock for key while the block runs.
+
+        :param key: Hashable identifying the work
+        """
+        with self._lock:
+            entry = self._entries.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._entries[key]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
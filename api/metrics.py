@@ -0,0 +1,351 @@
+"""
+Lightweight Prometheus metrics shared by the services.
+
+Metrics live in process memory and are exposed in the Prometheus text format
+at /metrics by instrument_app(). Each process reports only its own values, so
+every process needs its own scrape target (Prometheus sums them across
+targets); component/serve.py runs each service as a single gunicorn worker for
+this reason.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def labels(self, *values, **kwargs):
+        """Return the child metric for a set of label values"""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        values = tuple(str(value) for value in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        with self._lock:
+            child = self._values.get(values)
+            if child is None:
+                child = self._values[values] = self._new_child()
+            return child
+
+    def _children(self):
+        with self._lock:
+            return list(self._values.items())
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for values, child in sorted(self._children()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set(self, value):
+        with self._lock:
+            self.value = value
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"]
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self._callbacks = []
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def add_callback(self, callback):
+        """
+        Register a callable returning {label values tuple: value}, evaluated at scrape time.
+
+        Used for values owned by other objects, such as job counts.
+        """
+        self._callbacks.append(callback)
+
+    def render(self):
+        for callback in self._callbacks:
+            try:
+                for values, value in callback().items():
+                    self.labels(*values).set(value)
+            except Exception:
+                pass
+        return super().render()
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            if index < len(self.counts):
+                self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def _render_child(self, values, child):
+        with child._lock:
+            counts, total, count = list(child.counts), child.sum, child.count
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.labelnames, values, f'le="{_format_value(float(bound))}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, values, 'le="+Inf"')
+        lines.append(f"{self.name}_bucket{labels} {count}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Inbound HTTP
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Time spent handling HTTP requests",
+    ["service", "method", "route", "status"],
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled", ["service"],
+)
+http_request_bytes = Counter(
+    "http_request_bytes_total", "Bytes received in HTTP request bodies", ["service", "route"],
+)
+http_response_bytes = Counter(
+    "http_response_bytes_total", "Bytes sent in HTTP response bodies (streamed bodies excluded)", ["service", "route"],
+)
+
+# Outbound provider calls
+provider_call_duration = Histogram(
+    "provider_call_duration_seconds", "Duration of calls to external providers",
+    ["provider", "operation", "status"],
+)
+provider_bytes = Counter(
+    "provider_bytes_total", "Payload bytes exchanged with external providers",
+    ["provider", "direction"],
+)
+
+# Render pipeline
+pipeline_stage_duration = Histogram(
+    "pipeline_stage_duration_seconds", "Time spent in each render pipeline stage",
+    ["stage", "status"],
+)
+
+# Caches and jobs
+cache_requests = Counter(
+    "cache_requests_total", "Cache lookups by result", ["cache", "result"],
+)
+jobs = Gauge(
+    "jobs", "Background jobs by status", ["manager", "status"],
+)
+
+# Disk janitor
+janitor_reclaimed_bytes = Counter(
+    "janitor_reclaimed_bytes_total", "Bytes freed by the disk janitor", ["quota", "reason"],
+)
+janitor_removed = Counter(
+    "janitor_removed_total", "Files or directories removed by the disk janitor", ["quota", "reason"],
+)
+janitor_usage_bytes = Gauge(
+    "janitor_usage_bytes", "Bytes in use under each janitor quota after the last sweep", ["quota"],
+)
+janitor_sweep_duration = Histogram(
+    "janitor_sweep_duration_seconds", "Time spent sweeping each janitor quota", ["quota"],
+)
+
+
+class _Call:
+    def __init__(self):
+        self.status = "ok"
+
+
+@contextmanager
+def track_call(provider, operation):
+    """
+    Time an outbound provider call.
+
+    The status label is "ok", "error" when the block raises, or whatever the
+    block assigns to the yielded object's status (e.g. an HTTP status code).
+
+    :param provider: Provider name, e.g. "gemini" or "luma"
+    :param operation: Operation name, e.g. "generate_content"
+    """
+    call = _Call()
+    started = time.perf_counter()
+    try:
+        yield call
+    except BaseException:
+        call.status = "error"
+        raise
+    finally:
+        provider_call_duration.labels(provider, operation, call.status).observe(time.perf_counter() - started)
+
+
+def record_bytes(provider, direction, size):
+    """
+    Count payload bytes sent to ("out") or received from ("in") a provider.
+    """
+    if size:
+        provider_bytes.labels(provider, direction).inc(size)
+
+
+def record_cache(cache, hit):
+    """Count a cache lookup as a hit or a miss"""
+    cache_requests.labels(cache, "hit" if hit else "miss").inc()
+
+
+def register_job_manager(manager, name):
+    """
+    Report a JobManager's job counts per status in the jobs gauge.
+
+    :param manager: Object with a counts() method returning {status: count}
+    :param name: Value of the manager label
+    """
+    def collect():
+        counts = {"queued": 0, "running": 0, "completed": 0, "failed": 0}
+        counts.update(manager.counts())
+        return {(name, status): count for status, count in counts.items()}
+
+    jobs.add_callback(collect)
+
+
+def instrument_app(app, service):
+    """
+    Record request metrics for a Flask app and expose them at /metrics.
+
+    :param app: Flask application
+    :param service: Value of the service label, e.g. "writer"
+    """
+    from flask import Response, g, request
+
+    def route():
+        return request.url_rule.rule if request.url_rule else "unmatched"
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_started = time.perf_counter()
+        http_requests_in_flight.labels(service).inc()
+        if request.content_length:
+            http_request_bytes.labels(service, route()).inc(request.content_length)
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop("_metrics_started", None)
+        if started is not None:
+            http_request_duration.labels(service, request.method, route(), response.status_code).observe(
+                time.perf_counter() - started
+            )
+            http_requests_in_flight.labels(service).dec()
+        if not response.is_streamed and response.content_length:
+            http_response_bytes.labels(service, route()).inc(response.content_length)
+        return response
+
+    @app.teardown_request
+    def _release_in_flight(error=None):
+        # after_request does not run when a view raises
+        if g.pop("_metrics_started", None) is not None:
+            http_requests_in_flight.labels(service).dec()
+
+    def metrics_endpoint():
+        return Response(REGISTRY.render(), mimetype=None, content_type=CONTENT_TYPE)
+
+    app.add_url_rule("/metrics", "metrics", metrics_endpoint, methods=["GET"])
+    return app
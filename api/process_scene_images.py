@@ -1,34 +1,55 @@
 """
-Script to resize scene images to 16:9 aspect ratio and upload to Cloudinary.
+Script to resize scene images to 16:9 aspect ratio and upload them to asset storage
+(Cloudinary by default; see storage.py).
 """
 
 import os
 import json
-import cloudinary
-import cloudinary.uploader
-from PIL import Image
+import argparse
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from PIL import Image, ImageOps
 from dotenv import load_dotenv
 from datetime import datetime
+from storage import get_storage, absolute_url, content_key
+from metrics import track_call, record_bytes, record_cache
 
 # Load environment variables
 load_dotenv()
 
-# Configure Cloudinary
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET")
-)
+# Scene keyframes must be reachable by Luma, so they default to Cloudinary. When set,
+# this wins over ASSET_STORAGE_BACKEND; filesystem storage also needs ASSET_PUBLIC_URL.
+SCENE_STORAGE_BACKEND = os.getenv("SCENE_STORAGE_BACKEND")
 
-def resize_to_16_9(image_path, output_dir="resized_scenes"):
+TARGET_SIZE = (1920, 1080)  # Full HD 16:9
+RESIZE_MODES = ("crop", "letterbox", "stretch")
+OUTPUT_FORMATS = {
+    "png": ("PNG", ".png"),
+    "jpeg": ("JPEG", ".jpg"),
+    "jpg": ("JPEG", ".jpg"),
+    "webp": ("WEBP", ".webp"),
+}
+
+def resize_to_16_9(image_path, output_dir="resized_scenes", mode="crop", output_format="png",
+                   quality=90, size=TARGET_SIZE):
     """
     Resize an image to 16:9 aspect ratio while maintaining quality.
     
     :param image_path: Path to the input image
     :param output_dir: Directory to save resized images
+    :param mode: "crop" (fill and center-crop), "letterbox" (fit and pad) or "stretch"
+    :param output_format: "png", "jpeg" or "webp"
+    :param quality: Quality for JPEG and WebP output (ignored for lossless PNG)
+    :param size: Target (width, height)
     :return: Path to the resized image
     """
     try:
+        if mode not in RESIZE_MODES:
+            raise ValueError(f"Unknown resize mode: {mode}")
+        pil_format, extension = OUTPUT_FORMATS[output_format.lower()]
+        
         # Create output directory if it doesn't exist
         os.makedirs(output_dir, exist_ok=True)
         
@@ -38,22 +59,41 @@ def resize_to_16_9(image_path, output_dir="resized_scenes"):
             original_width, original_height = img.size
             print(f"📏 Original size: {original_width}x{original_height}")
             
-            # Calculate target dimensions for 16:9 aspect ratio
-            # Common 16:9 resolutions: 1920x1080, 1280x720, 854x480
-            target_width = 1920  # Full HD width
-            target_height = int(target_width * 9 / 16)  # 1080 for 16:9
+            target_width, target_height = size
+            
+            # Let JPEG decode at reduced scale when the source is much larger
+            img.draft("RGB", size)
+            
+            # Cheap integer downscale first, keeping enough pixels for LANCZOS to finish
+            factor = min(img.width // target_width, img.height // target_height)
+            if factor >= 2:
+                img = img.reduce(factor)
+            
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+            if pil_format == "JPEG" and img.mode != "RGB":
+                img = img.convert("RGB")
             
-            # Resize image to 16:9 aspect ratio
-            resized_img = img.resize((target_width, target_height), Image.Resampling.LANCZOS)
+            if mode == "crop":
+                resized_img = ImageOps.fit(img, size, Image.Resampling.LANCZOS)
+            elif mode == "letterbox":
+                resized_img = ImageOps.pad(img, size, Image.Resampling.LANCZOS, color="black")
+            else:
+                resized_img = img.resize(size, Image.Resampling.LANCZOS)
             
             # Generate output filename
-            filename = os.path.basename(image_path)
+            filename = os.path.splitext(os.path.basename(image_path))[0] + extension
             output_path = os.path.join(output_dir, filename)
             
             # Save resized image
-            resized_img.save(output_path, "PNG", quality=95)
+            if pil_format == "PNG":
+                resized_img.save(output_path, "PNG", compress_level=6)
+            elif pil_format == "JPEG":
+                resized_img.save(output_path, "JPEG", quality=quality, optimize=True, progressive=True)
+            else:
+                resized_img.save(output_path, "WEBP", quality=quality, method=4)
             
-            print(f"✅ Resized to: {target_width}x{target_height} (16:9)")
+            print(f"✅ Resized to: {target_width}x{target_height} (16:9, {mode})")
             print(f"💾 Saved to: {output_path}")
             
             return output_path
@@ -62,51 +102,187 @@ def resize_to_16_9(image_path, output_dir="resized_scenes"):
         print(f"❌ Error resizing {image_path}: {e}")
         return None
 
-def upload_to_cloudinary(image_path):
+def _resize_task(args):
+    image_path, output_dir, options = args
+    return resize_to_16_9(image_path, output_dir, **options)
+
+def resize_scene_images(image_paths, output_dir="resized_scenes", workers=None, **options):
+    """
+    Resize many images in parallel across CPU cores.
+    
+    :param image_paths: List of input image paths
+    :param output_dir: Directory to save resized images
+    :param workers: Number of worker processes (default: number of CPUs)
+    :param options: Extra arguments for resize_to_16_9 (mode, output_format, quality, size)
+    :return: List of resized paths (None for failures), in input order
+    """
+    if not image_paths:
+        return []
+    
+    workers = max(1, min(workers or os.cpu_count() or 1, len(image_paths)))
+    tasks = [(path, output_dir, options) for path in image_paths]
+    
+    if workers == 1:
+        return [_resize_task(task) for task in tasks]
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_resize_task, tasks))
+
+def file_sha256(path):
+    """Return the hex SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class UploadManifest:
+    """
+    Persistent JSON map from image content hash to its uploaded URL.
+
+    Lets repeated runs skip uploads for images whose bytes have not changed.
+    """
+
+    def __init__(self, path="upload_manifest.json"):
+        """
+        Initializes the UploadManifest.
+
+        :param path: JSON file holding the manifest
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get("entries", {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+
+    def get(self, content_hash):
+        with self._lock:
+            return self.entries.get(content_hash)
+
+    def record(self, content_hash, url, source, key=None):
+        """Store an uploaded URL and persist the manifest"""
+        with self._lock:
+            self.entries[content_hash] = {
+                "url": url,
+                "key": key,
+                "source": os.path.basename(source),
+                "uploaded_at": datetime.now().isoformat(),
+            }
+            self._save()
+
+    def _save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({"entries": self.entries}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+def upload_scene_image(image_path, manifest=None, storage=None):
     """
-    Upload an image to Cloudinary and return the URL.
+    Upload an image to asset storage and return the URL.
+    
+    The storage key is a hash of the image bytes, so an unchanged image is
+    never stored twice and an edited one never overwrites an asset that an
+    earlier render still points to. With a manifest, unchanged images are
+    skipped without contacting the storage backend at all.
     
     :param image_path: Path to the image file
-    :return: Cloudinary URL or None if failed
+    :param manifest: Optional UploadManifest used to skip unchanged images
+    :param storage: Storage backend (default: SCENE_STORAGE_BACKEND, then ASSET_STORAGE_BACKEND, then Cloudinary)
+    :return: Absolute public URL or None if failed
     """
     try:
         if not os.path.exists(image_path):
             print(f"❌ File not found: {image_path}")
             return None
         
-        print(f"☁️ Uploading {os.path.basename(image_path)} to Cloudinary...")
+        content_hash = file_sha256(image_path)
+        extension = os.path.splitext(image_path)[1]
+        storage = storage or get_storage(backend=SCENE_STORAGE_BACKEND, default="cloudinary")
+        if manifest is not None:
+            entry = manifest.get(content_hash)
+            # The janitor may have evicted the stored copy since it was recorded
+            if entry and not storage.exists(entry.get("key") or content_key(content_hash, "scene_images", extension)):
+                print(f"♻️ Stored copy of {os.path.basename(image_path)} is gone, uploading again")
+                entry = None
+            record_cache("upload_manifest", bool(entry))
+            if entry:
+                print(f"⏭️ Unchanged, skipping upload of {os.path.basename(image_path)}: {entry['url']}")
+                return entry["url"]
         
-        # Upload to Cloudinary
-        upload_result = cloudinary.uploader.upload(
-            image_path,
-            folder="scene_images",  # Organize in a folder
-            public_id=f"scene_{os.path.basename(image_path).split('.')[0]}",  # Custom public ID
-            overwrite=True
-        )
+        if storage.name == "filesystem" and not absolute_url(storage.base_url):
+            print("❌ Filesystem storage only gives relative URLs, which Luma cannot fetch; "
+                  "set ASSET_PUBLIC_URL or SCENE_STORAGE_BACKEND=cloudinary")
+            return None
+        print(f"☁️ Uploading {os.path.basename(image_path)} to {storage.name} storage...")
         
-        # Get the secure URL
-        cdn_url = upload_result.get('secure_url')
+        with track_call(storage.name, "upload"):
+            asset = storage.put(image_path, prefix="scene_images", extension=extension)
+        record_bytes(storage.name, "out", asset.size)
         
-        if cdn_url:
-            print(f"✅ Upload successful: {cdn_url}")
-            return cdn_url
+        url = absolute_url(asset.url) if asset.url else None
+        if url:
+            print(f"✅ Upload successful: {url}")
+            if manifest is not None:
+                manifest.record(content_hash, url, image_path, asset.key)
+            return url
         else:
-            print("❌ No URL returned from Cloudinary")
+            print("❌ No URL returned from storage")
             return None
             
     except Exception as e:
-        print(f"❌ Error uploading to Cloudinary: {e}")
+        print(f"❌ Error uploading {image_path}: {e}")
         return None
 
+# Kept for existing callers
+upload_to_cloudinary = upload_scene_image
+
+def upload_scene_images(image_paths, manifest=None, workers=8):
+    """
+    Upload many images concurrently, skipping the ones already in the manifest.
+    
+    :param image_paths: List of image paths (None entries are passed through)
+    :param manifest: Optional UploadManifest used to skip unchanged images
+    :param workers: Maximum number of concurrent uploads
+    :return: List of URLs (None for failures), in input order
+    """
+    if not image_paths:
+        return []
+    
+    def upload(path):
+        return upload_scene_image(path, manifest) if path else None
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(image_paths)))) as pool:
+        return list(pool.map(upload, image_paths))
+
 def process_all_scene_images(scene_images_dir="scene_images", 
                            resized_dir="resized_scenes",
-                           output_json="scene_urls.json"):
+                           output_json="scene_urls.json",
+                           mode="crop",
+                           output_format="png",
+                           quality=90,
+                           workers=None,
+                           manifest_path="upload_manifest.json",
+                           upload_workers=8):
     """
-    Process all scene images: resize to 16:9 and upload to Cloudinary.
+    Process all scene images: resize to 16:9 and upload to asset storage.
+    
+    All images are resized first, in parallel across CPU cores, then uploaded
+    concurrently. Images whose bytes match an entry in the upload manifest are
+    not uploaded again.
     
     :param scene_images_dir: Directory containing original scene images
     :param resized_dir: Directory to save resized images
     :param output_json: JSON file to store URLs
+    :param mode: Resize mode: "crop", "letterbox" or "stretch"
+    :param output_format: Output format: "png", "jpeg" or "webp"
+    :param quality: Quality for JPEG and WebP output
+    :param workers: Number of resize worker processes (default: number of CPUs)
+    :param manifest_path: JSON manifest mapping image hashes to uploaded URLs
+    :param upload_workers: Maximum number of concurrent uploads
     """
     
     # Check if scene images directory exists
@@ -124,24 +300,29 @@ def process_all_scene_images(scene_images_dir="scene_images",
     
     print(f"🎬 Found {len(scene_files)} scene images to process")
     
+    # Step 1: Resize every scene to 16:9 in parallel
+    scene_files = sorted(scene_files)
+    resized_paths = resize_scene_images(
+        [os.path.join(scene_images_dir, scene_file) for scene_file in scene_files],
+        resized_dir,
+        workers=workers,
+        mode=mode,
+        output_format=output_format,
+        quality=quality,
+    )
+    
+    # Step 2: Upload changed images concurrently
+    manifest = UploadManifest(manifest_path)
+    cloudinary_urls = upload_scene_images(resized_paths, manifest, upload_workers)
+    
     # Process each scene image
     processed_scenes = []
     
-    for scene_file in sorted(scene_files):
-        scene_path = os.path.join(scene_images_dir, scene_file)
+    for scene_file, resized_path, cloudinary_url in zip(scene_files, resized_paths, cloudinary_urls):
         scene_number = scene_file.split('_')[1].split('.')[0]  # Extract scene number
         
-        print(f"\n🎬 Processing Scene {scene_number}: {scene_file}")
-        print("-" * 50)
-        
-        # Step 1: Resize to 16:9
-        resized_path = resize_to_16_9(scene_path, resized_dir)
-        if not resized_path:
-            continue
-        
-        # Step 2: Upload to Cloudinary
-        cloudinary_url = upload_to_cloudinary(resized_path)
-        if not cloudinary_url:
+        if not resized_path or not cloudinary_url:
+            print(f"❌ Scene {scene_number} failed: {scene_file}")
             continue
         
         # Step 3: Store information
@@ -160,8 +341,11 @@ def process_all_scene_images(scene_images_dir="scene_images",
                 "total_scenes": len(processed_scenes),
                 "processed_at": datetime.now().isoformat(),
                 "aspect_ratio": "16:9",
-                "resolution": "1920x1080",
-                "cloudinary_folder": "scene_images"
+                "resolution": f"{TARGET_SIZE[0]}x{TARGET_SIZE[1]}",
+                "resize_mode": mode,
+                "format": output_format,
+                "storage_backend": get_storage(backend=SCENE_STORAGE_BACKEND, default="cloudinary").name,
+                "storage_prefix": "scene_images"
             },
             "scenes": processed_scenes
         }
@@ -183,8 +367,30 @@ def process_all_scene_images(scene_images_dir="scene_images",
 
 def main():
     """Main function to run the image processing pipeline."""
+    parser = argparse.ArgumentParser(description='Resize scene images to 16:9 and upload them')
+    parser.add_argument('--scene-images-dir', default='scene_images',
+                       help='Directory containing original scene images')
+    parser.add_argument('--resized-dir', default='resized_scenes',
+                       help='Directory to save resized images')
+    parser.add_argument('--mode', choices=RESIZE_MODES, default='crop',
+                       help='How to reach 16:9: crop, letterbox or stretch (default: crop)')
+    parser.add_argument('--format', dest='output_format', choices=sorted(OUTPUT_FORMATS), default='png',
+                       help='Output image format (default: png)')
+    parser.add_argument('--quality', type=int, default=90,
+                       help='Quality for JPEG/WebP output (default: 90)')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Number of resize worker processes (default: number of CPUs)')
+    parser.add_argument('--manifest', default='upload_manifest.json',
+                       help='Upload manifest used to skip unchanged images (default: upload_manifest.json)')
+    parser.add_argument('--upload-workers', type=int, default=8,
+                       help='Maximum number of concurrent uploads (default: 8)')
+    args = parser.parse_args()
+    
     # Process all scene images
-    process_all_scene_images()
+    process_all_scene_images(args.scene_images_dir, args.resized_dir,
+                             mode=args.mode, output_format=args.output_format,
+                             quality=args.quality, workers=args.workers,
+                             manifest_path=args.manifest, upload_workers=args.upload_workers)
 
 if __name__ == "__main__":
     main()
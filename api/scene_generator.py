@@ -14,6 +14,12 @@ def main():
                        help='Output directory for generated scene images')
     parser.add_argument('--all', action='store_true',
                        help='Generate images for all scenes')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Maximum number of scenes to generate concurrently')
+    parser.add_argument('--timeout', type=float, default=None,
+                       help='Per-scene timeout in seconds')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Bypass the image cache and always call the API')
     
     args = parser.parse_args()
     
@@ -40,7 +46,8 @@ def main():
                 character_images = load_character_images(characters, args.character_images_dir)
                 background = story_data.get("Background", "")
                 
-                image_path = generate_scene_image(target_scene, character_images, background, story_data, args.output_dir)
+                image_path = generate_scene_image(target_scene, character_images, background, story_data, args.output_dir,
+                                                  args.no_cache)
                 if image_path:
                     print(f"✅ Successfully generated image: {image_path}")
                 else:
@@ -56,12 +63,14 @@ def main():
     
     elif args.all:
         # Generate images for all scenes
-        generate_all_scene_images(args.json_file, args.character_images_dir, args.output_dir)
+        generate_all_scene_images(args.json_file, args.character_images_dir, args.output_dir,
+                                  args.workers, args.timeout, args.no_cache)
     
     else:
         # Default behavior: generate all scenes
         print("No specific scene specified. Generating images for all scenes...")
-        generate_all_scene_images(args.json_file, args.character_images_dir, args.output_dir)
+        generate_all_scene_images(args.json_file, args.character_images_dir, args.output_dir,
+                                  args.workers, args.timeout, args.no_cache)
 
 if __name__ == "__main__":
     main()
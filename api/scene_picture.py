@@ -1,15 +1,88 @@
 import json
 import os
-from google import genai
+import threading
+from collections import OrderedDict
 from google.genai import types
 from PIL import Image
 from io import BytesIO
 from dotenv import load_dotenv
+from batch_runner import run_batch
+from image_cache import image_cache, write_cached_image
+from metrics import track_call, record_bytes, record_cache
+from gemini_client import client, IMAGE_MODEL
 
 load_dotenv()
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-client = genai.Client(api_key=GEMINI_API_KEY)
+# Longest edge of character reference images sent to Gemini
+REFERENCE_MAX_EDGE = int(os.getenv("REFERENCE_IMAGE_MAX_EDGE", "768"))
+REFERENCE_JPEG_QUALITY = int(os.getenv("REFERENCE_IMAGE_QUALITY", "90"))
+
+class ReferenceImageCache:
+    """
+    In-memory cache of character reference images, downscaled and encoded once.
+
+    Entries are keyed by file path, modification time and target size, so an
+    updated portrait is picked up automatically while every scene and request
+    reuses the same encoded bytes.
+    """
+
+    def __init__(self, max_edge=REFERENCE_MAX_EDGE, quality=REFERENCE_JPEG_QUALITY, max_entries=64):
+        """
+        Initializes the ReferenceImageCache.
+
+        :param max_edge: Longest edge in pixels of the encoded reference
+        :param quality: JPEG quality used for images without transparency
+        :param max_entries: Number of encoded references kept in memory
+        """
+        self.max_edge = max_edge
+        self.quality = quality
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """
+        Return the encoded reference for an image file.
+
+        :param path: Path to the character image
+        :return: google.genai types.Part holding the encoded image bytes
+        """
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, self.max_edge)
+
+        with self._lock:
+            part = self._entries.get(key)
+            if part is not None:
+                self._entries.move_to_end(key)
+                record_cache("reference_images", True)
+                return part
+
+        record_cache("reference_images", False)
+        part = self._encode(path)
+
+        with self._lock:
+            self._entries[key] = part
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return part
+
+    def _encode(self, path):
+        with Image.open(path) as image:
+            image.draft("RGB", (self.max_edge, self.max_edge))
+            image.thumbnail((self.max_edge, self.max_edge), Image.Resampling.LANCZOS)
+
+            buffer = BytesIO()
+            if image.mode in ("RGBA", "LA", "P"):
+                image.save(buffer, format="PNG", optimize=True)
+                mime_type = "image/png"
+            else:
+                image.convert("RGB").save(buffer, format="JPEG", quality=self.quality)
+                mime_type = "image/jpeg"
+
+        return types.Part.from_bytes(data=buffer.getvalue(), mime_type=mime_type)
+
+reference_cache = ReferenceImageCache()
 
 def load_story_elements(json_file="/Users/chengyibo/hackathon/src/app/api/story_elements.json"):
     """
@@ -38,7 +111,7 @@ def load_character_images(characters, character_images_dir="character_images"):
     
     :param characters: List of character dictionaries
     :param character_images_dir: Directory containing character images
-    :return: Dictionary mapping character names to PIL Image objects
+    :return: Dictionary mapping character names to encoded reference image parts
     """
     character_images = {}
     
@@ -55,7 +128,8 @@ def load_character_images(characters, character_images_dir="character_images"):
         for filename in possible_filenames:
             try:
                 if os.path.exists(filename):
-                    character_images[name] = Image.open(filename)
+                    # Downscaled and encoded once, then shared by every scene request
+                    character_images[name] = reference_cache.get(filename)
                     print(f"✅ Loaded image for {name}: {filename}")
                     image_loaded = True
                     break
@@ -69,15 +143,20 @@ def load_character_images(characters, character_images_dir="character_images"):
     
     return character_images
 
-def generate_scene_image(scene_data, character_images, background_info, story_data, output_dir="scene_images"):
+def generate_scene_image(scene_data, character_images, background_info, story_data, output_dir="scene_images",
+                         bypass_cache=False):
     """
     Generate an image for the beginning of a scene based on its description and character images.
     
+    Identical requests (same prompt, config and reference images) are served
+    from the on-disk image cache unless bypass_cache is set.
+    
     :param scene_data: Dictionary containing scene information
-    :param character_images: Dictionary mapping character names to PIL Image objects
+    :param character_images: Dictionary mapping character names to reference image parts (or PIL Images)
     :param background_info: Background information from story elements
     :param story_data: Complete story data containing character information
     :param output_dir: Directory to save generated scene images
+    :param bypass_cache: Always call the API and refresh the cached entry
     :return: Path to the generated image or None if failed
     """
     # Create output directory if it doesn't exist
@@ -139,13 +218,24 @@ IMPORTANT: Reference the character images provided to maintain exact clothing co
             content_parts.append(char_image)
             content_parts.append(f"Maintain {char_name}'s exact clothing, hairstyle, and physical features from this reference image.")
         
-        response = client.models.generate_content(
-            model="gemini-2.0-flash-preview-image-generation",
-            contents=content_parts,
-            config=types.GenerateContentConfig(
-                response_modalities=['TEXT', 'IMAGE'],
-            ),
+        config = types.GenerateContentConfig(
+            response_modalities=['TEXT', 'IMAGE'],
         )
+        filename = f"{output_dir}/scene_{scene_number:02d}.png"
+        
+        cache_key = image_cache.make_key(IMAGE_MODEL, content_parts, config)
+        cached = None if bypass_cache else image_cache.get(cache_key)
+        if cached:
+            write_cached_image(*cached, filename)
+            print(f"⚡ Cache hit for Scene {scene_number}: {filename}")
+            return filename
+        
+        with track_call("gemini", "generate_content"):
+            response = client.models.generate_content(
+                model=IMAGE_MODEL,
+                contents=content_parts,
+                config=config,
+            )
 
         # Process the response
         if not response.candidates:
@@ -164,9 +254,14 @@ IMPORTANT: Reference the character images provided to maintain exact clothing co
         for part in candidate.content.parts:
             if hasattr(part, 'inline_data') and part.inline_data:
                 image_data = part.inline_data.data
+                record_bytes("gemini", "in", len(image_data))
                 image = Image.open(BytesIO(image_data))
-                filename = f"{output_dir}/scene_{scene_number:02d}.png"
                 image.save(filename)
+                image_cache.put(cache_key, image_data, {
+                    "model": IMAGE_MODEL,
+                    "mime_type": part.inline_data.mime_type,
+                    "scene": scene_number,
+                })
                 print(f"✅ Saved Scene {scene_number} image: {filename}")
                 return filename
             elif hasattr(part, 'text') and part.text:
@@ -181,13 +276,23 @@ IMPORTANT: Reference the character images provided to maintain exact clothing co
 
 def generate_all_scene_images(json_file="/Users/chengyibo/hackathon/src/app/api/story_elements.json", 
                             character_images_dir="character_images",
-                            output_dir="scene_images"):
+                            output_dir="scene_images",
+                            max_workers=None,
+                            timeout=None,
+                            bypass_cache=False):
     """
     Generate images for all scenes in the story.
     
+    Scenes are rendered concurrently on a bounded pool, so a full storyboard
+    takes roughly as long as the slowest single scene.
+    
     :param json_file: Path to the story elements JSON file
     :param character_images_dir: Directory containing character images
     :param output_dir: Directory to save generated scene images
+    :param max_workers: Maximum number of concurrent Gemini requests
+    :param timeout: Per-scene timeout in seconds (None waits indefinitely)
+    :param bypass_cache: Always call the API instead of reusing cached images
+    :return: List of generated scene dictionaries, in scene order
     """
     # Load story elements
     story_data = load_story_elements(json_file)
@@ -213,16 +318,30 @@ def generate_all_scene_images(json_file="/Users/chengyibo/hackathon/src/app/api/
     if not character_images:
         print("⚠️ No character images loaded. Scenes will be generated without character references.")
     
-    # Generate images for each scene
+    # Generate images for all scenes concurrently
+    results = run_batch(
+        lambda scene: generate_scene_image(scene, character_images, background, story_data, output_dir,
+                                           bypass_cache),
+        scenes,
+        max_workers=max_workers,
+        timeout=timeout,
+    )
+    
     generated_scenes = []
+    failed_scenes = []
     
-    for scene in scenes:
-        image_path = generate_scene_image(scene, character_images, background, story_data, output_dir)
-        if image_path:
+    for result in results:
+        scene = result.item
+        if result.value:
             generated_scenes.append({
                 "scene_number": scene["Scene"],
                 "description": scene["Description"],
-                "image_path": image_path
+                "image_path": result.value
+            })
+        else:
+            failed_scenes.append({
+                "scene_number": scene["Scene"],
+                "error": str(result.error) if result.error else "No image returned"
             })
     
     # Summary
@@ -231,6 +350,11 @@ def generate_all_scene_images(json_file="/Users/chengyibo/hackathon/src/app/api/
         print(f"   Scene {scene_info['scene_number']}: {scene_info['image_path']}")
         print(f"      Description: {scene_info['description']}")
     
+    if failed_scenes:
+        print(f"\n⚠️ {len(failed_scenes)} scene(s) failed:")
+        for scene_info in failed_scenes:
+            print(f"   Scene {scene_info['scene_number']}: {scene_info['error']}")
+    
     return generated_scenes
 
 if __name__ == "__main__":
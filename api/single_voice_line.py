@@ -1,43 +1,149 @@
-'''
-api-key: sk_70e554d8ca6374fcfeb0072b6d6db58d70b648236d4169c3
-'''
+"""
+Text-to-speech for single dialogue lines with ElevenLabs.
 
+Audio is cached on disk by a hash of everything that affects the output
+(text, voice, model, output format and voice settings), so synthesizing a
+line that was already spoken costs no API call.
+"""
+
+import hashlib
+import json
 import os
-import uuid
-from elevenlabs import VoiceSettings
-from elevenlabs.client import ElevenLabs
+import shutil
+import tempfile
+import threading
+from dotenv import load_dotenv
+from metrics import track_call, record_bytes, record_cache
+from keyed_lock import KeyedLock
+
+load_dotenv()
+
+ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
+# Point at a local stand-in server (scripts/provider-stubs.py) for benchmarks
+ELEVENLABS_BASE_URL = os.getenv("ELEVENLABS_BASE_URL")
 
-ELEVENLABS_API_KEY = "sk_51d9bd06bd03d2c949c372433af3ef4da98497c7b1699464"
-elevenlabs = ElevenLabs(
-    api_key=ELEVENLABS_API_KEY,
+DEFAULT_VOICE_ID = os.getenv("ELEVENLABS_VOICE_ID", "pNInz6obpgDQGcFmaJgB")  # Adam pre-made voice
+DEFAULT_MODEL_ID = os.getenv("ELEVENLABS_MODEL_ID", "eleven_multilingual_v2")  # use the turbo model for low latency
+DEFAULT_OUTPUT_FORMAT = "mp3_22050_32"
+DEFAULT_VOICE_SETTINGS = {
+    "stability": 1.0,
+    "similarity_boost": 1.0,
+    "style": 0.0,
+    "use_speaker_boost": True,
+    "speed": 1.0,
+}
+
+TTS_CACHE_DIR = os.getenv(
+    "TTS_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".cache", "tts"),
 )
 
-def text_to_speech_file(text: str) -> str:
-    # Calling the text_to_speech conversion API with detailed parameters
-    response = elevenlabs.text_to_speech.convert(
-        voice_id="pNInz6obpgDQGcFmaJgB", # Adam pre-made voice
-        output_format="mp3_22050_32",
-        text=text,
-        model_id="eleven_multilingual_v2", # use the turbo model for low latency
-        # Optional voice settings that allow you to customize the output
-        voice_settings=VoiceSettings(
-            stability=1.0,
-            similarity_boost=1.0,
-            style=0.0,
-            use_speaker_boost=True,
-            speed=1.0,
-        ),
+_client = None
+_client_lock = threading.Lock()
+_line_locks = KeyedLock()
+
+
+def get_client():
+    """Return the process-wide ElevenLabs client, created on first use"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from elevenlabs.client import ElevenLabs
+
+            if not ELEVENLABS_API_KEY:
+                raise EnvironmentError("Missing ELEVENLABS_API_KEY environment variable")
+            kwargs = {"base_url": ELEVENLABS_BASE_URL} if ELEVENLABS_BASE_URL else {}
+            _client = ElevenLabs(api_key=ELEVENLABS_API_KEY, **kwargs)
+        return _client
+
+
+def tts_cache_key(text, voice_id, model_id, output_format, voice_settings):
+    """
+    Build the cache key for a synthesized line.
+
+    :return: Hex SHA-256 digest
+    """
+    payload = json.dumps(
+        {
+            "text": text,
+            "voice_id": voice_id,
+            "model_id": model_id,
+            "output_format": output_format,
+            "voice_settings": voice_settings,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
     )
-    save_file_path = f"{uuid.uuid4()}.mp3"
-
-    with open(save_file_path, "wb") as f:
-        for chunk in response:
-            if chunk:
-                f.write(chunk)
-                
-    print(f"{save_file_path}: A new audio file was saved successfully!")
-    # Return the path of the saved audio file
-    return save_file_path
-
-test_txt="You should have stayed down, Edward. Now you'll die like the rest."
-text_to_speech_file(test_txt)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def text_to_speech_file(text: str, voice_id=DEFAULT_VOICE_ID, model_id=DEFAULT_MODEL_ID,
+                        output_format=DEFAULT_OUTPUT_FORMAT, voice_settings=None,
+                        output_path=None, cache_dir=TTS_CACHE_DIR, bypass_cache=False) -> str:
+    """
+    Synthesize a line of dialogue and return the path of the audio file.
+
+    Audio is streamed to a temporary file as it arrives and renamed into the
+    cache once complete, so a partial download is never mistaken for a hit.
+
+    :param text: Line to speak
+    :param voice_id: ElevenLabs voice id
+    :param model_id: ElevenLabs model id
+    :param output_format: ElevenLabs output format, e.g. mp3_22050_32
+    :param voice_settings: Voice settings dict (default: DEFAULT_VOICE_SETTINGS)
+    :param output_path: Optional path to copy the audio to; the cached file is returned otherwise
+    :param cache_dir: Directory of the audio cache
+    :param bypass_cache: Always call the API (the result still refreshes the cache)
+    :return: Path of the audio file
+    """
+    voice_settings = dict(DEFAULT_VOICE_SETTINGS, **(voice_settings or {}))
+    key = tts_cache_key(text, voice_id, model_id, output_format, voice_settings)
+    extension = output_format.split("_", 1)[0]
+    cache_path = os.path.join(cache_dir, f"{key}.{extension}")
+
+    # The same line requested twice at once is only synthesized once
+    with _line_locks.hold(key):
+        hit = not bypass_cache and os.path.isfile(cache_path)
+        record_cache("tts", hit)
+        if hit:
+            print(f"⚡ Cached audio for: {text[:40]}")
+        else:
+            _synthesize(text, voice_id, model_id, output_format, voice_settings, cache_path)
+            print(f"{cache_path}: A new audio file was saved successfully!")
+
+    if output_path:
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        shutil.copyfile(cache_path, output_path)
+        return output_path
+    return cache_path
+
+
+def _synthesize(text, voice_id, model_id, output_format, voice_settings, cache_path):
+    from elevenlabs import VoiceSettings
+
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix=".part")
+    try:
+        with track_call("elevenlabs", "text_to_speech"), os.fdopen(fd, "wb") as f:
+            # Calling the text_to_speech conversion API with detailed parameters
+            response = get_client().text_to_speech.convert(
+                voice_id=voice_id,
+                output_format=output_format,
+                text=text,
+                model_id=model_id,
+                voice_settings=VoiceSettings(**voice_settings),
+            )
+            for chunk in response:
+                if chunk:
+                    f.write(chunk)
+                    record_bytes("elevenlabs", "in", len(chunk))
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+if __name__ == "__main__":
+    test_txt = "You should have stayed down, Edward. Now you'll die like the rest."
+    print(text_to_speech_file(test_txt))
@@ -0,0 +1,327 @@
+"""
+Pluggable asset storage with content-hash keys.
+
+Backends:
+- filesystem: a local directory, served by the video service under /static
+- s3: any S3-compatible object store (requires boto3)
+- cloudinary: Cloudinary media library
+
+Select one with ASSET_STORAGE_BACKEND (or pass a name to get_storage).
+"""
+
+import hashlib
+import mimetypes
+import os
+import shutil
+import tempfile
+import threading
+from collections import namedtuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHUNK_SIZE = 1024 * 1024
+
+StoredAsset = namedtuple("StoredAsset", ["key", "url", "size", "content_type"])
+
+# Public origin of the service serving filesystem assets, e.g. https://api.example.com.
+# Needed wherever an asset URL leaves this deployment (Luma fetches keyframes itself).
+ASSET_PUBLIC_URL = os.getenv("ASSET_PUBLIC_URL", "").rstrip("/")
+
+
+def absolute_url(url, base_url=None):
+    """
+    Make a storage URL absolute.
+
+    :param url: URL returned by a backend; filesystem URLs are relative, e.g. /static/<key>
+    :param base_url: Origin to prefix relative URLs with (default: ASSET_PUBLIC_URL)
+    :return: Absolute URL, or None if url is relative and no origin is known
+    """
+    if not url.startswith("/"):
+        return url
+    base_url = (base_url or ASSET_PUBLIC_URL).rstrip("/")
+    return f"{base_url}{url}" if base_url else None
+
+
+def _spool(source):
+    """
+    Hash a source while making it readable from a local path.
+
+    :param source: File path, bytes, or binary file object
+    :return: Tuple of (local path, sha256 hex, size, is_temporary)
+    """
+    digest = hashlib.sha256()
+
+    if isinstance(source, (str, os.PathLike)):
+        size = 0
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                size += len(chunk)
+        return os.fspath(source), digest.hexdigest(), size, False
+
+    fd, tmp_path = tempfile.mkstemp(suffix=".upload")
+    size = 0
+    with os.fdopen(fd, "wb") as out:
+        if isinstance(source, (bytes, bytearray)):
+            digest.update(source)
+            out.write(source)
+            size = len(source)
+        else:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    return tmp_path, digest.hexdigest(), size, True
+
+
+def content_key(content_hash, prefix="", extension=""):
+    """Build the storage key for content with the given hash"""
+    name = f"{content_hash}{extension}"
+    return f"{prefix.strip('/')}/{name}" if prefix else name
+
+
+class Storage:
+    """Common put() logic; backends implement _store, open, url, exists and delete."""
+
+    name = "base"
+
+    def put(self, source, prefix="", extension="", content_type=None, move=False):
+        """
+        Store content under a key derived from its SHA-256.
+
+        Content is streamed in chunks and never fully loaded into memory.
+        Storing the same bytes twice is a no-op for backends that can check existence cheaply.
+
+        :param source: File path, bytes, or binary file object
+        :param prefix: Key prefix, e.g. "scenes" or "films"
+        :param extension: File extension including the dot, e.g. ".png"
+        :param content_type: MIME type (guessed from the extension when omitted)
+        :param move: For file paths, allow the backend to move the file instead of copying it
+        :return: StoredAsset
+        """
+        path, content_hash, size, is_temporary = _spool(source)
+        key = content_key(content_hash, prefix, extension)
+        content_type = content_type or mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+        try:
+            url = self._store(path, key, content_type, move=move or is_temporary)
+        finally:
+            if is_temporary and os.path.exists(path):
+                os.remove(path)
+
+        return StoredAsset(key, url, size, content_type)
+
+    def local_path(self, key):
+        """Return a local file path for the key, or None if the backend is remote"""
+        return None
+
+
+class FilesystemStorage(Storage):
+    name = "filesystem"
+
+    def __init__(self, root=None, base_url=None):
+        """
+        Initializes the FilesystemStorage.
+
+        :param root: Directory holding the assets (default: component/static)
+        :param base_url: URL prefix the directory is served under (default: /static)
+        """
+        self.root = os.path.abspath(root or os.getenv("ASSET_STORAGE_ROOT", os.path.join(ROOT_DIR, "component", "static")))
+        self.base_url = (base_url or os.getenv("ASSET_BASE_URL", "/static")).rstrip("/")
+
+    def local_path(self, key):
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def _store(self, path, key, content_type, move=False):
+        destination = self.local_path(key)
+        if not os.path.exists(destination):
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(destination), suffix=".tmp")
+            os.close(fd)
+            if move:
+                shutil.move(path, tmp_path)
+            else:
+                shutil.copyfile(path, tmp_path)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, destination)
+        return self.url(key)
+
+    def open(self, key):
+        return open(self.local_path(key), "rb")
+
+    def url(self, key):
+        return f"{self.base_url}/{key}"
+
+    def exists(self, key):
+        return os.path.isfile(self.local_path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self.local_path(key))
+        except FileNotFoundError:
+            pass
+
+
+class S3Storage(Storage):
+    name = "s3"
+
+    def __init__(self, bucket=None, prefix=None, endpoint_url=None, public_base_url=None, url_expiry=3600):
+        """
+        Initializes the S3Storage.
+
+        :param bucket: Bucket name (default: ASSET_S3_BUCKET)
+        :param prefix: Key prefix inside the bucket (default: ASSET_S3_PREFIX)
+        :param endpoint_url: Endpoint for S3-compatible stores such as MinIO or R2 (default: ASSET_S3_ENDPOINT_URL)
+        :param public_base_url: Public URL prefix for the bucket; presigned URLs are used when unset
+        :param url_expiry: Lifetime in seconds of presigned URLs
+        """
+        try:
+            import boto3
+        except ImportError as e:
+            raise ImportError("S3 storage requires boto3: pip install boto3") from e
+
+        self.bucket = bucket or os.getenv("ASSET_S3_BUCKET")
+        if not self.bucket:
+            raise EnvironmentError("Missing ASSET_S3_BUCKET environment variable")
+        self.prefix = (prefix if prefix is not None else os.getenv("ASSET_S3_PREFIX", "")).strip("/")
+        self.public_base_url = (public_base_url or os.getenv("ASSET_S3_PUBLIC_URL", "")).rstrip("/")
+        self.url_expiry = url_expiry
+        self.client = boto3.client("s3", endpoint_url=endpoint_url or os.getenv("ASSET_S3_ENDPOINT_URL"))
+
+    def _object_key(self, key):
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _store(self, path, key, content_type, move=False):
+        if not self.exists(key):
+            # upload_file streams from disk and switches to multipart for large files
+            self.client.upload_file(
+                path, self.bucket, self._object_key(key),
+                ExtraArgs={"ContentType": content_type, "CacheControl": "public, max-age=31536000, immutable"},
+            )
+        return self.url(key)
+
+    def open(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))["Body"]
+
+    def url(self, key):
+        if self.public_base_url:
+            return f"{self.public_base_url}/{self._object_key(key)}"
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self._object_key(key)},
+            ExpiresIn=self.url_expiry,
+        )
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+            return True
+        except Exception:
+            return False
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+
+class CloudinaryStorage(Storage):
+    name = "cloudinary"
+
+    def __init__(self):
+        import cloudinary
+        import cloudinary.uploader
+
+        cloudinary.config(
+            cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
+            api_key=os.getenv("CLOUDINARY_API_KEY"),
+            api_secret=os.getenv("CLOUDINARY_API_SECRET")
+        )
+        self.uploader = cloudinary.uploader
+        self._urls = {}
+
+    @staticmethod
+    def _public_id(key):
+        return os.path.splitext(key)[0]
+
+    @staticmethod
+    def _resource_type(key):
+        content_type = mimetypes.guess_type(key)[0] or ""
+        return "video" if content_type.startswith(("video/", "audio/")) else "image"
+
+    def _store(self, path, key, content_type, move=False):
+        upload_result = self.uploader.upload(
+            path,
+            public_id=self._public_id(key),
+            resource_type=self._resource_type(key),
+            overwrite=False,
+        )
+        url = upload_result.get("secure_url")
+        if not url:
+            raise RuntimeError("No URL returned from Cloudinary")
+        self._urls[key] = url
+        return url
+
+    def open(self, key):
+        import requests
+
+        response = requests.get(self.url(key), stream=True)
+        response.raise_for_status()
+        response.raw.decode_content = True
+        return response.raw
+
+    def url(self, key):
+        if key in self._urls:
+            return self._urls[key]
+        import cloudinary.utils
+
+        url, _ = cloudinary.utils.cloudinary_url(
+            self._public_id(key),
+            resource_type=self._resource_type(key),
+            format=os.path.splitext(key)[1].lstrip(".") or None,
+            secure=True,
+        )
+        return url
+
+    def exists(self, key):
+        import cloudinary.api
+
+        try:
+            cloudinary.api.resource(self._public_id(key), resource_type=self._resource_type(key))
+            return True
+        except Exception:
+            return False
+
+    def delete(self, key):
+        self.uploader.destroy(self._public_id(key), resource_type=self._resource_type(key))
+
+
+BACKENDS = {
+    "filesystem": FilesystemStorage,
+    "s3": S3Storage,
+    "cloudinary": CloudinaryStorage,
+}
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def get_storage(backend=None, default="filesystem"):
+    """
+    Return the shared storage backend instance.
+
+    :param backend: Backend name; falls back to ASSET_STORAGE_BACKEND, then default
+    :param default: Backend used when neither backend nor the environment names one
+    :return: Storage instance
+    """
+    name = (backend or os.getenv("ASSET_STORAGE_BACKEND") or default).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown storage backend: {name}")
+    with _instances_lock:
+        if name not in _instances:
+            _instances[name] = BACKENDS[name]()
+        return _instances[name]
@@ -1,11 +1,252 @@
+import heapq
+import threading
 import time
 import requests
 import os
+from concurrent.futures import Future
+from requests.adapters import HTTPAdapter
+from metrics import provider_call_duration, track_call
 
-LUMA_API_URL = 'https://api.lumalabs.ai/dream-machine/v1/generations'
+LUMA_API_URL = os.getenv('LUMA_API_URL', 'https://api.lumalabs.ai/dream-machine/v1/generations')
 LUMA_API_KEY = os.getenv("LUMA_API_KEY", "")  # Get from environment
 
-def generate_luma_video(prompt: str, image_url: str, aspect_ratio: str = '16:9') -> str:
+# Typical wall-clock time for a 5s ray-2 clip; used to schedule the first status check
+LUMA_EXPECTED_SECONDS = float(os.getenv("LUMA_EXPECTED_SECONDS", "0"))
+LUMA_TIMEOUT_SECONDS = float(os.getenv("LUMA_TIMEOUT_SECONDS", "300"))
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """
+    Return the process-wide keep-alive session used for all Luma requests.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({
+                "Authorization": f"Bearer {LUMA_API_KEY}",
+                "Accept": "application/json",
+            })
+            _session = session
+        return _session
+
+
+class LumaPoller:
+    """
+    Tracks many Luma generations from a single background thread.
+
+    Every tick collects all generations that are due, checks them together
+    (one list request when several are due, individual requests otherwise) over
+    the shared keep-alive session, and reschedules the unfinished ones with
+    adaptive backoff: fast at first, slower the longer a generation runs.
+    """
+
+    def __init__(self, session=None, min_interval=2.0, max_interval=15.0, backoff=1.5,
+                 list_threshold=3, request_timeout=30):
+        """
+        Initializes the LumaPoller.
+
+        :param session: requests.Session to use (default: the shared Luma session)
+        :param min_interval: Shortest delay between status checks of one generation
+        :param max_interval: Longest delay between status checks of one generation
+        :param backoff: Growth factor applied to the delay after each pending check
+        :param list_threshold: Number of due generations from which a single list request is used
+        :param request_timeout: HTTP timeout for status requests
+        """
+        self.session = session
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.list_threshold = list_threshold
+        self.request_timeout = request_timeout
+        self._tracked = {}
+        self._schedule = []
+        self._wakeup = threading.Condition()
+        self._thread = None
+
+    def track(self, generation_id, expected_duration=None, timeout=LUMA_TIMEOUT_SECONDS, callback=None):
+        """
+        Start tracking a generation.
+
+        :param generation_id: Luma generation id
+        :param expected_duration: Expected seconds until completion; the first check is scheduled near it
+        :param timeout: Seconds before the future fails with TimeoutError
+        :param callback: Optional callable receiving the future once it is resolved
+        :return: Future resolving to the video URL
+        """
+        future = Future()
+        if callback:
+            future.add_done_callback(callback)
+
+        now = time.monotonic()
+        first_check = self.min_interval
+        if expected_duration:
+            first_check = max(self.min_interval, expected_duration * 0.8)
+
+        with self._wakeup:
+            self._tracked[generation_id] = {
+                "future": future,
+                "attempts": 0,
+                "started": now,
+                "deadline": now + timeout,
+                "expected": expected_duration,
+            }
+            heapq.heappush(self._schedule, (now + first_check, generation_id))
+            self._ensure_thread()
+            self._wakeup.notify()
+        return future
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="luma-poller", daemon=True)
+            self._thread.start()
+
+    def _next_interval(self, state):
+        elapsed = time.monotonic() - state["started"]
+        expected = state["expected"]
+        if expected and elapsed < expected * 1.5:
+            # Around the expected finish time poll quickly to catch completion early
+            return self.min_interval
+        interval = self.min_interval * (self.backoff ** state["attempts"])
+        return min(self.max_interval, interval)
+
+    def _run(self):
+        while True:
+            with self._wakeup:
+                while True:
+                    if not self._schedule:
+                        self._wakeup.wait()
+                        continue
+                    delay = self._schedule[0][0] - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self._wakeup.wait(delay)
+
+                now = time.monotonic()
+                due = []
+                while self._schedule and self._schedule[0][0] <= now:
+                    _, generation_id = heapq.heappop(self._schedule)
+                    if generation_id in self._tracked:
+                        due.append(generation_id)
+
+            if due:
+                try:
+                    self._check(due)
+                except Exception as e:
+                    print(f"⚠️ Luma poller tick failed: {e}")
+                    self._reschedule(due)
+
+    def _check(self, generation_ids):
+        statuses = {}
+        if len(generation_ids) >= self.list_threshold:
+            statuses = self._fetch_list(len(generation_ids))
+
+        for generation_id in generation_ids:
+            if generation_id not in statuses:
+                try:
+                    statuses[generation_id] = self._fetch_one(generation_id)
+                except Exception as e:
+                    print(f"⚠️ Status check failed for {generation_id}: {e}")
+
+        for generation_id in generation_ids:
+            self._handle(generation_id, statuses.get(generation_id))
+
+    def _fetch_one(self, generation_id):
+        session = self.session or get_session()
+        with track_call("luma", "status") as call:
+            res = session.get(f"{LUMA_API_URL}/{generation_id}", timeout=self.request_timeout)
+            call.status = res.status_code
+        return res.json()
+
+    def _fetch_list(self, count):
+        # Recent generations come first, so a page sized to the number of
+        # in-flight ids usually covers all of them in one request.
+        session = self.session or get_session()
+        try:
+            with track_call("luma", "list") as call:
+                res = session.get(
+                    LUMA_API_URL,
+                    params={"limit": max(count * 2, 10), "offset": 0},
+                    timeout=self.request_timeout,
+                )
+                call.status = res.status_code
+            generations = res.json().get("generations", [])
+        except Exception as e:
+            print(f"⚠️ Batched status check failed, falling back to single checks: {e}")
+            return {}
+        return {g["id"]: g for g in generations if isinstance(g, dict) and "id" in g}
+
+    def _handle(self, generation_id, status_data):
+        with self._wakeup:
+            state = self._tracked.get(generation_id)
+        if state is None:
+            return
+
+        state["attempts"] += 1
+        status = (status_data or {}).get("state")
+        print(f"🔁 [{generation_id} #{state['attempts']}] Status: {status}")
+
+        if status == "failed":
+            reason = status_data.get("failure_reason", "Unknown reason")
+            self._resolve(generation_id, error=RuntimeError(f"Video generation failed: {reason}"))
+        elif status == "completed":
+            video_url = status_data.get("assets", {}).get("video")
+            if video_url:
+                self._resolve(generation_id, result=video_url)
+            else:
+                self._resolve(generation_id, error=RuntimeError("Video completed but no video URL found"))
+        elif time.monotonic() >= state["deadline"]:
+            self._resolve(generation_id, error=TimeoutError("Video generation timed out or returned no result"))
+        else:
+            self._reschedule([generation_id])
+
+    def _reschedule(self, generation_ids):
+        with self._wakeup:
+            now = time.monotonic()
+            for generation_id in generation_ids:
+                state = self._tracked.get(generation_id)
+                if state is not None:
+                    heapq.heappush(self._schedule, (now + self._next_interval(state), generation_id))
+            self._wakeup.notify()
+
+    def _resolve(self, generation_id, result=None, error=None):
+        with self._wakeup:
+            state = self._tracked.pop(generation_id, None)
+        if state is None:
+            return
+        # End-to-end generation time, from submission to the final status check
+        provider_call_duration.labels("luma", "generation", "error" if error is not None else "ok").observe(
+            time.monotonic() - state["started"]
+        )
+        if error is not None:
+            state["future"].set_exception(error)
+        else:
+            state["future"].set_result(result)
+
+
+_poller = None
+_poller_lock = threading.Lock()
+
+def get_poller():
+    """
+    Return the process-wide LumaPoller.
+    """
+    global _poller
+    with _poller_lock:
+        if _poller is None:
+            _poller = LumaPoller()
+        return _poller
+
+
+def submit_luma_generation(prompt: str, image_url: str, aspect_ratio: str = '16:9') -> str:
+    """
+    Start a Luma generation and return its id without waiting for the result.
+    """
     enhanced_prompt = f"Scene Description: {prompt}, filmed in cinematic style with dramatic lighting, realistic motion, shallow depth of field, and professional film quality. Emphasize dynamic camera angles and atmosphere."
 
     if not prompt or not image_url:
@@ -34,56 +275,45 @@ def generate_luma_video(prompt: str, image_url: str, aspect_ratio: str = '16:9')
         }
     }
 
-    try:
-        init_res = requests.post(
+    with track_call("luma", "create") as call:
+        init_res = get_session().post(
             LUMA_API_URL,
-            headers={
-                "Authorization": f"Bearer {LUMA_API_KEY}",
-                "Content-Type": "application/json",
-                "Accept": "application/json"
-            },
-            json=init_payload
+            headers={"Content-Type": "application/json"},
+            json=init_payload,
+            timeout=60
         )
+        call.status = init_res.status_code
 
-        init_data = init_res.json()
-        print("📨 Initial Response:", init_data)
-
-        if 'id' not in init_data:
-            raise RuntimeError(f"Luma generation failed: {init_data.get('error') or 'Unknown error'}")
-
-        generation_id = init_data['id']
-        print(f"⏳ Generation ID: {generation_id}")
+    init_data = init_res.json()
+    print("📨 Initial Response:", init_data)
 
-        # Step 2: Poll status
-        status = "pending"
-        attempts = 0
-        video_url = None
+    if 'id' not in init_data:
+        raise RuntimeError(f"Luma generation failed: {init_data.get('error') or 'Unknown error'}")
 
-        while status != "completed" and attempts < 60:
-            time.sleep(5)
-            attempts += 1
+    generation_id = init_data['id']
+    print(f"⏳ Generation ID: {generation_id}")
+    return generation_id
 
-            status_res = requests.get(
-                f"{LUMA_API_URL}/{generation_id}",
-                headers={"Authorization": f"Bearer {LUMA_API_KEY}"}
-            )
-            status_data = status_res.json()
-            status = status_data.get("state")
 
-            print(f"🔁 [{attempts}] Status: {status}")
+def generate_luma_video_async(prompt: str, image_url: str, aspect_ratio: str = '16:9',
+                              expected_duration=None, callback=None) -> Future:
+    """
+    Start a Luma generation and return a Future resolving to the video URL.
 
-            if status == "failed":
-                reason = status_data.get("failure_reason", "Unknown reason")
-                raise RuntimeError(f"Video generation failed: {reason}")
+    Status checks are handled by the shared LumaPoller instead of a sleeping thread.
+    """
+    generation_id = submit_luma_generation(prompt, image_url, aspect_ratio)
+    return get_poller().track(
+        generation_id,
+        expected_duration=expected_duration or LUMA_EXPECTED_SECONDS or None,
+        callback=callback,
+    )
 
-            if status == "completed":
-                video_url = status_data.get("assets", {}).get("video")
-                if not video_url:
-                    raise RuntimeError("Video completed but no video URL found")
-                break
 
-        if not video_url:
-            raise TimeoutError("Video generation timed out or returned no result")
+def generate_luma_video(prompt: str, image_url: str, aspect_ratio: str = '16:9') -> str:
+    try:
+        # Step 2: Wait for the shared poller to report the result
+        video_url = generate_luma_video_async(prompt, image_url, aspect_ratio).result()
 
         print(f"✅ Video URL: {video_url}")
         return video_url
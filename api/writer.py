@@ -1,8 +1,138 @@
 import sys
 import os
 import json
+import threading
 import anthropic
 from dotenv import load_dotenv
+from metrics import track_call, record_bytes
+
+# Top-level keys of the story JSON and the event type emitted for each value
+# (or, for arrays, for each element) as soon as it is complete.
+STREAM_EVENT_TYPES = {
+    "Background": "background",
+    "Characters": "character",
+    "Scenes": "scene",
+}
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_client(api_key):
+    """
+    Return the process-wide Anthropic client for an API key.
+
+    The client is thread-safe and keeps its own connection pool, so sharing it
+    avoids a new TLS handshake and pool for every request.
+
+    :param api_key: Your Anthropic API key.
+    :return: anthropic.Anthropic instance
+    """
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = anthropic.Anthropic(api_key=api_key)
+            _clients[api_key] = client
+        return client
+
+class StoryStreamParser:
+    """
+    Incremental parser for the story JSON returned by the model.
+
+    Text is fed in arbitrary chunks. Whenever a top-level value (such as
+    Background) or an object inside a top-level array (each Character or
+    Scene) is complete, it is parsed and returned as a (key, value) pair.
+    Anything before the first "{" (for example a markdown fence) is skipped.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.started = False
+        self.finished = False
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.expect_key = True
+        self.key = None
+        self.key_start = None
+        self.value_start = None
+        self.element_start = None
+
+    def feed(self, text):
+        """
+        Consume a chunk of model output.
+
+        :param text: Next piece of the streamed response
+        :return: List of (top-level key, parsed value) pairs completed by this chunk
+        """
+        self.buffer += text
+        completed = []
+
+        while self.pos < len(self.buffer) and not self.finished:
+            i = self.pos
+            c = self.buffer[i]
+            self.pos += 1
+
+            if not self.started:
+                if c == "{":
+                    self.started = True
+                    self.depth = 1
+                continue
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == "\\":
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+                    if self.depth == 1 and self.expect_key:
+                        self.key = json.loads(self.buffer[self.key_start:i + 1])
+                continue
+
+            if c.isspace():
+                continue
+
+            if self.depth == 1:
+                if self.expect_key:
+                    if c == '"':
+                        self.in_string = True
+                        self.key_start = i
+                    elif c == ":":
+                        self.expect_key = False
+                        self.value_start = None
+                    elif c == "}":
+                        self.finished = True
+                    continue
+
+                if self.value_start is None:
+                    self.value_start = i
+                elif c in ",}":
+                    # End of a scalar top-level value
+                    completed.append((self.key, json.loads(self.buffer[self.value_start:i])))
+                    self.expect_key = True
+                    self.finished = c == "}"
+                    continue
+
+            if c == '"':
+                self.in_string = True
+            elif c in "[{":
+                if self.depth == 2 and c == "{" and self.buffer[self.value_start] == "[":
+                    self.element_start = i
+                self.depth += 1
+            elif c in "]}":
+                self.depth -= 1
+                if self.depth == 2 and c == "}" and self.element_start is not None:
+                    completed.append((self.key, json.loads(self.buffer[self.element_start:i + 1])))
+                    self.element_start = None
+                elif self.depth == 1:
+                    # End of a container top-level value
+                    if c == "}":
+                        completed.append((self.key, json.loads(self.buffer[self.value_start:i + 1])))
+                    self.expect_key = True
+                    self.value_start = None
+
+        return completed
 
 class SceneGenerator:
     def __init__(
@@ -10,7 +140,8 @@ class SceneGenerator:
         api_key,
         model="claude-sonnet-4-20250514",
         max_tokens=1024,
-        temperature=0.5
+        temperature=0.5,
+        client=None
     ):
         """
         Initializes the SceneGenerator.
@@ -19,8 +150,9 @@ class SceneGenerator:
         :param model: The Claude model to use.
         :param max_tokens: Maximum number of tokens to generate.
         :param temperature: Sampling temperature (0 to 1).
+        :param client: Anthropic client to use (default: the shared client for api_key).
         """
-        self.client = anthropic.Anthropic(api_key=api_key)
+        self.client = client or get_client(api_key)
         self.model = model
         self.max_tokens = max_tokens
         self.temperature = temperature
@@ -42,6 +174,10 @@ class SceneGenerator:
             "Be very descriptive. Include camera shots (wide shot, close-up), lighting (dramatic lighting, golden hour), "
             "style (film noir, anime), and mood (ominous, serene). Determine the appropriate number of characters based on the story and keep each scenes under 5 seconds."
         )
+        # The system prompt is identical for every request; mark it for provider-side prompt caching
+        self.system = [
+            {"type": "text", "text": self.system_prompt, "cache_control": {"type": "ephemeral"}}
+        ]
 
     def generate_story_elements(self, story_text):
         """
@@ -51,21 +187,24 @@ class SceneGenerator:
         :return: A dictionary containing background, characters, and scenes.
         """
         try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=self.max_tokens,
-                temperature=self.temperature,
-                system=self.system_prompt,
-                messages=[{"role": "user", "content": story_text}]
-            )
+            with track_call("anthropic", "messages"):
+                response = self.client.messages.create(
+                    model=self.model,
+                    max_tokens=self.max_tokens,
+                    temperature=self.temperature,
+                    system=self.system,
+                    messages=[{"role": "user", "content": story_text}]
+                )
 
             print(f"Response type: {type(response)}")
             print(f"Response content: {response.content}")
+            print(f"Usage (including prompt cache reads/writes): {getattr(response, 'usage', None)}")
             
             raw_text = "".join(
                 block.text for block in response.content
                 if getattr(block, "type", None) == "text"
             ).strip()
+            record_bytes("anthropic", "in", len(raw_text.encode("utf-8")))
             
             print(f"Raw text: '{raw_text}'")
             print(f"Raw text length: {len(raw_text)}")
@@ -92,6 +231,51 @@ class SceneGenerator:
             print(f"Error type: {type(e)}")
             return {}
 
+    def stream_story_elements(self, story_text):
+        """
+        Streams the Claude response and yields story elements as soon as each one is complete.
+
+        Events are dictionaries with a "type" of "background", "character" or
+        "scene" and the parsed "data", followed by a final "complete" event
+        carrying the full story dictionary, or an "error" event.
+
+        :param story_text: The input story text.
+        :return: Generator of event dictionaries.
+        """
+        parser = StoryStreamParser()
+        story_elements = {"Background": "", "Characters": [], "Scenes": []}
+        
+        try:
+            with track_call("anthropic", "messages_stream"), self.client.messages.stream(
+                model=self.model,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                system=self.system,
+                messages=[{"role": "user", "content": story_text}]
+            ) as stream:
+                for text in stream.text_stream:
+                    record_bytes("anthropic", "in", len(text.encode("utf-8")))
+                    for key, value in parser.feed(text):
+                        event_type = STREAM_EVENT_TYPES.get(key)
+                        if event_type is None:
+                            story_elements[key] = value
+                            continue
+                        if isinstance(story_elements.get(key), list):
+                            story_elements[key].append(value)
+                        else:
+                            story_elements[key] = value
+                        yield {"type": event_type, "data": value}
+            
+            if not parser.finished:
+                print("Error: Streamed response ended before the JSON object was complete")
+                yield {"type": "error", "error": "Incomplete story JSON"}
+                return
+            
+            yield {"type": "complete", "data": story_elements}
+        except Exception as e:
+            print(f"Error in stream_story_elements: {e}")
+            yield {"type": "error", "error": str(e)}
+
     def save_to_file(self, story_elements, filename="story_elements.json"):
         """
         Saves the story elements (background, characters, scenes) to a JSON file in the current directory.
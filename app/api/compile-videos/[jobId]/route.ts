@@ -0,0 +1,30 @@
+import { type NextRequest, NextResponse } from "next/server"
+
+const VIDEO_SERVICE_URL = process.env.VIDEO_SERVICE_URL || "http://localhost:5002"
+
+/**
+ * GET /api/compile-videos/:jobId
+ * Status of the full-quality compile that follows a preview.
+ */
+export async function GET(_request: NextRequest, { params }: { params: { jobId: string } }) {
+  try {
+    const response = await fetch(`${VIDEO_SERVICE_URL}/api/compile-videos/${params.jobId}`)
+    const data = await response.json()
+
+    if (!response.ok) {
+      return NextResponse.json({ error: data.error || "Video service error" }, { status: response.status })
+    }
+
+    return NextResponse.json({
+      status: data.status,
+      compiled_video_url: data.compiled_video_url,
+      error: data.error,
+    })
+  } catch (error) {
+    console.error("Error checking compile job:", error)
+    return NextResponse.json(
+      { error: error instanceof Error ? error.message : "Failed to check compile job" },
+      { status: 500 },
+    )
+  }
+}
@@ -4,7 +4,7 @@ const VIDEO_SERVICE_URL = process.env.VIDEO_SERVICE_URL || "http://localhost:500
 
 export async function POST(request: NextRequest) {
   try {
-    const { video_urls } = await request.json()
+    const { video_urls, preview } = await request.json()
 
     if (!video_urls || !Array.isArray(video_urls) || video_urls.length === 0) {
       return NextResponse.json({ error: "An array of video URLs is required" }, { status: 400 })
@@ -19,6 +19,7 @@ export async function POST(request: NextRequest) {
       },
       body: JSON.stringify({
         video_urls: video_urls,
+        preview: Boolean(preview),
       }),
     })
 
@@ -31,8 +32,11 @@ export async function POST(request: NextRequest) {
     const compiledData = await response.json()
     console.log("✅ Video compilation successful")
 
+    // With preview=true this is the quick cut; the full-quality film is job_id's result
     return NextResponse.json({
       compiled_video_url: compiledData.compiled_video_url,
+      preview_url: compiledData.preview_url,
+      job_id: compiledData.job_id,
       success: true,
     })
   } catch (error) {
@@ -2,7 +2,7 @@ import { type NextRequest, NextResponse } from "next/server"
 
 export async function POST(request: NextRequest) {
   try {
-    const { character } = await request.json()
+    const { character, bypass_cache } = await request.json()
 
     if (!character) {
       return NextResponse.json({ error: "Character data is required" }, { status: 400 })
@@ -22,7 +22,8 @@ export async function POST(request: NextRequest) {
         headers: {
           "Content-Type": "application/json",
         },
-        body: JSON.stringify({ character }),
+        // Regenerate buttons skip the backend image cache
+        body: JSON.stringify({ character, bypass_cache: Boolean(bypass_cache) }),
         signal: controller.signal,
       })
 
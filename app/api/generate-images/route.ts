@@ -2,7 +2,7 @@ import { type NextRequest, NextResponse } from "next/server"
 
 export async function POST(request: NextRequest) {
   try {
-    const { description } = await request.json()
+    const { description, bypass_cache } = await request.json()
 
     if (!description) {
       return NextResponse.json({ error: "Description is required" }, { status: 400 })
@@ -23,7 +23,8 @@ export async function POST(request: NextRequest) {
         headers: {
           "Content-Type": "application/json",
         },
-        body: JSON.stringify({ description }),
+        // Regenerate buttons skip the backend image cache
+        body: JSON.stringify({ description, bypass_cache: Boolean(bypass_cache) }),
         signal: controller.signal,
       })
 
@@ -3,9 +3,14 @@ import { NextRequest, NextResponse } from "next/server";
 const VIDEO_SERVICE_URL =
   process.env.VIDEO_SERVICE_URL || "http://localhost:5002";
 
+const POLL_INTERVAL_MS = 3000;
+const POLL_TIMEOUT_MS = 6 * 60 * 1000;
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
 /**
  * POST /api/video
- * Proxies the request to the Flask service at 5002.
+ * Submits a video job to the Flask service at 5002 and polls it until done.
  * Body: { prompt: string, imageUrl: string, aspectRatio?: string }
  */
 export async function POST(request: NextRequest) {
@@ -37,10 +42,42 @@ export async function POST(request: NextRequest) {
     );
   }
 
-  // 4) return the JSON { success, videoUrl } from Flask
-  const data = await upstream.json();
+  // 4) poll the job until Flask reports a result
+  //    (services that answer synchronously return no job_id)
+  let job = await upstream.json();
+  const deadline = Date.now() + POLL_TIMEOUT_MS;
+
+  while (job.job_id && job.status !== "completed" && job.status !== "failed") {
+    if (Date.now() > deadline) {
+      return NextResponse.json(
+        { error: "Video generation timed out", jobId: job.job_id },
+        { status: 504 },
+      );
+    }
+    await sleep(POLL_INTERVAL_MS);
+
+    const statusRes = await fetch(`${VIDEO_SERVICE_URL}/api/video/${job.job_id}`);
+    if (!statusRes.ok) {
+      const text = await statusRes.text();
+      console.error("⚠️  Job status error:", statusRes.status, text);
+      return NextResponse.json(
+        { error: text || "Video service error" },
+        { status: statusRes.status },
+      );
+    }
+    job = await statusRes.json();
+  }
+
+  if (job.status === "failed") {
+    return NextResponse.json(
+      { error: job.error || "Video generation failed" },
+      { status: 500 },
+    );
+  }
+
+  // 5) return the JSON { success, videoUrl } from Flask
   return NextResponse.json({
     success: true,
-    videoUrl: data.videoUrl ?? data.video_url,
+    videoUrl: job.videoUrl ?? job.video_url,
   });
 }
@@ -59,7 +59,8 @@ export default function EditPage() {
     console.log(message)
   }
 
-  const generateCharacterImage = async (character: Character) => {
+  // bypassCache asks for a fresh image instead of the cached one for the same input
+  const generateCharacterImage = async (character: Character, bypassCache = false) => {
     try {
       addToLog(`🎨 Generating image for ${character.Name}...`)
 
@@ -68,7 +69,7 @@ export default function EditPage() {
         headers: {
           "Content-Type": "application/json",
         },
-        body: JSON.stringify({ character }),
+        body: JSON.stringify({ character, bypass_cache: bypassCache }),
       })
 
       if (response.ok) {
@@ -93,7 +94,7 @@ export default function EditPage() {
     return placeholder
   }
 
-  const generateSceneImage = async (scene: Scene) => {
+  const generateSceneImage = async (scene: Scene, bypassCache = false) => {
     try {
       addToLog(`🎬 Generating image for Scene ${scene.Scene}...`)
 
@@ -102,7 +103,7 @@ export default function EditPage() {
         headers: {
           "Content-Type": "application/json",
         },
-        body: JSON.stringify({ description: scene.Description }),
+        body: JSON.stringify({ description: scene.Description, bypass_cache: bypassCache }),
       })
 
       if (response.ok) {
@@ -182,13 +183,13 @@ export default function EditPage() {
 
   const generateSingleCharacterImage = async (character: Character) => {
     setGenerationProgress(`Generating image for ${character.Name}...`)
-    await generateCharacterImage(character)
+    await generateCharacterImage(character, true)
     setGenerationProgress("")
   }
 
   const generateSingleSceneImage = async (scene: Scene) => {
     setGenerationProgress(`Generating image for Scene ${scene.Scene}...`)
-    await generateSceneImage(scene)
+    await generateSceneImage(scene, true)
     setGenerationProgress("")
   }
 
@@ -77,16 +77,19 @@ export default function FramesPage() {
 
       // If only one video, use it; if multiple, call compile endpoint
       let finalVideoUrl = videoUrls[0] || ""
+      let compileJobId = ""
       if (videoUrls.length > 1) {
         // Call backend to compile videos
         const compileRes = await fetch("/api/compile-videos", {
           method: "POST",
           headers: { "Content-Type": "application/json" },
-          body: JSON.stringify({ video_urls: videoUrls }),
+          // Ask for a quick preview; the video page swaps in the full render when it is done
+          body: JSON.stringify({ video_urls: videoUrls, preview: true }),
         })
         if (compileRes.ok) {
           const compileData = await compileRes.json()
           finalVideoUrl = compileData.compiled_video_url || finalVideoUrl
+          compileJobId = compileData.job_id || ""
         } else {
           const errorText = await compileRes.text()
           console.error("Failed to compile videos:", errorText)
@@ -95,6 +98,11 @@ export default function FramesPage() {
 
       if (finalVideoUrl) {
         localStorage.setItem("videoUrl", finalVideoUrl)
+        if (compileJobId) {
+          localStorage.setItem("compileJobId", compileJobId)
+        } else {
+          localStorage.removeItem("compileJobId")
+        }
         router.push("/video")
       } else {
         throw new Error("No video was generated.")
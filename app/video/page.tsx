@@ -8,6 +8,7 @@ import { ArrowLeft, Download, Share2, RotateCcw, Play } from "lucide-react"
 export default function VideoPage() {
   const [videoUrl, setVideoUrl] = useState<string | null>(null)
   const [isPlaying, setIsPlaying] = useState(false)
+  const [isPreview, setIsPreview] = useState(false)
   const router = useRouter()
 
   useEffect(() => {
@@ -19,6 +20,36 @@ export default function VideoPage() {
     }
   }, [router])
 
+  // A preview is shown first; poll the full-quality compile and swap it in when ready
+  useEffect(() => {
+    const jobId = localStorage.getItem("compileJobId")
+    if (!jobId) return
+    setIsPreview(true)
+
+    const timer = setInterval(async () => {
+      try {
+        const res = await fetch(`/api/compile-videos/${jobId}`)
+        const job = await res.json()
+        if (job.status === "completed" && job.compiled_video_url) {
+          localStorage.setItem("videoUrl", job.compiled_video_url)
+          localStorage.removeItem("compileJobId")
+          setVideoUrl(job.compiled_video_url)
+          setIsPreview(false)
+          clearInterval(timer)
+        } else if (job.status === "failed" || !res.ok) {
+          console.error("Full-quality render failed:", job.error)
+          localStorage.removeItem("compileJobId")
+          setIsPreview(false)
+          clearInterval(timer)
+        }
+      } catch (error) {
+        console.error("Error checking full-quality render:", error)
+      }
+    }, 3000)
+
+    return () => clearInterval(timer)
+  }, [])
+
   const handlePlayPause = () => {
     const video = document.getElementById("main-video") as HTMLVideoElement
     if (video) {
@@ -88,7 +119,7 @@ export default function VideoPage() {
           <div className="bg-white/10 backdrop-blur-sm border border-white/20 rounded-lg p-0 mb-8">
             <div className="relative">
               {videoUrl ? (
-                <video id="main-video" className="w-full aspect-video rounded-t-lg" controls>
+                <video key={videoUrl} id="main-video" className="w-full aspect-video rounded-t-lg" controls>
                   <source src={videoUrl} type="video/mp4" />
                   Your browser does not support the video tag.
                 </video>
@@ -148,7 +179,11 @@ export default function VideoPage() {
                 </div>
                 <div className="flex justify-between">
                   <span className="text-gray-300">Status:</span>
-                  <span className="text-green-400">Complete</span>
+                  {isPreview ? (
+                    <span className="text-yellow-400">Preview (full quality rendering)</span>
+                  ) : (
+                    <span className="text-green-400">Complete</span>
+                  )}
                 </div>
               </div>
             </div>
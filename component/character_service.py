@@ -1,19 +1,19 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Blueprint, request, jsonify
 from flask_cors import CORS
 import os
 import sys
 import json
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
 from character import generate_character_image
+from metrics import instrument_app
 
-character_app = Flask(__name__)
-CORS(character_app)
+# Routes live on a blueprint so the gateway can mount them next to the other services
+character_bp = Blueprint("character", __name__)
 
-@character_app.route("/", methods=["GET"])
 def health_check():
     return jsonify({"status": "Character service is running", "port": 5003})
 
-@character_app.route("/api/character", methods=["POST"])
+@character_bp.route("/api/character", methods=["POST"])
 def generate_character_api():
     try:
         data = request.get_json()
@@ -25,7 +25,9 @@ def generate_character_api():
         print(f"Generating character image for: {character_data.get('Name', 'Unknown')}")
 
         # Generate character image
-        image_path = generate_character_image(character_data, "character_images")
+        image_path = generate_character_image(
+            character_data, "character_images", bypass_cache=bool(data.get("bypass_cache"))
+        )
 
         if image_path and os.path.exists(image_path):
             # Read and encode the image
@@ -44,6 +46,12 @@ def generate_character_api():
         print(f"Error in generate_character_api: {e}")
         return jsonify({"error": "An internal server error occurred."}), 500
 
+character_app = Flask(__name__)
+CORS(character_app)
+character_app.register_blueprint(character_bp)
+character_app.add_url_rule("/", "health_check", health_check, methods=["GET"])
+instrument_app(character_app, "character")
+
 if __name__ == "__main__":
     print("Starting Character Service on port 5003...")
     character_app.run(debug=True, port=5003)
@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Blueprint, request, jsonify
 from flask_cors import CORS
 import os
 import base64
@@ -13,9 +13,10 @@ from scene_picture import (
     load_story_elements,
     load_character_images,
 )
+from metrics import instrument_app
 
-app = Flask(__name__)
-CORS(app)
+# Routes live on a blueprint so the gateway can mount them next to the other services
+image_bp = Blueprint("image", __name__)
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -56,11 +57,10 @@ def create_placeholder_image(text, width=400, height=300):
     
     return img_str
 
-@app.route('/', methods=['GET'])
 def health_check():
     return jsonify({"status": "Image service is running", "port": 5001})
 
-@app.route('/api/image', methods=['POST'])
+@image_bp.route('/api/image', methods=['POST'])
 def generate_image():
     try:
         data = request.get_json()
@@ -91,7 +91,8 @@ def generate_image():
             background = "Modern setting"
             
             image_path = generate_scene_image(
-                scene_data, character_images, background, story_data, OUTPUT_DIR
+                scene_data, character_images, background, story_data, OUTPUT_DIR,
+                bypass_cache=bool(data.get('bypass_cache'))
             )
             
             if image_path and os.path.exists(image_path):
@@ -128,7 +129,7 @@ def generate_image():
         logger.error(f"Error generating image: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/character-image', methods=['POST'])
+@image_bp.route('/api/character-image', methods=['POST'])
 def generate_character_image():
     """Generate character images using your existing character generation code"""
     try:
@@ -143,7 +144,9 @@ def generate_character_image():
         try:
             from character import generate_character_image
             
-            image_path = generate_character_image(character, CHARACTER_IMAGES_DIR)
+            image_path = generate_character_image(
+                character, CHARACTER_IMAGES_DIR, bypass_cache=bool(data.get('bypass_cache'))
+            )
             
             if image_path and os.path.exists(image_path):
                 with open(image_path, "rb") as image_file:
@@ -176,6 +179,12 @@ def generate_character_image():
         logger.error(f"Error generating character image: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+app = Flask(__name__)
+CORS(app)
+app.register_blueprint(image_bp)
+app.add_url_rule('/', 'health_check', health_check, methods=['GET'])
+instrument_app(app, "image")
+
 if __name__ == '__main__':
     print("Starting Image Service on port 5001...")
     print(f"JSON file path: {JSON_FILE_PATH}")
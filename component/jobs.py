@@ -0,0 +1,191 @@
+"""
+In-process background job manager used by the services for long-running work.
+
+A job is submitted to a bounded worker pool and gets an id immediately; clients
+poll its snapshot or block until it changes (used for server-sent events).
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Response, stream_with_context
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATES = ("completed", "failed")
+
+
+class JobManager:
+    def __init__(self, max_workers=32, ttl=3600, name="jobs"):
+        """
+        Initializes the JobManager.
+
+        :param max_workers: Maximum number of jobs running at once
+        :param ttl: Seconds to keep finished jobs before they are forgotten
+        :param name: Thread name prefix for the worker pool
+        """
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._jobs = {}
+        self._changed = threading.Condition()
+
+    def submit(self, func, *args, kind="job", pass_job_id=False, **kwargs):
+        """
+        Queue func(*args, **kwargs) on the worker pool.
+
+        :param func: Callable doing the work; its return value becomes the job result
+        :param kind: Label stored on the job for display
+        :param pass_job_id: Call func(job_id, *args, **kwargs) so it can report progress via update()
+        :return: The new job id
+        """
+        self._purge_expired()
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._changed:
+            self._jobs[job_id] = {
+                "id": job_id,
+                "kind": kind,
+                "status": "queued",
+                "result": None,
+                "error": None,
+                "progress": {},
+                "created_at": now,
+                "updated_at": now,
+                "version": 0,
+            }
+
+        if pass_job_id:
+            args = (job_id,) + args
+        self._executor.submit(self._run, job_id, func, args, kwargs)
+        return job_id
+
+    def _run(self, job_id, func, args, kwargs):
+        self.update(job_id, status="running")
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"❌ Job {job_id} failed: {e}")
+            self.update(job_id, status="failed", error=str(e))
+        else:
+            self.update(job_id, status="completed", result=result)
+
+    def update(self, job_id, **fields):
+        """
+        Update fields on a job and wake up anyone waiting on it.
+
+        A "progress" field is merged into the existing progress dict.
+        """
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            progress = fields.pop("progress", None)
+            if progress:
+                job["progress"].update(progress)
+            job.update(fields)
+            job["updated_at"] = time.time()
+            job["version"] += 1
+            self._changed.notify_all()
+
+    def get(self, job_id):
+        """
+        Return a snapshot of a job.
+
+        :param job_id: Job id from submit
+        :return: Copy of the job dict or None if unknown
+        """
+        with self._changed:
+            job = self._jobs.get(job_id)
+            return _snapshot(job) if job else None
+
+    def counts(self):
+        """Return the number of known jobs per status"""
+        with self._changed:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            return counts
+
+    def wait_for_change(self, job_id, version, timeout=None):
+        """
+        Block until the job's version moves past version, it finishes, or timeout expires.
+
+        :param job_id: Job id from submit
+        :param version: Last version the caller has seen
+        :param timeout: Maximum seconds to wait
+        :return: Latest snapshot (possibly unchanged on timeout) or None if unknown
+        """
+        def changed():
+            job = self._jobs.get(job_id)
+            return job is None or job["version"] != version or job["status"] in TERMINAL_STATES
+
+        with self._changed:
+            self._changed.wait_for(changed, timeout=timeout)
+            job = self._jobs.get(job_id)
+            return _snapshot(job) if job else None
+
+    def wait(self, job_id, timeout=None):
+        """
+        Block until the job reaches a terminal state.
+
+        :param job_id: Job id from submit
+        :param timeout: Maximum seconds to wait
+        :return: Latest snapshot or None if unknown
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        snapshot = self.get(job_id)
+        while snapshot and snapshot["status"] not in TERMINAL_STATES:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            snapshot = self.wait_for_change(job_id, snapshot["version"], remaining)
+        return snapshot
+
+    def events(self, job_id, heartbeat=15):
+        """
+        Generate a server-sent-events stream of job snapshots until it finishes.
+
+        :param job_id: Job id from submit
+        :param heartbeat: Seconds between keep-alive comments while nothing changes
+        """
+        snapshot = self.get(job_id)
+        while snapshot:
+            yield f"event: {snapshot['status']}\ndata: {json.dumps(snapshot)}\n\n"
+            if snapshot["status"] in TERMINAL_STATES:
+                return
+            version = snapshot["version"]
+            while True:
+                snapshot = self.wait_for_change(job_id, version, heartbeat)
+                if snapshot is None or snapshot["version"] != version:
+                    break
+                yield ": keep-alive\n\n"
+
+    def _purge_expired(self):
+        cutoff = time.time() - self.ttl
+        with self._changed:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job["status"] in TERMINAL_STATES and job["updated_at"] < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+
+def _snapshot(job):
+    snapshot = dict(job)
+    snapshot["progress"] = dict(job["progress"])
+    return snapshot
+
+
+def sse_response(job_manager, job_id):
+    """Build a Flask streaming response for a job's server-sent events."""
+    return Response(
+        stream_with_context(job_manager.events(job_id)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
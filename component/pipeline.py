@@ -0,0 +1,316 @@
+"""
+Pipelined end-to-end render of a story into a film.
+
+Every scene moves through keyframe -> resize/upload -> Luma clip on its own as
+soon as the previous stage for that scene is done, so scene N's video is
+generating while scene N+1's keyframe is still rendering. Character portraits
+and dialogue audio start while the script is still streaming in.
+"""
+
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from dotenv import load_dotenv
+import logging
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT_DIR, 'api'))
+sys.path.append(ROOT_DIR)
+
+load_dotenv()
+
+from writer import SceneGenerator
+from character import generate_character_image
+from dialogue_audio import generate_dialogue_audio, extract_dialogue_lines
+from scene_picture import generate_scene_image, load_character_images
+from process_scene_images import resize_to_16_9, upload_scene_image, UploadManifest
+from api.video_generator import generate_luma_video
+from component.video_compiler import compile_videos
+from metrics import pipeline_stage_duration
+from janitor import pinned
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RENDERS_DIR = os.getenv("RENDERS_DIR", os.path.join(ROOT_DIR, "renders"))
+
+# Shared across renders so re-rendering after an edit only uploads changed keyframes
+upload_manifest = UploadManifest(os.path.join(RENDERS_DIR, "upload_manifest.json"))
+
+# Order in which a scene moves through the per-scene stages
+SCENE_STAGES = ("keyframe", "upload", "video")
+ALL_STAGES = ("script", "characters", "dialogue") + SCENE_STAGES + ("compile",)
+
+
+class RenderPipeline:
+    def __init__(self, work_dir=None, character_workers=4, image_workers=4, upload_workers=4,
+                 video_workers=8, dialogue_workers=4, with_dialogue=None, music=None, on_progress=None):
+        """
+        Initializes the RenderPipeline.
+
+        :param work_dir: Directory for this render's intermediate files (default: renders/<id>)
+        :param character_workers: Concurrent character portrait requests
+        :param image_workers: Concurrent scene keyframe requests
+        :param upload_workers: Concurrent resize/upload tasks
+        :param video_workers: Concurrent Luma generations
+        :param dialogue_workers: Concurrent scenes being voiced
+        :param with_dialogue: Voice the dialogue and mux it into the film (default: when ELEVENLABS_API_KEY is set)
+        :param music: Optional music bed path or URL mixed under the film
+        :param on_progress: Callable receiving the progress dict after every change
+        """
+        self.render_id = uuid.uuid4().hex[:8]
+        self.work_dir = work_dir or os.path.join(RENDERS_DIR, self.render_id)
+        self.character_dir = os.path.join(self.work_dir, "character_images")
+        self.scene_dir = os.path.join(self.work_dir, "scene_images")
+        self.resized_dir = os.path.join(self.work_dir, "resized_scenes")
+        self.on_progress = on_progress
+        self.with_dialogue = bool(os.getenv("ELEVENLABS_API_KEY")) if with_dialogue is None else with_dialogue
+        self.music = music
+
+        self._pools = {
+            "characters": ThreadPoolExecutor(character_workers, thread_name_prefix="render-character"),
+            "keyframe": ThreadPoolExecutor(image_workers, thread_name_prefix="render-keyframe"),
+            "upload": ThreadPoolExecutor(upload_workers, thread_name_prefix="render-upload"),
+            "video": ThreadPoolExecutor(video_workers, thread_name_prefix="render-video"),
+            "dialogue": ThreadPoolExecutor(dialogue_workers, thread_name_prefix="render-dialogue"),
+        }
+        # Set once run() is leaving, so in-flight stages stop queueing more work
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._scenes_done = threading.Condition(self._lock)
+        self._pending_scenes = 0
+        self._character_futures = []
+        self._dialogue_futures = []
+        self._character_images = None
+        self.progress = {stage: {"done": 0, "failed": 0, "total": 0, "running": 0} for stage in ALL_STAGES}
+        self.scenes = {}
+
+    def _report(self, stage, event, scene=None, **details):
+        with self._lock:
+            counts = self.progress[stage]
+            if event == "queued":
+                counts["total"] += 1
+            elif event == "running":
+                counts["running"] += 1
+            elif event in ("done", "failed"):
+                counts["running"] = max(0, counts["running"] - 1)
+                counts[event] += 1
+            snapshot = {name: dict(values) for name, values in self.progress.items()}
+
+        label = f"Scene {scene} " if scene is not None else ""
+        logger.info(f"📊 {label}{stage}: {event} {details if details else ''}".rstrip())
+        if self.on_progress:
+            self.on_progress(snapshot)
+
+    def _run_stage(self, stage, scene, func, *args):
+        self._report(stage, "running", scene)
+        started = time.monotonic()
+        try:
+            result = func(*args)
+        except Exception as e:
+            logger.error(f"❌ {stage} failed{f' for scene {scene}' if scene is not None else ''}: {e}")
+            result = None
+        elapsed = time.monotonic() - started
+        pipeline_stage_duration.labels(stage, "ok" if result else "failed").observe(elapsed)
+        if result:
+            self._report(stage, "done", scene, seconds=round(elapsed, 1))
+        else:
+            self._report(stage, "failed", scene)
+        return result
+
+    # Characters
+
+    def _submit_character(self, character):
+        if self._stopped.is_set():
+            return
+        self._report("characters", "queued")
+        future = self._pools["characters"].submit(
+            self._run_stage, "characters", None, generate_character_image, character, self.character_dir
+        )
+        self._character_futures.append(future)
+
+    def _reference_images(self, characters):
+        # Every scene waits for all portraits, then shares one set of reference images
+        wait(self._character_futures)
+        with self._lock:
+            if self._character_images is None:
+                self._character_images = load_character_images(characters, self.character_dir)
+            return self._character_images
+
+    # Per-scene stages
+
+    def _submit_scene(self, scene, story_data):
+        if self._stopped.is_set():
+            return
+        number = scene["Scene"]
+        with self._lock:
+            self.scenes[number] = {"scene": scene, "image_path": None, "image_url": None, "video_url": None,
+                                   "audio": []}
+            self._pending_scenes += 1
+        if self.with_dialogue:
+            self._submit_dialogue(number, scene)
+        self._advance(number, 0, story_data)
+
+    def _submit_dialogue(self, number, scene):
+        if self._stopped.is_set():
+            return
+        self._report("dialogue", "queued", number)
+        future = self._pools["dialogue"].submit(
+            self._run_stage, "dialogue", number, self._voice_scene, number, scene
+        )
+        self._dialogue_futures.append(future)
+
+    def _voice_scene(self, number, scene):
+        # Lines are cached by content, so re-rendering unchanged dialogue makes no API calls
+        story = {"Scenes": [scene]}
+        if not extract_dialogue_lines(story):
+            # A scene without dialogue is not a failure
+            return True
+        audio = generate_dialogue_audio(story, max_workers=2).get(scene["Scene"], [])
+        self.scenes[number]["audio"] = audio
+        return audio
+
+    def _advance(self, number, stage_index, story_data):
+        if self._stopped.is_set():
+            return False
+        stage = SCENE_STAGES[stage_index]
+        self._report(stage, "queued", number)
+        self._pools[stage].submit(self._run_scene_stage, number, stage_index, story_data)
+        return True
+
+    def _run_scene_stage(self, number, stage_index, story_data):
+        stage = SCENE_STAGES[stage_index]
+        state = self.scenes[number]
+        scene = state["scene"]
+        advanced = False
+
+        try:
+            if self._stopped.is_set():
+                return
+            if stage == "keyframe":
+                result = self._run_stage(stage, number, self._render_keyframe, scene, story_data)
+                state["image_path"] = result
+            elif stage == "upload":
+                result = self._run_stage(stage, number, self._upload_keyframe, state["image_path"])
+                state["image_url"] = result
+            else:
+                result = self._run_stage(stage, number, generate_luma_video, scene["Description"], state["image_url"])
+                state["video_url"] = result
+
+            if result and stage_index + 1 < len(SCENE_STAGES):
+                advanced = self._advance(number, stage_index + 1, story_data)
+        finally:
+            if not advanced:
+                # The scene either finished its last stage or stopped on a failure
+                with self._scenes_done:
+                    self._pending_scenes -= 1
+                    self._scenes_done.notify_all()
+
+    def _render_keyframe(self, scene, story_data):
+        character_images = self._reference_images(story_data.get("Characters", []))
+        return generate_scene_image(
+            scene, character_images, story_data.get("Background", ""), story_data, self.scene_dir
+        )
+
+    def _upload_keyframe(self, image_path):
+        resized_path = resize_to_16_9(image_path, self.resized_dir)
+        return upload_scene_image(resized_path, upload_manifest) if resized_path else None
+
+    # Script
+
+    def _write_script(self, story_text, generator):
+        story_data = {"Background": "", "Characters": [], "Scenes": []}
+        self._report("script", "queued")
+        self._report("script", "running")
+
+        for event in generator.stream_story_elements(story_text):
+            if event["type"] == "background":
+                story_data["Background"] = event["data"]
+            elif event["type"] == "character":
+                story_data["Characters"].append(event["data"])
+                self._submit_character(event["data"])
+            elif event["type"] == "scene":
+                story_data["Scenes"].append(event["data"])
+                self._submit_scene(event["data"], story_data)
+            elif event["type"] == "error":
+                self._report("script", "failed")
+                raise RuntimeError(f"Script generation failed: {event['error']}")
+
+        self._report("script", "done")
+        return story_data
+
+    def run(self, story_text=None, story_data=None, output_path=None, generator=None):
+        """
+        Render a film from a story prompt or from an existing story dictionary.
+
+        :param story_text: Prompt for the writer (ignored when story_data is given)
+        :param story_data: Story dictionary with Background, Characters and Scenes
+        :param output_path: Path for the compiled film (default: <work_dir>/film.mp4)
+        :param generator: SceneGenerator to use for the script stage
+        :return: Dictionary with the story, per-scene results and the compiled film path
+        """
+        os.makedirs(self.work_dir, exist_ok=True)
+        output_path = output_path or os.path.join(self.work_dir, "film.mp4")
+        started = time.monotonic()
+
+        # The work dir holds this render's keyframes until the film is compiled
+        with pinned(self.work_dir):
+            try:
+                if story_data is None:
+                    generator = generator or SceneGenerator(api_key=os.getenv("ANTHROPIC_API_KEY"))
+                    story_data = self._write_script(story_text, generator)
+                else:
+                    for character in story_data.get("Characters", []):
+                        self._submit_character(character)
+                    for scene in story_data.get("Scenes", []):
+                        self._submit_scene(scene, story_data)
+
+                with self._scenes_done:
+                    self._scenes_done.wait_for(lambda: self._pending_scenes == 0)
+
+                wait(self._dialogue_futures)
+
+                ordered = [self.scenes[number] for number in sorted(self.scenes)]
+                rendered = [state for state in ordered if state["video_url"]]
+                video_urls = [state["video_url"] for state in rendered]
+                if not video_urls:
+                    raise RuntimeError("No scene produced a video")
+
+                self._report("compile", "queued")
+                compiled = self._run_stage(
+                    "compile", None, compile_videos, video_urls, output_path, True,
+                    [state["audio"] for state in rendered], self.music,
+                )
+            finally:
+                # On failure, drop queued stages instead of spending API calls on a film nobody collects
+                self._stopped.set()
+                for pool in self._pools.values():
+                    pool.shutdown(wait=False, cancel_futures=True)
+
+        logger.info(f"🎉 Render {self.render_id} finished in {time.monotonic() - started:.1f}s")
+        return {
+            "render_id": self.render_id,
+            "story": story_data,
+            "scenes": [
+                {
+                    "scene_number": state["scene"]["Scene"],
+                    "image_path": state["image_path"],
+                    "image_url": state["image_url"],
+                    "video_url": state["video_url"],
+                    "audio": state["audio"],
+                }
+                for state in ordered
+            ],
+            "video_urls": video_urls,
+            "compiled_video": compiled,
+            "progress": self.progress,
+        }
+
+
+if __name__ == "__main__":
+    story_text = sys.stdin.read().strip()
+    result = RenderPipeline().run(story_text)
+    print(f"🎬 Compiled film: {result['compiled_video']}")
@@ -0,0 +1,136 @@
+"""
+Production entry point for the backend services.
+
+Runs a service under gunicorn with a pool of threads per worker process (the
+gthread worker), graceful shutdown and keep-alive tuning, instead of the
+development server started by app.run().
+
+    python component/serve.py writer
+    python component/serve.py video --threads 128
+    python component/serve.py image --workers 4 --bind 0.0.0.0:5001
+    python component/serve.py gateway
+
+Every option can also be set with an environment variable named after the
+service, e.g. WRITER_WORKERS, IMAGE_THREADS or VIDEO_BIND; SERVE_TIMEOUT,
+SERVE_GRACEFUL_TIMEOUT and SERVE_KEEPALIVE apply to all services.
+"""
+
+import argparse
+import importlib
+import multiprocessing
+import os
+import sys
+
+COMPONENT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(COMPONENT_DIR)
+sys.path.insert(0, COMPONENT_DIR)
+sys.path.append(ROOT_DIR)
+
+# module, Flask app attribute, port, default workers, default threads.
+# Every service defaults to one worker: /metrics reports the memory of the worker
+# that serves the scrape, so several workers behind one address would show
+# Prometheus counters jumping between workers. The requests are I/O bound (provider
+# calls), so threads carry the load; for CPU-heavy image work, run more instances
+# on their own ports (each its own scrape target) rather than raising --workers.
+# The video service also keeps jobs and the Luma poller in process memory.
+SERVICES = {
+    "writer": ("writer_app", "writer_app", 5000, 1, 32),
+    "image": ("image_app", "app", 5001, 1, 16),
+    "video": ("video_app", "app", 5002, 1, 64),
+    "character": ("character_service", "character_app", 5003, 1, 16),
+    # Everything in one process; single worker for the same reason as video
+    "gateway": ("gateway", "app", 5050, 1, 64),
+}
+
+# Services whose only worker holds jobs in memory; recycling it would kill running
+# generations and compiles and forget their job ids
+STATEFUL_SERVICES = ("video", "gateway")
+
+
+def load_app(service):
+    """Import a service module and return its Flask app"""
+    module_name, attribute, _, _, _ = SERVICES[service]
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def _env(service, name, default):
+    return os.getenv(f"{service.upper()}_{name}", os.getenv(f"SERVE_{name}", default))
+
+
+def build_options(service, args):
+    """
+    Build the gunicorn settings for a service.
+
+    :param service: Service name from SERVICES
+    :param args: Parsed command line; unset options fall back to the environment, then defaults
+    :return: Dictionary of gunicorn settings
+    """
+    _, _, port, workers, threads = SERVICES[service]
+    workers = args.workers or int(_env(service, "WORKERS", workers))
+    return {
+        "bind": args.bind or _env(service, "BIND", f"0.0.0.0:{port}"),
+        "workers": max(1, min(workers, multiprocessing.cpu_count() * 2 + 1)),
+        "worker_class": "gthread",
+        "threads": args.threads or int(_env(service, "THREADS", threads)),
+        # gthread workers heartbeat from their main loop, so long generation
+        # requests do not trip this; it only catches hung workers.
+        "timeout": args.timeout or int(_env(service, "TIMEOUT", 660)),
+        "graceful_timeout": args.graceful_timeout or int(_env(service, "GRACEFUL_TIMEOUT", 30)),
+        "keepalive": args.keepalive or int(_env(service, "KEEPALIVE", 75)),
+        # Recycle workers now and then to bound memory growth from image buffers;
+        # opt-in only for stateful services
+        "max_requests": int(_env(service, "MAX_REQUESTS", 0 if service in STATEFUL_SERVICES else 2000)),
+        "max_requests_jitter": int(_env(service, "MAX_REQUESTS_JITTER", 200)),
+        "backlog": int(_env(service, "BACKLOG", 2048)),
+        "accesslog": _env(service, "ACCESS_LOG", "-"),
+        "errorlog": "-",
+        "loglevel": _env(service, "LOG_LEVEL", "info"),
+        "proc_name": f"directorai-{service}",
+    }
+
+
+def serve(service, options):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("❌ gunicorn is not installed: pip install gunicorn")
+        sys.exit(1)
+
+    class ServiceApplication(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # Imported in each worker after the fork, so SDK clients, connection
+            # pools and background threads are never shared across processes.
+            return load_app(service)
+
+    if service in STATEFUL_SERVICES and options["workers"] > 1:
+        print("⚠️ Video jobs live in worker memory; with several workers, status requests may miss their job")
+    elif options["workers"] > 1:
+        print("⚠️ Metrics live in worker memory; with several workers, /metrics only reports the one serving the scrape")
+    if service in STATEFUL_SERVICES and options["max_requests"]:
+        print("⚠️ Video jobs live in worker memory; recycling the worker after max_requests kills running jobs")
+
+    print(f"🚀 Serving {service} on {options['bind']} with {options['workers']} worker(s) "
+          f"x {options['threads']} thread(s)")
+    ServiceApplication().run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a backend service with gunicorn.")
+    parser.add_argument("service", choices=sorted(SERVICES))
+    parser.add_argument("--bind", help="Address to listen on, e.g. 0.0.0.0:5000")
+    parser.add_argument("--workers", type=int, help="Worker processes")
+    parser.add_argument("--threads", type=int, help="Threads per worker")
+    parser.add_argument("--timeout", type=int, help="Seconds before a silent worker is restarted")
+    parser.add_argument("--graceful-timeout", type=int, help="Seconds to finish in-flight requests on shutdown")
+    parser.add_argument("--keepalive", type=int, help="Seconds to keep idle client connections open")
+    args = parser.parse_args()
+
+    serve(args.service, build_options(args.service, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+Local transition engine: in-between frames from the end of one scene to the
+start of the next, computed on CPU with NumPy instead of a generation API.
+
+Styles:
+    crossfade  - linear blend of the two frames
+    motion     - blend along the global motion between the frames, estimated
+                 with phase correlation, so shapes slide instead of ghosting
+    zoompan    - the outgoing frame pushes in while the incoming one settles
+                 from a zoomed (and optionally panned) view
+
+Frames are written to a memory-mapped buffer on disk and piped to ffmpeg, so a
+long transition at full resolution does not have to fit in memory.
+
+    python component/transitions.py scene1.mp4 scene2.png transition.mp4 --style motion
+"""
+
+import argparse
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import numpy as np
+import requests
+from PIL import Image
+import logging
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from component.video_compiler import get_ffmpeg_exe, FASTSTART
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TRANSITION_STYLES = ("crossfade", "motion", "zoompan")
+DEFAULT_DURATION = 1.0
+DEFAULT_FPS = 24
+DEFAULT_ZOOM = 0.15
+# Upper bound on the float32 working set of one vectorized crossfade chunk
+CHUNK_BYTES = int(os.getenv("TRANSITION_CHUNK_BYTES", str(64 * 1024 * 1024)))
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".bmp")
+
+
+def _is_image(source):
+    return source.lower().split("?", 1)[0].endswith(IMAGE_EXTENSIONS)
+
+
+def load_frame(source, last=False, size=None):
+    """
+    Load one RGB frame from an image or a video.
+
+    :param source: Local path or URL of an image or a video
+    :param last: Take the last frame of a video instead of the first
+    :param size: Optional (width, height) to resize to
+    :return: uint8 array of shape (height, width, 3)
+    """
+    if _is_image(source):
+        if source.startswith(("http://", "https://")):
+            response = requests.get(source, timeout=30)
+            response.raise_for_status()
+            image = Image.open(io.BytesIO(response.content))
+        else:
+            image = Image.open(source)
+    else:
+        fd, frame_path = tempfile.mkstemp(suffix=".png")
+        os.close(fd)
+        try:
+            # With -update the image muxer keeps overwriting one file, leaving the last decoded frame
+            seek = ["-sseof", "-1"] if last else []
+            frames = ["-update", "1"] if last else ["-frames:v", "1"]
+            subprocess.run(
+                [get_ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-y"] + seek +
+                ["-i", source] + frames + [frame_path],
+                capture_output=True, text=True, check=True
+            )
+            image = Image.open(frame_path)
+            image.load()
+        finally:
+            os.remove(frame_path)
+
+    image = image.convert("RGB")
+    if size and image.size != tuple(size):
+        image = image.resize(tuple(size), Image.LANCZOS)
+    return np.asarray(image, dtype=np.uint8)
+
+
+def _grayscale(frame):
+    return frame.astype(np.float32) @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def estimate_shift(frame_a, frame_b):
+    """
+    Estimate the global translation from frame_a to frame_b by phase correlation.
+
+    :return: (dy, dx) in pixels such that frame_b(y, x) ~ frame_a(y - dy, x - dx)
+    """
+    gray_a, gray_b = _grayscale(frame_a), _grayscale(frame_b)
+    height, width = gray_a.shape
+    # A window keeps the image borders from dominating the spectrum
+    window = np.outer(np.hanning(height), np.hanning(width)).astype(np.float32)
+    spectrum_a = np.fft.fft2((gray_a - gray_a.mean()) * window)
+    spectrum_b = np.fft.fft2((gray_b - gray_b.mean()) * window)
+
+    cross_power = spectrum_b * np.conj(spectrum_a)
+    cross_power /= np.abs(cross_power) + 1e-9
+    correlation = np.fft.ifft2(cross_power).real
+
+    dy, dx = np.unravel_index(np.argmax(correlation), correlation.shape)
+    # Peaks past the midpoint are negative shifts
+    if dy > height // 2:
+        dy -= height
+    if dx > width // 2:
+        dx -= width
+    return float(dy), float(dx)
+
+
+def _axis_weights(coords, size):
+    coords = np.clip(coords, 0, size - 1)
+    low = np.floor(coords).astype(np.int32)
+    high = np.minimum(low + 1, size - 1)
+    return low, high, (coords - low).astype(np.float32)
+
+
+def _sample(frame, ys, xs):
+    """
+    Bilinear sample of frame on the grid ys x xs, clamped to the edges.
+
+    Translations and zooms are axis-aligned, so rows and columns are
+    interpolated separately with whole-row and whole-column gathers.
+
+    :param ys: Source row coordinate of every output row, shape (height,)
+    :param xs: Source column coordinate of every output column, shape (width,)
+    """
+    height, width = frame.shape[:2]
+    y0, y1, wy = _axis_weights(ys, height)
+    x0, x1, wx = _axis_weights(xs, width)
+    wy = wy[:, None, None]
+    wx = wx[None, :, None]
+
+    rows = frame[y0] + (frame[y1] - frame[y0]) * wy
+    return rows[:, x0] + (rows[:, x1] - rows[:, x0]) * wx
+
+
+def _to_uint8(values):
+    return np.clip(values + 0.5, 0, 255).astype(np.uint8)
+
+
+def _crossfade(frame_a, frame_b, weights, out):
+    a = frame_a.astype(np.float32)
+    b = frame_b.astype(np.float32)
+    frame_bytes = a.nbytes
+    chunk = max(1, CHUNK_BYTES // frame_bytes)
+    for start in range(0, len(weights), chunk):
+        t = weights[start:start + chunk, None, None, None]
+        out[start:start + chunk] = _to_uint8(a + (b - a) * t)
+
+
+def _motion(frame_a, frame_b, weights, out):
+    dy, dx = estimate_shift(frame_a, frame_b)
+    logger.info(f"🧭 Estimated motion between frames: dy={dy:.0f}px dx={dx:.0f}px")
+    a = frame_a.astype(np.float32)
+    b = frame_b.astype(np.float32)
+    ys = np.arange(a.shape[0], dtype=np.float32)
+    xs = np.arange(a.shape[1], dtype=np.float32)
+    for i, t in enumerate(weights):
+        # Both frames are moved to the intermediate position t along the motion, then blended
+        warped_a = _sample(a, ys - t * dy, xs - t * dx)
+        warped_b = _sample(b, ys + (1 - t) * dy, xs + (1 - t) * dx)
+        out[i] = _to_uint8(warped_a + (warped_b - warped_a) * t)
+
+
+def _zoompan(frame_a, frame_b, weights, out, zoom=DEFAULT_ZOOM, pan=(0.0, 0.0)):
+    a = frame_a.astype(np.float32)
+    b = frame_b.astype(np.float32)
+    height, width = a.shape[:2]
+    cy, cx = (height - 1) / 2, (width - 1) / 2
+    offset_y = np.arange(height, dtype=np.float32) - cy
+    offset_x = np.arange(width, dtype=np.float32) - cx
+    pan_x, pan_y = pan[0] * width, pan[1] * height
+
+    for i, t in enumerate(weights):
+        # Outgoing frame pushes in and drifts along the pan
+        scale_a = 1 + zoom * t
+        sampled_a = _sample(a, cy + t * pan_y + offset_y / scale_a, cx + t * pan_x + offset_x / scale_a)
+        # Incoming frame arrives from the opposite zoom and pan and settles on its own framing
+        scale_b = 1 + zoom * (1 - t)
+        sampled_b = _sample(b, cy - (1 - t) * pan_y + offset_y / scale_b, cx - (1 - t) * pan_x + offset_x / scale_b)
+        out[i] = _to_uint8(sampled_a + (sampled_b - sampled_a) * t)
+
+
+def transition_frames(frame_a, frame_b, count, style="crossfade", buffer_path=None, **options):
+    """
+    Compute the in-between frames of a transition.
+
+    :param frame_a: Last frame of the outgoing scene, uint8 (height, width, 3)
+    :param frame_b: First frame of the incoming scene, same shape
+    :param count: Number of in-between frames (the two end frames are not included)
+    :param style: One of TRANSITION_STYLES
+    :param buffer_path: File backing the frame buffer (default: a temporary file the caller removes)
+    :param options: zoom and pan for zoompan
+    :return: np.memmap of shape (count, height, width, 3)
+    """
+    if style not in TRANSITION_STYLES:
+        raise ValueError(f"Unknown transition style {style!r}, expected one of {', '.join(TRANSITION_STYLES)}")
+    if frame_a.shape != frame_b.shape:
+        raise ValueError(f"Frame shapes differ: {frame_a.shape} vs {frame_b.shape}")
+
+    if buffer_path is None:
+        fd, buffer_path = tempfile.mkstemp(suffix=".frames")
+        os.close(fd)
+    frames = np.memmap(buffer_path, dtype=np.uint8, mode="w+", shape=(count,) + frame_a.shape)
+
+    # Eased weights so the blend starts and ends gently
+    t = np.arange(1, count + 1, dtype=np.float32) / (count + 1)
+    weights = t * t * (3 - 2 * t)
+
+    if style == "crossfade":
+        _crossfade(frame_a, frame_b, weights, frames)
+    elif style == "motion":
+        _motion(frame_a, frame_b, weights, frames)
+    else:
+        _zoompan(frame_a, frame_b, weights, frames, **options)
+
+    frames.flush()
+    return frames
+
+
+def render_transition(from_source, to_source, output_path, style="crossfade",
+                      duration=DEFAULT_DURATION, fps=DEFAULT_FPS, size=None, **options):
+    """
+    Render a transition clip from the end of one scene to the start of the next.
+
+    :param from_source: Outgoing scene, a video (its last frame is used) or an image
+    :param to_source: Incoming scene, an image (e.g. its keyframe) or a video (its first frame is used)
+    :param output_path: Path of the MP4 to write
+    :param style: One of TRANSITION_STYLES
+    :param duration: Length of the clip in seconds
+    :param fps: Frame rate of the clip
+    :param size: Optional (width, height); defaults to the outgoing frame's size
+    :param options: zoom and pan for zoompan
+    :return: output_path
+    """
+    frame_a = load_frame(from_source, last=True, size=size)
+    height, width = frame_a.shape[:2]
+    # yuv420p needs even dimensions
+    width, height = width - width % 2, height - height % 2
+    frame_a = frame_a[:height, :width]
+    frame_b = load_frame(to_source, size=(width, height))
+
+    count = max(1, int(round(duration * fps)))
+    buffer_dir = tempfile.mkdtemp(prefix="transition-")
+    try:
+        frames = transition_frames(frame_a, frame_b, count, style,
+                                   buffer_path=os.path.join(buffer_dir, "frames.raw"), **options)
+        logger.info(f"🎞️ Encoding {count} {style} frames ({width}x{height} @ {fps}fps)...")
+        process = subprocess.Popen(
+            [get_ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-y",
+             "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(fps), "-i", "pipe:0",
+             "-c:v", "libx264", "-preset", "veryfast", "-crf", "18", "-pix_fmt", "yuv420p"] + FASTSTART +
+            [output_path],
+            stdin=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        try:
+            for frame in frames:
+                process.stdin.write(memoryview(frame).cast("B"))
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+        stderr = process.stderr.read().decode(errors="replace")
+        if process.wait() != 0:
+            raise RuntimeError(f"Encoding the transition failed: {stderr.strip()}")
+        del frames
+    finally:
+        shutil.rmtree(buffer_dir, ignore_errors=True)
+
+    logger.info(f"✅ Transition written to {output_path}")
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a transition clip between two scenes.")
+    parser.add_argument("from_source", help="Outgoing scene video or image")
+    parser.add_argument("to_source", help="Incoming scene keyframe or video")
+    parser.add_argument("output", help="Output MP4 path")
+    parser.add_argument("--style", choices=TRANSITION_STYLES, default="crossfade")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION)
+    parser.add_argument("--fps", type=int, default=DEFAULT_FPS)
+    parser.add_argument("--zoom", type=float, default=DEFAULT_ZOOM, help="Zoom amount for zoompan")
+    args = parser.parse_args()
+
+    options = {"zoom": args.zoom} if args.style == "zoompan" else {}
+    render_transition(args.from_source, args.to_source, args.output, args.style,
+                      args.duration, args.fps, **options)
+
+
+if __name__ == "__main__":
+    main()
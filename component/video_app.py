@@ -1,4 +1,5 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Blueprint, request, jsonify, send_from_directory, redirect, url_for, abort, current_app
+from werkzeug.security import safe_join
 from flask_cors import CORS
 import sys
 import os
@@ -7,7 +8,10 @@ import tempfile
 import requests
 from PIL import Image
 import io
+import re
+import mimetypes
 import logging
+from urllib.parse import quote
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -15,18 +19,27 @@ logger = logging.getLogger(__name__)
 
 # Add the parent directory to the path so we can import from api/
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'api'))
+
+from component.jobs import JobManager, sse_response
+from storage import get_storage
+from metrics import instrument_app, register_job_manager
+from janitor import start_janitor, pinned
 
 try:
     from api.video_generator import generate_luma_video
     from component.video_compiler import compile_videos as compile_videos_util
+    from component.transitions import render_transition, TRANSITION_STYLES
     logger.info("✅ Successfully imported video_generator and video_compiler")
 except ImportError as e:
     logger.error(f"❌ Failed to import video_generator or video_compiler: {e}")
+    render_transition = None
+    TRANSITION_STYLES = ()
     # Create a mock function for testing
     def generate_luma_video(prompt, image_url, aspect_ratio):
         logger.warning("Using mock video generation")
         return "https://sample-videos.com/zip/10/mp4/SampleVideo_1280x720_1mb.mp4"
-    def compile_videos_util(video_urls, output_path=None):
+    def compile_videos_util(video_urls, output_path=None, **audio_options):
         # logger.warning("Using mock video compilation")
         # return video_urls[0] if video_urls else None
         """
@@ -44,69 +57,178 @@ except ImportError as e:
 
         return output_path
 
-app = Flask(__name__)
-CORS(app)
-
-def upload_base64_image_to_cloudinary(base64_data):
-    """Upload base64 image to Cloudinary and return public URL"""
+# Routes live on a blueprint so the gateway can mount them next to the other services
+video_bp = Blueprint("video", __name__)
+
+# Luma generations run in the background; each one mostly waits on the provider,
+# so a single process can keep many of them in flight.
+VIDEO_JOB_WORKERS = int(os.getenv("VIDEO_JOB_WORKERS", "32"))
+video_jobs = JobManager(max_workers=VIDEO_JOB_WORKERS, name="video-job")
+render_jobs = JobManager(max_workers=int(os.getenv("RENDER_JOB_WORKERS", "4")), name="render-job")
+# Full-quality compiles that follow a preview
+compile_jobs = JobManager(max_workers=int(os.getenv("COMPILE_JOB_WORKERS", "2")), name="compile-job")
+register_job_manager(video_jobs, "video")
+register_job_manager(render_jobs, "render")
+register_job_manager(compile_jobs, "compile")
+
+# Uploaded keyframes and compiled films; local disk unless ASSET_STORAGE_BACKEND says otherwise
+storage = get_storage()
+
+# Let a front proxy send asset bytes: "x-sendfile" (Apache, lighttpd) or "x-accel" (nginx,
+# with an internal location at ASSET_ACCEL_PREFIX aliased to the storage root)
+ASSET_SENDFILE = os.getenv("ASSET_SENDFILE", "").lower()
+ASSET_ACCEL_PREFIX = os.getenv("ASSET_ACCEL_PREFIX", "/protected-assets/")
+# Stored names are content hashes, so their bytes never change; anything else is revalidated
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+ASSET_MAX_AGE = int(os.getenv("ASSET_MAX_AGE", "300"))
+_CONTENT_HASH = re.compile(r"^[0-9a-f]{64}$")
+
+# Background sweeps keep stored assets, caches and scratch files within their quotas
+start_janitor(getattr(storage, 'root', None))
+
+def local_asset_path(url):
+    """Local file behind a /static URL of the filesystem storage, or None"""
+    root = getattr(storage, 'root', None)
+    if not root or not url or '/static/' not in url:
+        return None
+    return safe_join(root, url.split('/static/', 1)[1].split('?', 1)[0])
+
+def public_url(url, host_url):
+    """Make a storage URL absolute so Luma and the frontend can fetch it"""
+    return f"{host_url.rstrip('/')}{url}" if url.startswith('/') else url
+
+def store_base64_image(base64_data, host_url):
+    """Store a base64 image in asset storage and return its public URL"""
     try:
         # Extract base64 data (remove data:image/png;base64, prefix)
         if ',' in base64_data:
             base64_data = base64_data.split(',')[1]
 
-        # Decode base64 to image
+        # Decode base64 and make sure it really is an image
         image_data = base64.b64decode(base64_data)
         image = Image.open(io.BytesIO(image_data))
+        if image.format != 'PNG':
+            buffer = io.BytesIO()
+            image.save(buffer, 'PNG')
+            image_data = buffer.getvalue()
 
-        # Save to temporary file
-        with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_file:
-            image.save(temp_file.name, 'PNG')
-            temp_file_path = temp_file.name
-
-        # Simple approach: save to a public directory and serve via Flask
-        import uuid
-        filename = f"scene_{uuid.uuid4().hex[:8]}.png"
-        static_dir = os.path.join(os.path.dirname(__file__), 'static')
-        os.makedirs(static_dir, exist_ok=True)
-        public_path = os.path.join(static_dir, filename)
-
-        # Copy temp file to public directory
-        import shutil
-        shutil.copy2(temp_file_path, public_path)
-
-        # Clean up temp file
-        os.unlink(temp_file_path)
-
-        # Return public URL
-        public_url = f"http://localhost:5002/static/{filename}"
-        logger.info(f"📸 Image uploaded to: {public_url}")
-        return public_url
+        # Content-addressed key: re-sending the same keyframe reuses the stored copy
+        asset = storage.put(image_data, prefix="scenes", extension=".png")
+        url = public_url(asset.url, host_url)
+        logger.info(f"📸 Image stored at: {url}")
+        return url
 
     except Exception as e:
-        logger.error(f"❌ Error uploading image: {e}")
+        logger.error(f"❌ Error storing image: {e}")
         # Fallback to placeholder
         return "https://res.cloudinary.com/dxrr6xfnr/image/upload/v1750563689/scene_04_vfl0ev.png"
 
-@app.route('/static/<filename>')
+# Kept for existing callers
+def upload_base64_image_to_cloudinary(base64_data):
+    return store_base64_image(base64_data, "http://localhost:5002/")
+
+def store_compiled_video(path, host_url):
+    """Move a compiled film into asset storage and return its public URL"""
+    asset = storage.put(path, prefix="films", extension=".mp4", move=True)
+    if os.path.exists(path):
+        os.remove(path)
+    return public_url(asset.url, host_url)
+
+def _offload_response(path, filename):
+    """Empty response telling the front proxy which file to send"""
+    response = current_app.response_class(
+        mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    )
+    if ASSET_SENDFILE == "x-accel":
+        response.headers["X-Accel-Redirect"] = f"{ASSET_ACCEL_PREFIX.rstrip('/')}/{quote(filename)}"
+    else:
+        response.headers["X-Sendfile"] = path
+    return response
+
+@video_bp.route('/static/<path:filename>')
 def serve_static(filename):
-    """Serve static files (uploaded images)"""
-    static_dir = os.path.join(os.path.dirname(__file__), 'static')
-    return send_from_directory(static_dir, filename)
+    """Serve stored assets (uploaded images and compiled films)"""
+    if getattr(storage, 'root', None) is None:
+        return redirect(storage.url(filename))
+
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    hashed = bool(_CONTENT_HASH.match(stem))
+    max_age = IMMUTABLE_MAX_AGE if hashed else ASSET_MAX_AGE
+
+    if ASSET_SENDFILE in ("x-sendfile", "x-accel"):
+        path = safe_join(storage.root, filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        response = _offload_response(path, filename)
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        if hashed:
+            response.set_etag(stem)
+            # Revalidations never need to reach the proxy's file
+            response = response.make_conditional(request)
+    else:
+        # Conditional responses answer Range requests with 206 and If-None-Match with 304
+        response = send_from_directory(storage.root, filename, etag=stem if hashed else True,
+                                       max_age=max_age, conditional=True)
+
+    response.headers["Accept-Ranges"] = "bytes"
+    if hashed:
+        response.cache_control.immutable = True
+    return response
 
-@app.route('/', methods=['GET'])
 def health_check():
     return jsonify({
         "status": "Video service is running",
         "port": 5002,
         "endpoints": [
-            "/api/video - POST - Generate video",
-            "/api/compile-videos - POST - Compile multiple videos",
-            "/static/<filename> - GET - Serve uploaded images"
+            "/api/video - POST - Submit a video generation job",
+            "/api/video/<job_id> - GET - Video job status and result",
+            "/api/video/<job_id>/events - GET - Video job server-sent events",
+            "/api/compile-videos - POST - Compile multiple videos (preview=true for a quick cut first)",
+            "/api/compile-videos/<job_id> - GET - Full-quality compile status after a preview",
+            "/api/compile-videos/<job_id>/events - GET - Full-quality compile server-sent events",
+            "/api/transition - POST - Render a transition clip between two scenes locally",
+            "/api/render - POST - Render a whole film from a story (background job)",
+            "/api/render/<job_id> - GET - Render job status and per-stage progress",
+            "/api/render/<job_id>/events - GET - Render job server-sent events",
+            "/static/<path> - GET - Serve stored images and films",
+            "/metrics - GET - Prometheus metrics"
         ]
     })
 
-@app.route('/api/video', methods=['POST'])
+def _video_job_response(job):
+    """Serialize a video job snapshot for API clients."""
+    body = {
+        "job_id": job["id"],
+        "status": job["status"],
+        "success": job["status"] != "failed",
+        "status_url": url_for("video.get_video_job", job_id=job["id"]),
+        "events_url": url_for("video.video_job_events", job_id=job["id"]),
+    }
+    if job["status"] == "completed":
+        body["videoUrl"] = job["result"]  # Use camelCase for consistency
+        body["video_url"] = job["result"]  # Also provide snake_case
+        body["message"] = "Video generated successfully"
+    elif job["status"] == "failed":
+        body["error"] = job["error"]
+    return body
+
+def _run_video_job(prompt, image_url, aspect_ratio):
+    logger.info(f"🖼️  Using Image URL: {image_url}")
+    # Luma fetches the keyframe from us while the job runs
+    with pinned(local_asset_path(image_url)):
+        video_url = generate_luma_video(prompt, image_url, aspect_ratio)
+    logger.info(f"✅ Video generated successfully: {video_url}")
+    return video_url
+
+@video_bp.route('/api/video', methods=['POST'])
 def generate_video():
+    """
+    Submit a video generation job and return its id immediately.
+
+    Pass "wait": true (or ?wait=1) to block until the video is ready, as the
+    endpoint did before jobs were introduced.
+    """
     try:
         data = request.get_json()
 
@@ -120,30 +242,25 @@ def generate_video():
         if not prompt or not image_data:
             return jsonify({"error": "Missing prompt or image data"}), 400
 
-        logger.info(f"🎬 Starting video generation...")
+        logger.info(f"🎬 Queueing video generation...")
         logger.info(f"📝 Prompt: {prompt[:100]}...")
         logger.info(f"📐 Aspect Ratio: {aspect_ratio}")
 
         # Handle base64 image data - upload to get public URL
         if image_data.startswith('data:image'):
             logger.info("📸 Converting base64 image to public URL...")
-            image_url = upload_base64_image_to_cloudinary(image_data)
+            image_url = store_base64_image(image_data, request.host_url)
         else:
             image_url = image_data
 
-        logger.info(f"🖼️  Using Image URL: {image_url}")
-
-        # Call your existing video generation function
-        video_url = generate_luma_video(prompt, image_url, aspect_ratio)
+        job_id = video_jobs.submit(_run_video_job, prompt, image_url, aspect_ratio, kind="video")
 
-        logger.info(f"✅ Video generated successfully: {video_url}")
+        if data.get('wait') or request.args.get('wait'):
+            job = video_jobs.wait(job_id)
+            status_code = 500 if job["status"] == "failed" else 200
+            return jsonify(_video_job_response(job)), status_code
 
-        return jsonify({
-            "success": True,
-            "videoUrl": video_url,  # Use camelCase for consistency
-            "video_url": video_url,  # Also provide snake_case
-            "message": "Video generated successfully"
-        })
+        return jsonify(_video_job_response(video_jobs.get(job_id))), 202
 
     except Exception as e:
         logger.error(f"❌ Video generation error: {str(e)}")
@@ -152,7 +269,42 @@ def generate_video():
             "success": False
         }), 500
 
-@app.route('/api/compile-videos', methods=['POST'])
+@video_bp.route('/api/video/<job_id>', methods=['GET'])
+def get_video_job(job_id):
+    """Return the status of a video job, including the video URL once completed"""
+    job = video_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Unknown job id", "success": False}), 404
+    return jsonify(_video_job_response(job))
+
+@video_bp.route('/api/video/<job_id>/events', methods=['GET'])
+def video_job_events(job_id):
+    """Stream status changes of a video job as server-sent events"""
+    if not video_jobs.get(job_id):
+        return jsonify({"error": "Unknown job id", "success": False}), 404
+    return sse_response(video_jobs, job_id)
+
+def _compile_and_store(video_urls, compile_options, host_url, quality="full"):
+    """Compile clips into a film, store it and return its public URL"""
+    import uuid
+    output_path = os.path.join(tempfile.gettempdir(), f"compiled_{uuid.uuid4().hex[:8]}.mp4")
+
+    if quality != "full":
+        compile_options = dict(compile_options, quality=quality)
+    compiled_video_path = compile_videos_util(video_urls, output_path, **compile_options)
+    if compiled_video_path and compiled_video_path.startswith(('http://', 'https://')):
+        # A single clip without audio is its own film
+        return compiled_video_path
+
+    if not compiled_video_path or not os.path.isfile(compiled_video_path):
+        raise RuntimeError("Video compilation failed (file not created)")
+
+    return store_compiled_video(compiled_video_path, host_url)
+
+def _run_compile_job(video_urls, compile_options, host_url):
+    return {"compiled_video_url": _compile_and_store(video_urls, compile_options, host_url)}
+
+@video_bp.route('/api/compile-videos', methods=['POST'])
 def compile_videos():
     """Compile multiple video URLs into a single video"""
     try:
@@ -162,24 +314,47 @@ def compile_videos():
         if not video_urls:
             return jsonify({"error": "No video URLs provided"}), 400
 
-        logger.info(f"🎬 Compiling {len(video_urls)} videos...")
-
-        static_dir = os.path.join(os.path.dirname(__file__), 'static')
-        os.makedirs(static_dir, exist_ok=True)
-        import uuid
-        output_filename = f"compiled_{uuid.uuid4().hex[:8]}.mp4"
-        output_path = os.path.join(static_dir, output_filename)
+        # Optional sound: per-scene audio URLs (a URL or a list of URLs per clip) and a music bed
+        scene_audio = data.get('scene_audio') or []
+        music_url = data.get('music_url')
+        audio_urls = [url for entry in scene_audio for url in ([entry] if isinstance(entry, str) else entry or [])]
+        if music_url:
+            audio_urls.append(music_url)
+        if any(not str(url).startswith(('http://', 'https://')) for url in audio_urls):
+            return jsonify({"error": "Audio must be given as http(s) URLs"}), 400
+
+        compile_options = {}
+        if audio_urls:
+            compile_options = {"scene_audio": scene_audio, "music": music_url}
+            if data.get('music_volume') is not None:
+                try:
+                    music_volume = float(data['music_volume'])
+                except (TypeError, ValueError):
+                    return jsonify({"error": "music_volume must be a number"}), 400
+                if not 0 <= music_volume <= 4:
+                    return jsonify({"error": "music_volume must be in [0, 4]"}), 400
+                compile_options["music_volume"] = music_volume
+
+        if data.get('preview'):
+            # A quick low-resolution cut now; the full-quality film follows as a job
+            # that reuses the clips the preview just downloaded
+            logger.info(f"🎬 Compiling a preview of {len(video_urls)} videos...")
+            preview_url = _compile_and_store(video_urls, compile_options, request.host_url, quality="preview")
+            job_id = compile_jobs.submit(
+                _run_compile_job, video_urls, compile_options, request.host_url, kind="compile"
+            )
+            logger.info(f"✅ Preview ready: {preview_url}, full render queued as job {job_id}")
+
+            body = _compile_job_response(compile_jobs.get(job_id))
+            body.update({
+                "preview_url": preview_url,
+                "compiled_video_url": preview_url,
+                "message": f"Preview of {len(video_urls)} videos; full quality is rendering"
+            })
+            return jsonify(body), 202
 
-        # compiled_video_path = compile_videos_util(video_urls, output_path=output_path)
-        compiled_video_path = compile_videos_util(video_urls, output_path)
-
-        if not compiled_video_path or not os.path.isfile(compiled_video_path):
-            raise RuntimeError("Video compilation failed (file not created)")
-        if not compiled_video_path:
-            raise RuntimeError("Video compilation failed")
-
-        # Use request.host_url to construct the public URL
-        compiled_video_url = f"{request.host_url}static/{output_filename}"
+        logger.info(f"🎬 Compiling {len(video_urls)} videos...")
+        compiled_video_url = _compile_and_store(video_urls, compile_options, request.host_url)
 
         logger.info(f"✅ Video compilation complete: {compiled_video_url}")
 
@@ -196,6 +371,157 @@ def compile_videos():
             "success": False
         }), 500
 
+def _compile_job_response(job):
+    body = {
+        "job_id": job["id"],
+        "status": job["status"],
+        "success": job["status"] != "failed",
+        "status_url": url_for("video.get_compile_job", job_id=job["id"]),
+        "events_url": url_for("video.compile_job_events", job_id=job["id"]),
+    }
+    if job["status"] == "completed":
+        body["compiled_video_url"] = job["result"]["compiled_video_url"]
+    elif job["status"] == "failed":
+        body["error"] = job["error"]
+    return body
+
+@video_bp.route('/api/compile-videos/<job_id>', methods=['GET'])
+def get_compile_job(job_id):
+    """Return status of the full-quality compile that follows a preview"""
+    job = compile_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Unknown job id", "success": False}), 404
+    return jsonify(_compile_job_response(job))
+
+@video_bp.route('/api/compile-videos/<job_id>/events', methods=['GET'])
+def compile_job_events(job_id):
+    """Stream status of a full-quality compile as server-sent events"""
+    if not compile_jobs.get(job_id):
+        return jsonify({"error": "Unknown job id", "success": False}), 404
+    return sse_response(compile_jobs, job_id)
+
+@video_bp.route('/api/transition', methods=['POST'])
+def create_transition():
+    """Render a short transition clip from the end of one scene to the start of the next"""
+    data = request.get_json() or {}
+    from_url = data.get('from_url')
+    to_url = data.get('to_url')
+    style = data.get('style', 'crossfade')
+
+    if render_transition is None:
+        return jsonify({"error": "Transition engine unavailable", "success": False}), 503
+    if not from_url or not to_url:
+        return jsonify({"error": "Missing from_url or to_url"}), 400
+    if not all(str(url).startswith(('http://', 'https://')) for url in (from_url, to_url)):
+        return jsonify({"error": "from_url and to_url must be http(s) URLs"}), 400
+    if style not in TRANSITION_STYLES:
+        return jsonify({"error": f"style must be one of {', '.join(TRANSITION_STYLES)}"}), 400
+
+    try:
+        duration = float(data.get('duration', 1.0))
+        fps = int(data.get('fps', 24))
+        options = {"zoom": float(data['zoom'])} if style == 'zoompan' and data.get('zoom') is not None else {}
+    except (TypeError, ValueError):
+        return jsonify({"error": "duration, fps and zoom must be numbers"}), 400
+    if not 0 < duration <= 5 or not 1 <= fps <= 60:
+        return jsonify({"error": "duration must be in (0, 5] seconds and fps in [1, 60]"}), 400
+
+    try:
+        import uuid
+        output_path = os.path.join(tempfile.gettempdir(), f"transition_{uuid.uuid4().hex[:8]}.mp4")
+        render_transition(from_url, to_url, output_path, style=style, duration=duration, fps=fps, **options)
+
+        asset = storage.put(output_path, prefix="transitions", extension=".mp4", move=True)
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        transition_url = public_url(asset.url, request.host_url)
+
+        logger.info(f"✅ Transition ready: {transition_url}")
+        return jsonify({
+            "success": True,
+            "transition_url": transition_url,
+            "style": style,
+            "duration": duration
+        })
+
+    except Exception as e:
+        logger.error(f"❌ Transition error: {str(e)}")
+        return jsonify({
+            "error": str(e),
+            "success": False
+        }), 500
+
+def _run_render_job(job_id, story, story_data, host_url, music_url=None):
+    from component.pipeline import RenderPipeline
+
+    pipeline = RenderPipeline(
+        music=music_url,
+        on_progress=lambda progress: render_jobs.update(job_id, progress=progress),
+    )
+    result = pipeline.run(story, story_data)
+
+    compiled = result["compiled_video"]
+    if compiled and os.path.isfile(compiled):
+        result["compiled_video_url"] = store_compiled_video(compiled, host_url)
+    else:
+        result["compiled_video_url"] = compiled
+    return result
+
+@video_bp.route('/api/render', methods=['POST'])
+def render_film():
+    """Start a pipelined story -> film render and return its job id"""
+    data = request.get_json() or {}
+    story = data.get('story')
+    story_data = data.get('story_elements')
+    music_url = data.get('music_url')
+
+    if not story and not story_data:
+        return jsonify({"error": "Missing story or story_elements"}), 400
+    if music_url and not music_url.startswith(('http://', 'https://')):
+        return jsonify({"error": "music_url must be an http(s) URL"}), 400
+
+    try:
+        import component.pipeline  # noqa: F401 - fail fast if the generation SDKs are missing
+    except Exception as e:
+        logger.error(f"❌ Render pipeline unavailable: {e}")
+        return jsonify({"error": f"Render pipeline unavailable: {e}", "success": False}), 503
+
+    job_id = render_jobs.submit(
+        _run_render_job, story, story_data, request.host_url, music_url, kind="render", pass_job_id=True
+    )
+    return jsonify(_render_job_response(render_jobs.get(job_id))), 202
+
+def _render_job_response(job):
+    body = {
+        "job_id": job["id"],
+        "status": job["status"],
+        "success": job["status"] != "failed",
+        "progress": job["progress"],
+        "status_url": url_for("video.get_render_job", job_id=job["id"]),
+        "events_url": url_for("video.render_job_events", job_id=job["id"]),
+    }
+    if job["status"] == "completed":
+        body["result"] = job["result"]
+        body["compiled_video_url"] = job["result"]["compiled_video_url"]
+    elif job["status"] == "failed":
+        body["error"] = job["error"]
+    return body
+
+@video_bp.route('/api/render/<job_id>', methods=['GET'])
+def get_render_job(job_id):
+    """Return status and per-stage progress of a render job"""
+    job = render_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Unknown job id", "success": False}), 404
+    return jsonify(_render_job_response(job))
+
+@video_bp.route('/api/render/<job_id>/events', methods=['GET'])
+def render_job_events(job_id):
+    """Stream progress of a render job as server-sent events"""
+    if not render_jobs.get(job_id):
+        return jsonify({"error": "Unknown job id", "success": False}), 404
+    return sse_response(render_jobs, job_id)
+
 # @app.route('/api/compile-videos', methods=['POST'])
 # def compile_videos():
 #     data = request.get_json() or {}
@@ -221,13 +547,20 @@ def compile_videos():
 
 #     return jsonify({"success": True, "compiled_video_url": public_url})
 
+# Assets are served by serve_static, which knows about the storage backend
+app = Flask(__name__, static_folder=None)
+CORS(app)
+app.register_blueprint(video_bp)
+app.add_url_rule('/', 'health_check', health_check, methods=['GET'])
+instrument_app(app, "video")
+
 if __name__ == '__main__':
     logger.info("🎬 Starting Video Generation Service on port 5002...")
     logger.info("🔑 Make sure your LUMA_API_KEY is set in your environment")
-    logger.info("📁 Static files will be served from ./static/")
+    logger.info(f"📁 Assets are stored with the {storage.name} backend")
 
     # Create static directory
-    static_dir = os.path.join(os.path.dirname(__file__), 'static')
-    os.makedirs(static_dir, exist_ok=True)
+    if getattr(storage, 'root', None):
+        os.makedirs(storage.root, exist_ok=True)
 
     app.run(host='0.0.0.0', port=5002, debug=True)
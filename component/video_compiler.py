@@ -2,134 +2,864 @@
 Simple video compilation service using moviepy
 """
 
+import hashlib
+import json
 import os
+import re
+import shutil
+import subprocess
+import sys
 import tempfile
+import threading
+import time
 import requests
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from requests.adapters import HTTPAdapter
 from moviepy.editor import VideoFileClip, concatenate_videoclips
 import logging
 
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'api'))
+from metrics import track_call, record_bytes, record_cache
+from janitor import pinned
+from keyed_lock import KeyedLock
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def download_video(url, filename):
-    """Download a video from URL to local file"""
+# Put the moov atom first so browsers can start playback before the whole file arrives
+FASTSTART = ["-movflags", "+faststart"]
+
+def get_ffmpeg_exe():
+    """Return the ffmpeg binary bundled with moviepy, or the one on PATH"""
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return shutil.which("ffmpeg") or "ffmpeg"
+
+def _probe_with_ffprobe(ffprobe, path):
+    result = subprocess.run(
+        [ffprobe, "-v", "error", "-print_format", "json", "-show_streams", "-show_format", path],
+        capture_output=True, text=True, check=True
+    )
+    data = json.loads(result.stdout)
+    info = {"video": None, "audio": None, "duration": float(data.get("format", {}).get("duration") or 0)}
+
+    for stream in data.get("streams", []):
+        if stream.get("codec_type") == "video" and info["video"] is None:
+            info["video"] = {
+                "codec": stream.get("codec_name"),
+                "profile": stream.get("profile"),
+                "pix_fmt": stream.get("pix_fmt"),
+                "width": stream.get("width"),
+                "height": stream.get("height"),
+                "fps": stream.get("r_frame_rate"),
+                "time_base": stream.get("time_base"),
+            }
+        elif stream.get("codec_type") == "audio" and info["audio"] is None:
+            info["audio"] = {
+                "codec": stream.get("codec_name"),
+                "sample_rate": stream.get("sample_rate"),
+                "channels": stream.get("channels"),
+            }
+    return info
+
+def _probe_with_ffmpeg(path):
+    # ffmpeg prints stream information to stderr and exits non-zero without an output file
+    result = subprocess.run(
+        [get_ffmpeg_exe(), "-hide_banner", "-i", path],
+        capture_output=True, text=True
+    )
+    output = result.stderr
+    info = {"video": None, "audio": None, "duration": 0.0}
+
+    duration = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", output)
+    if duration:
+        hours, minutes, seconds = duration.groups()
+        info["duration"] = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    video = re.search(r"Stream #\S+.*?: Video: (\w+)(?: \(([^)]*)\))?.*?, (\w+)(?:\([^)]*\))?, (\d+)x(\d+)", output)
+    if video:
+        codec, profile, pix_fmt, width, height = video.groups()
+        line = output[video.start():output.find("\n", video.start())]
+        fps = re.search(r"([\d.]+) fps", line)
+        tbn = re.search(r"([\d.]+k?) tbn", line)
+        info["video"] = {
+            "codec": codec,
+            "profile": profile,
+            "pix_fmt": pix_fmt,
+            "width": int(width),
+            "height": int(height),
+            "fps": fps.group(1) if fps else None,
+            "time_base": tbn.group(1) if tbn else None,
+        }
+
+    audio = re.search(r"Stream #\S+.*?: Audio: (\w+).*?, (\d+) Hz, ([^,]+)", output)
+    if audio:
+        codec, sample_rate, channels = audio.groups()
+        info["audio"] = {"codec": codec, "sample_rate": sample_rate, "channels": channels.strip()}
+
+    if info["video"] is None:
+        raise RuntimeError(f"No video stream found in {path}")
+    return info
+
+def probe_video(path):
+    """
+    Inspect a video file's streams.
+
+    Uses ffprobe when it is installed, otherwise parses the banner printed by ffmpeg.
+
+    :param path: Path to a local video file
+    :return: Dict with "video" and "audio" stream parameters (or None) and "duration" in seconds
+    """
+    ffprobe = shutil.which("ffprobe")
+    if ffprobe:
+        return _probe_with_ffprobe(ffprobe, path)
+    return _probe_with_ffmpeg(path)
+
+def can_stream_copy(paths):
+    """
+    Check whether the files share codec, resolution, frame rate and audio layout
+    so they can be joined without re-encoding.
+
+    :param paths: List of local video file paths
+    :return: True if a container-level concat is safe
+    """
+    signatures = set()
+    for path in paths:
+        try:
+            info = probe_video(path)
+        except Exception as e:
+            logger.warning(f"⚠️  Could not probe {path}: {e}")
+            return False
+        signatures.add(json.dumps({"video": info["video"], "audio": info["audio"]}, sort_keys=True))
+    return len(signatures) == 1
+
+def concat_stream_copy(paths, output_path):
+    """
+    Join videos with the ffmpeg concat demuxer, copying the streams as-is.
+
+    :param paths: List of local video file paths with identical stream parameters
+    :param output_path: Path for the joined video
+    :return: True on success
+    """
+    list_fd, list_path = tempfile.mkstemp(suffix=".txt")
+    try:
+        with os.fdopen(list_fd, "w", encoding="utf-8") as f:
+            for path in paths:
+                escaped = os.path.abspath(path).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+
+        result = subprocess.run(
+            [get_ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-y",
+             "-f", "concat", "-safe", "0", "-i", list_path,
+             "-c", "copy"] + FASTSTART + [output_path],
+            capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            logger.warning(f"⚠️  Stream-copy concat failed: {result.stderr.strip()}")
+            return False
+        return os.path.isfile(output_path)
+    finally:
+        try:
+            os.remove(list_path)
+        except OSError:
+            pass
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_RETRIES = 3
+DOWNLOAD_WORKERS = int(os.getenv("VIDEO_DOWNLOAD_WORKERS", "8"))
+CLIP_CACHE_DIR = os.getenv(
+    "VIDEO_CLIP_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".cache", "clips"),
+)
+
+_session = None
+_session_lock = threading.Lock()
+_clip_locks = KeyedLock()
+_segment_locks = KeyedLock()
+
+def get_session():
+    """Return the shared keep-alive session used for clip downloads"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=max(DOWNLOAD_WORKERS, 10))
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+def download_video(url, filename, session=None, retries=DOWNLOAD_RETRIES):
+    """
+    Download a video from URL to local file.
+
+    Data is written to a .part file first; if the connection drops, the next
+    attempt resumes from the bytes already on disk with an HTTP Range request.
+
+    :param url: Video URL
+    :param filename: Destination path
+    :param session: requests.Session to use (default: the shared download session)
+    :param retries: Number of attempts before giving up
+    :return: Response headers of the successful download, or None on failure
+    """
+    session = session or get_session()
+    # Unique per caller so concurrent downloads of the same clip never interleave
+    part_path = f"{filename}.{os.getpid()}.{threading.get_ident()}.part"
+    
+    for attempt in range(1, retries + 1):
+        try:
+            offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            headers = {"Range": f"bytes={offset}-"} if offset else {}
+            logger.info(f"📥 Downloading video: {url}" + (f" (resuming at {offset} bytes)" if offset else ""))
+            
+            with track_call("clip_host", "download") as call, \
+                    session.get(url, stream=True, headers=headers, timeout=(10, 60)) as response:
+                call.status = response.status_code
+                if offset and response.status_code == 416:
+                    # Nothing left to fetch; the .part file is already complete
+                    os.replace(part_path, filename)
+                    return response.headers
+                response.raise_for_status()
+                
+                # A server that ignores Range sends the whole body again
+                mode = 'ab' if offset and response.status_code == 206 else 'wb'
+                with open(part_path, mode) as f:
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+                        record_bytes("clip_host", "in", len(chunk))
+                
+                os.replace(part_path, filename)
+                logger.info(f"✅ Downloaded: {filename}")
+                return response.headers
+        except Exception as e:
+            logger.warning(f"⚠️  Download attempt {attempt}/{retries} failed for {url}: {e}")
+            if attempt < retries:
+                time.sleep(min(2 ** attempt, 10))
+    
+    logger.error(f"❌ Failed to download {url}")
+    try:
+        os.remove(part_path)
+    except OSError:
+        pass
+    return None
+
+def _cache_key(value):
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+def _lookup_cached_clip(url):
+    path = os.path.join(CLIP_CACHE_DIR, f"{_cache_key(url)}.mp4")
+    if os.path.isfile(path):
+        now = time.time()
+        os.utime(path, (now, now))
+        return path
+    return None
+
+def _link_etag(etag, path):
+    """Record which cached file holds the content for an ETag"""
+    index_path = os.path.join(CLIP_CACHE_DIR, f"etag_{_cache_key(etag)}.json")
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump({"path": os.path.basename(path)}, f)
+
+def _lookup_etag(etag):
+    index_path = os.path.join(CLIP_CACHE_DIR, f"etag_{_cache_key(etag)}.json")
     try:
-        logger.info(f"📥 Downloading video: {url}")
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
+        with open(index_path, 'r', encoding='utf-8') as f:
+            path = os.path.join(CLIP_CACHE_DIR, json.load(f)["path"])
+    except (OSError, ValueError, KeyError):
+        return None
+    return path if os.path.isfile(path) else None
+
+def fetch_clip(url, use_cache=True, dest_dir=None):
+    """
+    Return a local path for a clip, downloading it only when needed.
+
+    Clips are cached by URL; a HEAD request's ETag also lets a new URL reuse
+    identical content that is already on disk.
+
+    :param url: Video URL
+    :param use_cache: Reuse and populate the local clip cache
+    :param dest_dir: Download directory when the cache is not used
+    :return: Local file path or None if the download failed
+    """
+    if not use_cache:
+        filename = os.path.join(dest_dir or tempfile.mkdtemp(), f"{_cache_key(url)}.mp4")
+        return filename if download_video(url, filename) is not None else None
+    
+    os.makedirs(CLIP_CACHE_DIR, exist_ok=True)
+    
+    # Concurrent compilations of the same film wait for one download
+    with _clip_locks.hold(url):
+        return _fetch_clip_to_cache(url)
+
+def _fetch_clip_to_cache(url):
+    cached = _lookup_cached_clip(url)
+    record_cache("clips", bool(cached))
+    if cached:
+        logger.info(f"⚡ Using cached clip for {url}")
+        return cached
+    
+    path = os.path.join(CLIP_CACHE_DIR, f"{_cache_key(url)}.mp4")
+    
+    try:
+        etag = get_session().head(url, allow_redirects=True, timeout=10).headers.get("ETag")
+    except Exception:
+        etag = None
+    if etag:
+        existing = _lookup_etag(etag)
+        if existing:
+            logger.info(f"⚡ Reusing cached clip with matching ETag for {url}")
+            shutil.copyfile(existing, path)
+            return path
+    
+    headers = download_video(url, path)
+    if headers is None:
+        return None
+    
+    etag = headers.get("ETag") or etag
+    if etag:
+        _link_etag(etag, path)
+    return path
+
+def download_videos(video_urls, use_cache=True, dest_dir=None, max_workers=DOWNLOAD_WORKERS):
+    """
+    Fetch all clips concurrently over the shared session.
+
+    :param video_urls: List of video URLs
+    :param use_cache: Reuse and populate the local clip cache
+    :param dest_dir: Download directory when the cache is not used
+    :param max_workers: Maximum number of parallel downloads
+    :return: List of local paths (None for failed downloads), in input order
+    """
+    if not video_urls:
+        return []
+    
+    workers = max(1, min(max_workers, len(video_urls)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="clip-download") as pool:
+        return list(pool.map(lambda url: fetch_clip(url, use_cache, dest_dir), video_urls))
+
+DEFAULT_MUSIC_VOLUME = float(os.getenv("MUSIC_BED_VOLUME", "0.25"))
+AUDIO_SAMPLE_RATE = 48000
+AUDIO_BITRATE = "192k"
+
+def _audio_sources(audio):
+    """Normalize a scene's audio entry (None, a path/URL, or a list of them) to a list"""
+    if not audio:
+        return []
+    return [audio] if isinstance(audio, str) else [source for source in audio if source]
+
+def mux_audio(video_path, output_path, scene_starts, scene_audio, total_duration,
+              music=None, music_volume=DEFAULT_MUSIC_VOLUME):
+    """
+    Lay audio tracks under a video, copying the video stream untouched.
+
+    Each scene's lines are played back to back starting at that scene's
+    offset; an optional music bed is looped, lowered and trimmed to the film.
+    Only the mixed audio track is encoded.
+
+    :param video_path: Joined video
+    :param output_path: Path for the video with sound
+    :param scene_starts: Start time in seconds of every scene
+    :param scene_audio: Per-scene audio entries aligned with scene_starts
+    :param total_duration: Length of the video in seconds
+    :param music: Optional music bed path or URL
+    :param music_volume: Gain applied to the music bed
+    :return: True on success
+    """
+    audio_format = f"aresample={AUDIO_SAMPLE_RATE},aformat=sample_fmts=fltp:channel_layouts=stereo"
+    inputs = ["-i", video_path]
+    filters = []
+    mix = []
+    index = 1
+
+    # Keep any sound the clips already carry
+    if probe_video(video_path)["audio"]:
+        filters.append(f"[0:a]{audio_format}[orig]")
+        mix.append("[orig]")
+
+    for scene, (start, audio) in enumerate(zip(scene_starts, scene_audio)):
+        labels = []
+        for source in _audio_sources(audio):
+            inputs += ["-i", source]
+            filters.append(f"[{index}:a]{audio_format}[a{index}]")
+            labels.append(f"[a{index}]")
+            index += 1
+        if not labels:
+            continue
+        delay = int(round(start * 1000))
+        # Lines of one scene play back to back
+        joined = "".join(labels) + (f"concat=n={len(labels)}:v=0:a=1," if len(labels) > 1 else "")
+        filters.append(f"{joined}adelay={delay}|{delay}[s{scene}]")
+        mix.append(f"[s{scene}]")
+
+    if music:
+        inputs += ["-stream_loop", "-1", "-i", music]
+        filters.append(f"[{index}:a]{audio_format},volume={music_volume},atrim=0:{total_duration:.3f}[music]")
+        mix.append("[music]")
+        index += 1
+
+    if not mix:
+        shutil.copyfile(video_path, output_path)
+        return True
+
+    if len(mix) > 1:
+        # amix divides each input by the input count; restore the level and guard against clipping
+        filters.append(f"{''.join(mix)}amix=inputs={len(mix)}:duration=longest:dropout_transition=0,"
+                       f"volume={len(mix)},alimiter=limit=0.95[mixed]")
+    else:
+        filters.append(f"{mix[0]}anull[mixed]")
+    filters.append(f"[mixed]apad,atrim=0:{total_duration:.3f}[aout]")
+
+    result = subprocess.run(
+        [get_ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-y"] + inputs +
+        ["-filter_complex", ";".join(filters),
+         "-map", "0:v", "-map", "[aout]",
+         "-c:v", "copy", "-c:a", "aac", "-b:a", AUDIO_BITRATE] + FASTSTART +
+        [output_path],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        logger.error(f"❌ Audio mux failed: {result.stderr.strip()}")
+        return False
+    return os.path.isfile(output_path)
+
+SEGMENT_CACHE_DIR = os.getenv(
+    "VIDEO_SEGMENT_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".cache", "segments"),
+)
+# Target format for clips that have to be re-encoded before they can be joined
+SEGMENT_WIDTH = int(os.getenv("VIDEO_SEGMENT_WIDTH", "1280"))
+SEGMENT_HEIGHT = int(os.getenv("VIDEO_SEGMENT_HEIGHT", "720"))
+SEGMENT_FPS = int(os.getenv("VIDEO_SEGMENT_FPS", "24"))
+SEGMENT_PRESET = os.getenv("VIDEO_SEGMENT_PRESET", "veryfast")
+SEGMENT_CRF = int(os.getenv("VIDEO_SEGMENT_CRF", "20"))
+# Output quality tiers. "preview" is a quick low-resolution cut to look at while the full one renders
+SEGMENT_PROFILES = {
+    "full": {
+        "width": SEGMENT_WIDTH, "height": SEGMENT_HEIGHT, "fps": SEGMENT_FPS,
+        "preset": SEGMENT_PRESET, "crf": SEGMENT_CRF, "maxrate": None, "audio_bitrate": AUDIO_BITRATE,
+    },
+    "preview": {
+        "width": int(os.getenv("VIDEO_PREVIEW_WIDTH", "640")),
+        "height": int(os.getenv("VIDEO_PREVIEW_HEIGHT", "360")),
+        "fps": SEGMENT_FPS, "preset": "ultrafast", "crf": 30,
+        "maxrate": os.getenv("VIDEO_PREVIEW_MAXRATE", "800k"), "audio_bitrate": "96k",
+    },
+}
+# Bump when the segment command changes so stale segments are not reused
+SEGMENT_VERSION = 2
+# Parallel segment encodes: at most one per core, and no more than available
+# memory allows at roughly VIDEO_SEGMENT_ENCODE_MB per ffmpeg process
+SEGMENT_WORKERS = int(os.getenv("VIDEO_SEGMENT_WORKERS", "0"))
+SEGMENT_ENCODE_MEMORY = int(os.getenv("VIDEO_SEGMENT_ENCODE_MB", "400")) * 1024 * 1024
+
+def _cpu_count():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+# Shared by concurrent compilations so they do not oversubscribe the machine together
+_encode_slots = threading.BoundedSemaphore(SEGMENT_WORKERS or _cpu_count())
+
+# Least recently used first: path -> (size, mtime, digest)
+FILE_DIGEST_MEMO_SIZE = 4096
+_file_digests = OrderedDict()
+_file_digests_lock = threading.Lock()
+
+def _file_digest(source):
+    """Content hash of a local file (memoized by size and mtime); URLs are identified by themselves"""
+    if not os.path.isfile(source):
+        return f"url:{source}"
+    stat = os.stat(source)
+    path = os.path.abspath(source)
+    version = (stat.st_size, stat.st_mtime_ns)
+    with _file_digests_lock:
+        memo = _file_digests.get(path)
+        if memo and memo[:2] == version:
+            _file_digests.move_to_end(path)
+            return memo[2]
+
+    sha = hashlib.sha256()
+    with open(source, 'rb') as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b''):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+
+    with _file_digests_lock:
+        # A changed file replaces its old entry
+        _file_digests[path] = version + (digest,)
+        _file_digests.move_to_end(path)
+        while len(_file_digests) > FILE_DIGEST_MEMO_SIZE:
+            _file_digests.popitem(last=False)
+    return digest
+
+def segment_key(clip_path, audio=None, reencode=False, quality="full"):
+    """
+    Cache key of a scene segment: the clip's content, the scene's audio and the
+    output parameters, so any change to one of them yields a new segment.
+
+    :return: Hex SHA-256 digest
+    """
+    profile = SEGMENT_PROFILES[quality]
+    payload = {
+        "version": SEGMENT_VERSION,
+        "clip": _file_digest(clip_path),
+        "audio": [_file_digest(source) for source in _audio_sources(audio)],
+        "video": dict(profile, mode="encode") if reencode else {"mode": "copy"},
+        "audio_format": {"sample_rate": AUDIO_SAMPLE_RATE, "bitrate": profile["audio_bitrate"]},
+    }
+    return _cache_key(json.dumps(payload, sort_keys=True))
+
+def _available_memory():
+    """MemAvailable from /proc/meminfo in bytes, or None where it is not available"""
+    try:
+        with open("/proc/meminfo", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+def segment_workers(count):
+    """
+    Number of segments to encode at once.
+
+    :param count: Number of segments to build
+    :return: Workers bounded by cores (or VIDEO_SEGMENT_WORKERS), free memory and count
+    """
+    workers = SEGMENT_WORKERS or _cpu_count()
+    memory = _available_memory()
+    if memory is not None:
+        workers = min(workers, max(1, memory // SEGMENT_ENCODE_MEMORY))
+    return max(1, min(workers, count))
+
+def _segment_command(clip_path, info, audio, reencode, output_path, threads=0, quality="full"):
+    audio_format = f"aresample={AUDIO_SAMPLE_RATE},aformat=sample_fmts=fltp:channel_layouts=stereo"
+    duration = info["duration"]
+    inputs = ["-i", clip_path]
+    filters = []
+    mix = []
+
+    profile = SEGMENT_PROFILES[quality]
+    if reencode:
+        width, height = profile["width"], profile["height"]
+        filters.append(
+            f"[0:v]scale={width}:{height}:force_original_aspect_ratio=decrease,"
+            f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,"
+            f"fps={profile['fps']},format=yuv420p[vout]"
+        )
+        video_args = ["-map", "[vout]", "-c:v", "libx264", "-preset", profile["preset"],
+                      "-crf", str(profile["crf"])]
+        if profile["maxrate"]:
+            video_args += ["-maxrate", profile["maxrate"], "-bufsize", profile["maxrate"]]
+        if threads:
+            video_args += ["-threads", str(threads)]
+    else:
+        video_args = ["-map", "0:v", "-c:v", "copy"]
+
+    if info["audio"]:
+        filters.append(f"[0:a]{audio_format}[orig]")
+        mix.append("[orig]")
+
+    labels = []
+    for index, source in enumerate(_audio_sources(audio), start=1):
+        inputs += ["-i", source]
+        filters.append(f"[{index}:a]{audio_format}[a{index}]")
+        labels.append(f"[a{index}]")
+    if labels:
+        # Lines of one scene play back to back from its first frame
+        joined = "".join(labels) + (f"concat=n={len(labels)}:v=0:a=1," if len(labels) > 1 else "")
+        filters.append(f"{joined}anull[speech]")
+        mix.append("[speech]")
+
+    # Every segment carries a track of the same format so the final concat can copy it
+    if not mix:
+        filters.append(f"anullsrc=r={AUDIO_SAMPLE_RATE}:cl=stereo,atrim=0:{duration:.3f}[aout]")
+    else:
+        if len(mix) > 1:
+            filters.append(f"{''.join(mix)}amix=inputs={len(mix)}:duration=longest:dropout_transition=0,"
+                           f"volume={len(mix)},alimiter=limit=0.95[mixed]")
+        else:
+            filters.append(f"{mix[0]}anull[mixed]")
+        filters.append(f"[mixed]apad,atrim=0:{duration:.3f}[aout]")
+
+    return ([get_ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-y"] + inputs +
+            ["-filter_complex", ";".join(filters)] + video_args +
+            ["-map", "[aout]", "-c:a", "aac", "-b:a", profile["audio_bitrate"],
+             "-ar", str(AUDIO_SAMPLE_RATE)] + FASTSTART + ["-f", "mp4", output_path])
+
+def build_segment(clip_path, audio=None, reencode=False, cache_dir=SEGMENT_CACHE_DIR, threads=0,
+                  quality="full"):
+    """
+    Build (or reuse) the normalized segment of one scene.
+
+    A segment is the scene's clip with its audio laid under it, encoded so all
+    segments of a film can be joined with a stream copy. Segments are stored by
+    segment_key(), so re-rendering a film after editing one scene rebuilds only
+    that scene's segment.
+
+    :param clip_path: Local clip of the scene
+    :param audio: The scene's audio entry (None, a path/URL, or a list of them)
+    :param reencode: Re-encode the picture to the segment format instead of copying it
+    :param cache_dir: Directory holding the segments
+    :param threads: Encoder threads (0 lets ffmpeg decide)
+    :param quality: Key of SEGMENT_PROFILES to encode with
+    :return: Path of the segment or None on failure
+    """
+    key = segment_key(clip_path, audio, reencode, quality)
+    path = os.path.join(cache_dir, f"{key}.mp4")
+    os.makedirs(cache_dir, exist_ok=True)
+
+    with _segment_locks.hold(key):
+        hit = os.path.isfile(path)
+        record_cache("segments", hit)
+        if hit:
+            now = time.time()
+            os.utime(path, (now, now))
+            logger.info(f"⚡ Reusing segment for {os.path.basename(clip_path)}")
+            return path
+
+        part_path = f"{path}.{os.getpid()}.part"
+        command = _segment_command(clip_path, probe_video(clip_path), audio, reencode, part_path, threads,
+                                   quality)
+        with _encode_slots:
+            result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0 or not os.path.isfile(part_path):
+            logger.error(f"❌ Building segment for {clip_path} failed: {result.stderr.strip()}")
+            try:
+                os.remove(part_path)
+            except OSError:
+                pass
+            return None
+        os.replace(part_path, path)
+        logger.info(f"🧩 Built segment for {os.path.basename(clip_path)}")
+        return path
+
+def build_segments(clip_paths, clip_audio, cache_dir=SEGMENT_CACHE_DIR, quality="full"):
+    """
+    Build the segments of a film in parallel. Full quality re-encodes the
+    picture only when the clips differ in video parameters; previews always do.
+
+    :param clip_paths: Local clips in scene order
+    :param clip_audio: Per-scene audio entries aligned with clip_paths
+    :param cache_dir: Directory holding the segments
+    :param quality: Key of SEGMENT_PROFILES
+    :return: List of segment paths, or None if any segment failed
+    """
+    signatures = {json.dumps(probe_video(path)["video"], sort_keys=True) for path in clip_paths}
+    reencode = quality != "full" or len(signatures) > 1
+    if quality != "full":
+        logger.info(f"🔁 Encoding {quality} segments...")
+    elif reencode:
+        logger.info("🔁 Clips differ in video parameters, normalizing segments...")
+
+    # Each segment is its own ffmpeg process; split the cores between them
+    workers = segment_workers(len(clip_paths))
+    threads = max(1, _cpu_count() // workers) if reencode else 0
+    logger.info(f"🧩 Building {len(clip_paths)} segment(s) with {workers} parallel encoder(s)")
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="segment-encode") as pool:
+        segments = list(pool.map(
+            lambda item: build_segment(item[0], item[1], reencode, cache_dir, threads, quality),
+            zip(clip_paths, clip_audio)
+        ))
+    if any(segment is None for segment in segments):
+        return None
+    return segments
+
+def _join_clips(clip_paths, output_path):
+    """Join local clips into output_path, with stream copy when possible. Returns True on success."""
+    # Fast path: identical stream parameters can be joined without re-encoding
+    if can_stream_copy(clip_paths):
+        logger.info("⚡ Inputs share codec parameters, concatenating with stream copy...")
+        if concat_stream_copy(clip_paths, output_path):
+            return True
+        logger.warning("⚠️  Falling back to re-encoding")
+    else:
+        logger.info("🔁 Inputs differ in codec parameters, re-encoding...")
+    
+    video_clips = []
+    try:
+        # Load video clips
+        logger.info(f"🎬 Loading {len(clip_paths)} video clips...")
+        for clip_path in clip_paths:
+            try:
+                clip = VideoFileClip(clip_path)
+                video_clips.append(clip)
+                logger.info(f"✅ Loaded clip: {os.path.basename(clip_path)} ({clip.duration:.1f}s)")
+            except Exception as e:
+                logger.error(f"❌ Failed to load {clip_path}: {e}")
         
-        with open(filename, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+        if not video_clips:
+            logger.error("❌ No video clips were loaded successfully")
+            return False
         
-        logger.info(f"✅ Downloaded: {filename}")
+        # Concatenate videos
+        logger.info("🔗 Concatenating videos...")
+        final_clip = concatenate_videoclips(video_clips)
+        
+        # Write final video
+        logger.info(f"💾 Writing final video to: {output_path}")
+        final_clip.write_videofile(
+            output_path,
+            codec='libx264',
+            audio_codec='aac',
+            temp_audiofile=f"{output_path}.temp-audio.m4a",
+            remove_temp=True,
+            ffmpeg_params=FASTSTART
+        )
+        final_clip.close()
         return True
+    finally:
+        for clip in video_clips:
+            try:
+                clip.close()
+            except Exception:
+                pass
+
+def _join_scenes(clip_paths, clip_audio, output_path, segment_dir, temp_files, quality="full"):
+    """
+    Join scene clips, with each scene's audio, into output_path.
+
+    Clips without scene audio that share stream parameters are joined as they
+    are. Otherwise every scene becomes a cached segment and the segments are
+    joined with a stream copy, so only edited scenes cost any encoding.
+    Returns True on success.
+    """
+    with_audio = any(_audio_sources(audio) for audio in clip_audio)
+    if not with_audio and quality == "full":
+        if len(clip_paths) == 1:
+            shutil.copyfile(clip_paths[0], output_path)
+            return True
+        if can_stream_copy(clip_paths):
+            logger.info("⚡ Inputs share codec parameters, concatenating with stream copy...")
+            if concat_stream_copy(clip_paths, output_path):
+                return True
+    
+    try:
+        segments = build_segments(clip_paths, clip_audio, segment_dir, quality)
     except Exception as e:
-        logger.error(f"❌ Failed to download {url}: {e}")
+        logger.error(f"❌ Building segments failed: {e}")
+        segments = None
+    if segments is not None:
+        # Segments outside the shared cache belong to this compilation only
+        if segment_dir != SEGMENT_CACHE_DIR:
+            temp_files.extend(segments)
+        logger.info(f"🔗 Joining {len(segments)} segment(s) with stream copy...")
+        if len(segments) == 1:
+            shutil.copyfile(segments[0], output_path)
+            return True
+        if concat_stream_copy(segments, output_path):
+            return True
+    
+    logger.warning("⚠️  Segment join failed, re-encoding the whole film")
+    if not with_audio:
+        return _join_clips(clip_paths, output_path)
+    
+    # Join the picture first, then encode only the audio on top of it
+    video_path = f"{output_path}.video-only.mp4"
+    temp_files.append(video_path)
+    if not _join_clips(clip_paths, video_path):
         return False
+    durations = [probe_video(path)["duration"] for path in clip_paths]
+    scene_starts = [sum(durations[:i]) for i in range(len(durations))]
+    return mux_audio(video_path, output_path, scene_starts, clip_audio, sum(durations))
 
-def compile_videos(video_urls, output_path="compiled_video.mp4"):
+def compile_videos(video_urls, output_path="compiled_video.mp4", use_cache=True,
+                   scene_audio=None, music=None, music_volume=DEFAULT_MUSIC_VOLUME, quality="full"):
     """
     Download and compile multiple videos into one
     
     :param video_urls: List of video URLs
     :param output_path: Path for the compiled video
-    :return: Path to compiled video or None if failed
+    :param use_cache: Reuse clips downloaded by earlier compilations
+    :param scene_audio: Optional per-scene audio aligned with video_urls; each entry is
+        None, a path/URL, or a list of them played back to back from the scene's start
+    :param music: Optional music bed path or URL, looped under the whole film
+    :param music_volume: Gain applied to the music bed
+    :param quality: "full", or "preview" for a fast low-resolution cut
+    :return: Path to compiled video, the source URL for a single silent clip at full quality, or None if failed
     """
     if not video_urls:
         logger.error("❌ No video URLs provided")
         return None
     
-    if len(video_urls) == 1:
+    scene_audio = list(scene_audio or [])
+    with_audio = bool(music) or any(_audio_sources(audio) for audio in scene_audio)
+    
+    # A preview still has to be scaled down, so only the full film can be the clip itself
+    if len(video_urls) == 1 and not with_audio and quality == "full":
         logger.info("📹 Only one video provided, returning original URL")
         return video_urls[0]
     
     temp_files = []
-    video_clips = []
+    clip_paths = []
+    clip_audio = []
+    temp_dir = None
+    # Inputs of this compilation are kept from the disk janitor until it is done
+    pins = ExitStack()
     
     try:
         # Create temporary directory
-        temp_dir = tempfile.mkdtemp()
+        temp_dir = tempfile.mkdtemp(prefix="directorai-compile-")
+        pins.enter_context(pinned(temp_dir))
         logger.info(f"📁 Using temp directory: {temp_dir}")
         
-        # Download all videos
-        for i, url in enumerate(video_urls):
-            temp_file = os.path.join(temp_dir, f"video_{i}.mp4")
-            
-            if download_video(url, temp_file):
-                temp_files.append(temp_file)
+        # Download all videos in parallel
+        for i, path in enumerate(download_videos(video_urls, use_cache, temp_dir)):
+            if path:
+                clip_paths.append(path)
+                clip_audio.append(scene_audio[i] if i < len(scene_audio) else None)
+                if not use_cache:
+                    temp_files.append(path)
             else:
                 logger.warning(f"⚠️  Skipping video {i} due to download failure")
         
-        if not temp_files:
+        if not clip_paths:
             logger.error("❌ No videos were downloaded successfully")
             return None
+        pins.enter_context(pinned(*clip_paths, *(source for audio in clip_audio for source in _audio_sources(audio))))
         
-        # Load video clips
-        logger.info(f"🎬 Loading {len(temp_files)} video clips...")
-        for temp_file in temp_files:
-            try:
-                clip = VideoFileClip(temp_file)
-                video_clips.append(clip)
-                logger.info(f"✅ Loaded clip: {os.path.basename(temp_file)} ({clip.duration:.1f}s)")
-            except Exception as e:
-                logger.error(f"❌ Failed to load {temp_file}: {e}")
+        # With a music bed the scenes are joined first and the music mixed in after
+        joined_path = os.path.join(temp_dir, "joined.mp4") if music else output_path
+        if music:
+            temp_files.append(joined_path)
         
-        if not video_clips:
-            logger.error("❌ No video clips were loaded successfully")
+        segment_dir = SEGMENT_CACHE_DIR if use_cache else temp_dir
+        if not _join_scenes(clip_paths, clip_audio, joined_path, segment_dir, temp_files, quality):
             return None
         
-        # Concatenate videos
-        logger.info("🔗 Concatenating videos...")
-        final_clip = concatenate_videoclips(video_clips)
-        
-        # Write final video
-        logger.info(f"💾 Writing final video to: {output_path}")
-        final_clip.write_videofile(
-            output_path,
-            codec='libx264',
-            audio_codec='aac',
-            temp_audiofile='temp-audio.m4a',
-            remove_temp=True
-        )
-        
-        # Clean up
-        for clip in video_clips:
-            clip.close()
-        final_clip.close()
-        
-        # Remove temporary files
-        for temp_file in temp_files:
-            try:
-                os.remove(temp_file)
-            except:
-                pass
-        
-        try:
-            os.rmdir(temp_dir)
-        except:
-            pass
+        if music:
+            logger.info("🎵 Mixing in the music bed...")
+            total_duration = probe_video(joined_path)["duration"]
+            if not mux_audio(joined_path, output_path, [], [], total_duration, music, music_volume):
+                return None
         
         logger.info(f"✅ Video compilation complete: {output_path}")
         return output_path
         
     except Exception as e:
         logger.error(f"❌ Video compilation failed: {e}")
+        return None
+    
+    finally:
+        pins.close()
         
-        # Clean up on error
-        for clip in video_clips:
-            try:
-                clip.close()
-            except:
-                pass
-        
+        # Remove temporary files
         for temp_file in temp_files:
             try:
                 os.remove(temp_file)
-            except:
+            except OSError:
                 pass
         
-        return None
+        # Whatever a failed step left behind goes with the directory
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
 
 if __name__ == "__main__":
     # Test with sample URLs
@@ -1,20 +1,34 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Blueprint, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 import sys
 import os
+import json
 from dotenv import load_dotenv
 
 load_dotenv()
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
 from writer import SceneGenerator
+from metrics import instrument_app
 import os
+import threading
 
-writer_app = Flask(__name__)
-CORS(writer_app)
+# Routes live on a blueprint so the gateway can mount them next to the other services
+writer_bp = Blueprint("writer", __name__)
 
 CLAUDE_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 
-@writer_app.route("/api/claude", methods=["POST"])
+_generator = None
+_generator_lock = threading.Lock()
+
+def get_generator():
+    """Return the long-lived SceneGenerator shared by all requests in this process"""
+    global _generator
+    with _generator_lock:
+        if _generator is None:
+            _generator = SceneGenerator(api_key=CLAUDE_API_KEY)
+        return _generator
+
+@writer_bp.route("/api/claude", methods=["POST"])
 def generate_claude_response():
     data = request.get_json()
     story = data.get("story")
@@ -22,11 +36,38 @@ def generate_claude_response():
     if not story:
         return jsonify({"error": "Missing story input"}), 400
 
-    generator = SceneGenerator(api_key=CLAUDE_API_KEY)
+    generator = get_generator()
 
     result = generator.generate_story_elements(story)
 
     return jsonify(result)
 
+@writer_bp.route("/api/claude/stream", methods=["POST"])
+def stream_claude_response():
+    """Stream background, characters and scenes as server-sent events while Claude writes them"""
+    data = request.get_json()
+    story = data.get("story")
+
+    if not story:
+        return jsonify({"error": "Missing story input"}), 400
+
+    generator = get_generator()
+
+    def events():
+        for event in generator.stream_story_elements(story):
+            payload = event.get("data") if "data" in event else {"error": event.get("error")}
+            yield f"event: {event['type']}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+writer_app = Flask(__name__)
+CORS(writer_app)
+writer_app.register_blueprint(writer_bp)
+instrument_app(writer_app, "writer")
+
 if __name__ == "__main__":
     writer_app.run(debug=True, port=5000)
@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""
+End-to-end throughput benchmark for the backend services.
+
+Drives the Flask services in component/ at chosen concurrency levels and
+reports p50/p95/p99 latency, throughput and service memory per stage.
+Results are saved as JSON so runs can be compared for regressions.
+
+Typical run against local provider stubs (no API credits used):
+
+    python scripts/benchmark.py --spawn --stages writer,image,video --concurrency 1,4,16
+
+Compare with an earlier run:
+
+    python scripts/benchmark.py --spawn --compare benchmarks/<earlier>.json
+"""
+
+import argparse
+import base64
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks")
+
+# Service each stage talks to, and the script that runs it
+SERVICES = {
+    "writer": {"url": "http://localhost:5000", "script": "component/writer_app.py"},
+    "image": {"url": "http://localhost:5001", "script": "component/image_app.py"},
+    "video": {"url": "http://localhost:5002", "script": "component/video_app.py"},
+}
+STAGE_SERVICES = {
+    "writer": "writer",
+    "writer_stream": "writer",
+    "image": "image",
+    "character": "image",
+    "video": "video",
+    "compile": "video",
+    "render": "video",
+}
+
+STORY = "A detective chases a thief across neon-lit rooftops on a rainy night."
+CHARACTER = {
+    "Name": "Detective Vega",
+    "Description": "Woman in her forties, long grey trench coat, short black hair, scar above the left eyebrow",
+    "Personality": "Dry humour, relentless",
+    "Role": "protagonist",
+}
+SCENE_DESCRIPTION = "Wide shot of a rain-soaked rooftop at night, neon signs flickering, a figure running toward the edge"
+
+
+def _tiny_png_data_uri():
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 36), (40, 40, 60)).save(buffer, "PNG")
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def _check(response):
+    response.raise_for_status()
+    body = response.json()
+    if isinstance(body, dict) and body.get("success") is False:
+        raise RuntimeError(body.get("error", "Request reported failure"))
+    return body
+
+
+def _call_writer(session, urls, args, index):
+    return _check(session.post(f"{urls['writer']}/api/claude", json={"story": STORY}, timeout=args.request_timeout))
+
+
+def _call_writer_stream(session, urls, args, index):
+    with session.post(f"{urls['writer']}/api/claude/stream", json={"story": STORY},
+                      stream=True, timeout=args.request_timeout) as response:
+        response.raise_for_status()
+        events = [line for line in response.iter_lines(decode_unicode=True) if line.startswith("event:")]
+    if not events or events[-1] != "event: complete":
+        raise RuntimeError(f"Stream ended without a complete event: {events[-1:] or 'no events'}")
+    return events
+
+
+def _call_image(session, urls, args, index):
+    body = _check(session.post(f"{urls['image']}/api/image",
+                               json={"description": f"{SCENE_DESCRIPTION} #{index}", "bypass_cache": True},
+                               timeout=args.request_timeout))
+    if body.get("type") == "placeholder":
+        raise RuntimeError("Image service fell back to a placeholder")
+    return body
+
+
+def _call_character(session, urls, args, index):
+    character = dict(CHARACTER, Name=f"{CHARACTER['Name']} {index}")
+    return _check(session.post(f"{urls['image']}/api/character-image",
+                               json={"character": character, "bypass_cache": True},
+                               timeout=args.request_timeout))
+
+
+def _call_video(session, urls, args, index):
+    payload = {"prompt": f"{SCENE_DESCRIPTION} #{index}", "imageUrl": args.image_data, "wait": True}
+    return _check(session.post(f"{urls['video']}/api/video", json=payload, timeout=args.request_timeout))
+
+
+def _call_compile(session, urls, args, index):
+    if not args.clip_urls:
+        raise RuntimeError("The compile stage needs --clip-url or --spawn")
+    return _check(session.post(f"{urls['video']}/api/compile-videos",
+                               json={"video_urls": args.clip_urls}, timeout=args.request_timeout))
+
+
+def _call_render(session, urls, args, index):
+    job = _check(session.post(f"{urls['video']}/api/render", json={"story": f"{STORY} ({index})"},
+                              timeout=args.request_timeout))
+    deadline = time.monotonic() + args.request_timeout
+    while job.get("status") not in ("completed", "failed"):
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Render {job['job_id']} did not finish in {args.request_timeout}s")
+        time.sleep(0.5)
+        job = session.get(f"{urls['video']}{job['status_url']}", timeout=30).json()
+    if job["status"] == "failed":
+        raise RuntimeError(job.get("error", "Render failed"))
+    return job
+
+
+STAGES = {
+    "writer": _call_writer,
+    "writer_stream": _call_writer_stream,
+    "image": _call_image,
+    "character": _call_character,
+    "video": _call_video,
+    "compile": _call_compile,
+    "render": _call_render,
+}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100.0 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _process_tree(pid):
+    pids = [pid]
+    for current in pids:
+        try:
+            for tid in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{tid}/children") as f:
+                    pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            continue
+    return pids
+
+
+def rss_mb(pid):
+    """Resident memory of a process and its children in MB (Linux only), or None"""
+    total = 0
+    found = False
+    for current in _process_tree(pid):
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+                        found = True
+                        break
+        except OSError:
+            continue
+    return round(total / 1024, 1) if found else None
+
+
+class MemorySampler:
+    """Samples the peak RSS of a service process in the background while a stage runs."""
+
+    def __init__(self, pid, interval=0.2):
+        self.pid = pid
+        self.interval = interval
+        self.start_mb = rss_mb(pid) if pid else None
+        self.peak_mb = self.start_mb
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            current = rss_mb(self.pid)
+            if current is not None and (self.peak_mb is None or current > self.peak_mb):
+                self.peak_mb = current
+
+    def __enter__(self):
+        if self.pid:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self.pid:
+            self._thread.join()
+        self.end_mb = rss_mb(self.pid) if self.pid else None
+
+
+def run_level(stage, concurrency, requests_per_level, urls, args, pid=None):
+    """
+    Issue requests_per_level calls to a stage with the given concurrency.
+
+    :return: Result dictionary with latency percentiles, throughput and memory
+    """
+    call = STAGES[stage]
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    latencies = []
+    errors = []
+
+    def timed(index):
+        started = time.perf_counter()
+        try:
+            call(session, urls, args, index)
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}"[:200])
+            return
+        latencies.append(time.perf_counter() - started)
+
+    with MemorySampler(pid) as memory:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(timed, range(requests_per_level)))
+        wall = time.perf_counter() - started
+
+    def ms(value):
+        return round(value * 1000, 1) if value is not None else None
+
+    return {
+        "stage": stage,
+        "concurrency": concurrency,
+        "requests": requests_per_level,
+        "ok": len(latencies),
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:5],
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 3) if wall else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(max(latencies) if latencies else None),
+        "rss_start_mb": memory.start_mb,
+        "rss_peak_mb": memory.peak_mb,
+        "rss_end_mb": memory.end_mb,
+    }
+
+
+def _wait_until_up(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(url, timeout=2)
+            return True
+        except requests.RequestException:
+            time.sleep(0.5)
+    return False
+
+
+def spawn_environment(args, services):
+    """
+    Start the provider stubs and the services under test, wired to the stubs.
+
+    :return: Tuple of (list of Popen, dict of service name -> pid)
+    """
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    stub_cmd = [
+        sys.executable, os.path.join(ROOT_DIR, "scripts", "provider-stubs.py"),
+        "--port", str(args.stub_port),
+        "--latency", str(args.stub_latency),
+        "--error-rate", str(args.stub_error_rate),
+        "--luma-seconds", str(args.stub_luma_seconds),
+        "--image-kb", str(args.stub_image_kb),
+    ]
+    work_dir = os.path.join(RESULTS_DIR, "work")
+    env = dict(
+        os.environ,
+        GEMINI_API_KEY="benchmark", ANTHROPIC_API_KEY="benchmark",
+        LUMA_API_KEY="benchmark", ELEVENLABS_API_KEY="benchmark",
+        GEMINI_BASE_URL=stub_url, ANTHROPIC_BASE_URL=stub_url, ELEVENLABS_BASE_URL=stub_url,
+        LUMA_API_URL=f"{stub_url}/dream-machine/v1/generations",
+        LUMA_EXPECTED_SECONDS=str(args.stub_luma_seconds),
+        GEMINI_IMAGE_CACHE_DIR=os.path.join(work_dir, "image_cache"),
+        VIDEO_CLIP_CACHE_DIR=os.path.join(work_dir, "clips"),
+        RENDERS_DIR=os.path.join(work_dir, "renders"),
+        ASSET_STORAGE_BACKEND="filesystem",
+        ASSET_STORAGE_ROOT=os.path.join(work_dir, "static"),
+        SCENE_STORAGE_BACKEND="filesystem",
+        # Keyframe URLs handed to the Luma stub must be absolute
+        ASSET_PUBLIC_URL=args.video_url,
+        PYTHONUNBUFFERED="1",
+    )
+
+    log_dir = os.path.join(RESULTS_DIR, "logs")
+    os.makedirs(log_dir, exist_ok=True)
+    processes = []
+    pids = {}
+
+    def start(name, cmd, url):
+        log = open(os.path.join(log_dir, f"{name}.log"), "w")
+        process = subprocess.Popen(cmd, cwd=ROOT_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+        processes.append(process)
+        if not _wait_until_up(url):
+            raise RuntimeError(f"{name} did not start; see {log.name}")
+        print(f"✅ Started {name} (pid {process.pid})")
+        return process.pid
+
+    try:
+        start("provider-stubs", stub_cmd, stub_url)
+        for name in services:
+            script = os.path.join(ROOT_DIR, SERVICES[name]["script"])
+            pids[name] = start(name, [sys.executable, script], SERVICES[name]["url"])
+    except Exception:
+        stop_environment(processes)
+        raise
+
+    args.clip_urls = args.clip_urls or [f"{stub_url}/media/benchmark-{i}.mp4" for i in range(3)]
+    return processes, pids
+
+
+def stop_environment(processes):
+    for process in reversed(processes):
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare a run against a baseline and print regressions.
+
+    :param threshold: Allowed relative slowdown, e.g. 0.1 for 10%
+    :return: List of regression descriptions
+    """
+    previous = {(r["stage"], r["concurrency"]): r for r in baseline["results"]}
+    regressions = []
+
+    print(f"\n📊 Comparison with {baseline.get('started_at', 'baseline')}:")
+    for result in results:
+        before = previous.get((result["stage"], result["concurrency"]))
+        if not before:
+            continue
+        label = f"{result['stage']} @ {result['concurrency']}"
+        for metric, worse_if_higher in (("p95_ms", True), ("p99_ms", True), ("throughput_rps", False)):
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            regressed = change > threshold if worse_if_higher else change < -threshold
+            marker = "❌" if regressed else "✅"
+            print(f"  {marker} {label} {metric}: {old} -> {new} ({change:+.1%})")
+            if regressed:
+                regressions.append(f"{label} {metric} {old} -> {new} ({change:+.1%})")
+    return regressions
+
+
+def print_table(results):
+    header = f"{'stage':<14}{'conc':>5}{'ok':>6}{'err':>5}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rss MB':>9}"
+    print("\n" + header)
+    print("-" * len(header))
+    for r in results:
+        def fmt(value):
+            return "-" if value is None else value
+        print(f"{r['stage']:<14}{r['concurrency']:>5}{r['ok']:>6}{r['errors']:>5}{fmt(r['throughput_rps']):>9}"
+              f"{fmt(r['p50_ms']):>10}{fmt(r['p95_ms']):>10}{fmt(r['p99_ms']):>10}{fmt(r['rss_peak_mb']):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the DirectorAI services.")
+    parser.add_argument("--stages", default="writer,image,video",
+                        help=f"Comma-separated stages: {', '.join(STAGES)}")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=0,
+                        help="Requests per level (default: 4x the concurrency, at least 8)")
+    parser.add_argument("--request-timeout", type=float, default=600)
+    parser.add_argument("--writer-url", default=SERVICES["writer"]["url"])
+    parser.add_argument("--image-url", default=SERVICES["image"]["url"])
+    parser.add_argument("--video-url", default=SERVICES["video"]["url"])
+    parser.add_argument("--clip-url", dest="clip_urls", action="append", default=[],
+                        help="Clip URL for the compile stage (repeatable)")
+    parser.add_argument("--pid", action="append", default=[],
+                        help="service=pid of an already running service, for memory sampling")
+    parser.add_argument("--spawn", action="store_true",
+                        help="Start provider stubs and the needed services wired to them")
+    parser.add_argument("--stub-port", type=int, default=5099)
+    parser.add_argument("--stub-latency", type=float, default=0.5)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--stub-luma-seconds", type=float, default=10.0)
+    parser.add_argument("--stub-image-kb", type=int, default=512)
+    parser.add_argument("--label", default="", help="Free-form label stored with the results")
+    parser.add_argument("--output", help="Results file (default: benchmarks/<timestamp>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative slowdown treated as a regression (default: 0.10)")
+    args = parser.parse_args()
+
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(unknown)}")
+    levels = [int(level) for level in args.concurrency.split(",")]
+    urls = {"writer": args.writer_url, "image": args.image_url, "video": args.video_url}
+    pids = dict(item.split("=", 1) for item in args.pid)
+    pids = {name: int(pid) for name, pid in pids.items()}
+    args.image_data = _tiny_png_data_uri()
+
+    processes = []
+    if args.spawn:
+        needed = sorted({STAGE_SERVICES[stage] for stage in stages})
+        processes, pids = spawn_environment(args, needed)
+
+    run = {
+        "label": args.label,
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "spawned": args.spawn,
+        "stub": {
+            "latency": args.stub_latency, "error_rate": args.stub_error_rate,
+            "luma_seconds": args.stub_luma_seconds, "image_kb": args.stub_image_kb,
+        } if args.spawn else None,
+        "results": [],
+    }
+
+    try:
+        for stage in stages:
+            for concurrency in levels:
+                count = args.requests or max(8, concurrency * 4)
+                print(f"🏃 {stage}: {count} requests at concurrency {concurrency}...")
+                result = run_level(stage, concurrency, count, urls, args, pids.get(STAGE_SERVICES[stage]))
+                run["results"].append(result)
+                print(f"   {result['ok']} ok, {result['errors']} errors, p95 {result['p95_ms']} ms, "
+                      f"{result['throughput_rps']} req/s")
+                for sample in result["error_samples"]:
+                    print(f"   ⚠️ {sample}")
+    finally:
+        stop_environment(processes)
+
+    print_table(run["results"])
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(run, f, indent=2)
+    print(f"\n💾 Results saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(run["results"], baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            sys.exit(1)
+        print("\n✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
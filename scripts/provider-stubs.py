@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Local stand-in server for the paid providers used by the backend.
+
+Serves just enough of the Gemini, Anthropic, Luma and ElevenLabs HTTP APIs for
+the services to run end to end without spending credits, with configurable
+latency, error rate and payload sizes. Point the services at it with:
+
+    GEMINI_BASE_URL=http://localhost:5099
+    ANTHROPIC_BASE_URL=http://localhost:5099
+    LUMA_API_URL=http://localhost:5099/dream-machine/v1/generations
+    ELEVENLABS_BASE_URL=http://localhost:5099
+"""
+
+import argparse
+import base64
+import io
+import json
+import os
+import random
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+
+from flask import Flask, Response, jsonify, request, send_file, stream_with_context
+
+app = Flask(__name__)
+
+# Replaced by the parsed command line in main()
+config = argparse.Namespace(
+    latency=0.5, jitter=0.1, error_rate=0.0,
+    gemini_latency=None, anthropic_latency=None, elevenlabs_latency=None,
+    luma_seconds=10.0, image_kb=512, video_seconds=5, audio_seconds=3,
+    scenes=5, characters=2, chunk_chars=40, chunk_delay=0.02,
+)
+
+_stats = {}
+_stats_lock = threading.Lock()
+_generations = {}
+_generations_lock = threading.Lock()
+_assets = {}
+_assets_lock = threading.Lock()
+
+
+def _count(provider, outcome):
+    with _stats_lock:
+        counts = _stats.setdefault(provider, {"ok": 0, "error": 0})
+        counts[outcome] += 1
+
+
+def _simulate(provider, latency=None):
+    """
+    Sleep for the configured latency, then decide whether the call fails.
+
+    :return: An error response to return instead of the real payload, or None
+    """
+    if latency is None:
+        latency = config.latency
+    time.sleep(max(0.0, latency + random.uniform(0, config.jitter)))
+
+    if random.random() < config.error_rate:
+        _count(provider, "error")
+        status = random.choice([429, 500, 503])
+        return jsonify({"error": {"code": status, "message": f"Simulated {provider} failure"}}), status
+
+    _count(provider, "ok")
+    return None
+
+
+def _ffmpeg_asset(name, args, suffix):
+    """Render a small media file with ffmpeg once, or None when ffmpeg is unavailable"""
+    with _assets_lock:
+        if name in _assets:
+            return _assets[name]
+        path = os.path.join(tempfile.gettempdir(), f"provider_stub_{name}{suffix}")
+        try:
+            import imageio_ffmpeg
+            subprocess.run(
+                [imageio_ffmpeg.get_ffmpeg_exe(), "-y", "-loglevel", "error"] + args + [path],
+                check=True,
+            )
+        except Exception as e:
+            print(f"⚠️ Could not render {name} with ffmpeg, serving random bytes: {e}")
+            path = None
+        _assets[name] = path
+        return path
+
+
+def _png_bytes():
+    """Noise image of roughly image_kb (noise does not compress), encoded once"""
+    with _assets_lock:
+        if "png" not in _assets:
+            from PIL import Image
+
+            side = max(16, int((config.image_kb * 1024 / 3) ** 0.5))
+            image = Image.frombytes("RGB", (side, side), os.urandom(side * side * 3))
+            buffer = io.BytesIO()
+            image.save(buffer, "PNG")
+            _assets["png"] = buffer.getvalue()
+        return _assets["png"]
+
+
+def _story_json():
+    characters = [
+        {
+            "Name": f"Character {i + 1}",
+            "Description": "A stand-in character in a grey coat, mid thirties, short dark hair",
+            "Personality": "Calm and observant",
+            "Role": "protagonist" if i == 0 else "supporting",
+        }
+        for i in range(config.characters)
+    ]
+    scenes = [
+        {
+            "Scene": i + 1,
+            "Description": "Wide shot of a rain-soaked city street at night, neon reflections, slow dolly forward, film noir mood",
+            "Dialogue": f"Character 1: Line number {i + 1}.",
+        }
+        for i in range(config.scenes)
+    ]
+    return json.dumps({
+        "Background": "A sprawling stand-in city used for load testing.",
+        "Characters": characters,
+        "Scenes": scenes,
+    })
+
+
+# Gemini
+
+@app.route("/<version>/models/<path:model_action>", methods=["POST"])
+def gemini_generate(version, model_action):
+    model, _, action = model_action.partition(":")
+    if action != "generateContent":
+        return jsonify({"error": {"code": 404, "message": f"Unsupported action {action}"}}), 404
+
+    error = _simulate("gemini", config.gemini_latency)
+    if error:
+        return error
+
+    return jsonify({
+        "candidates": [{
+            "content": {
+                "role": "model",
+                "parts": [
+                    {"text": "Stub image."},
+                    {"inlineData": {"mimeType": "image/png", "data": base64.b64encode(_png_bytes()).decode("ascii")}},
+                ],
+            },
+            "finishReason": "STOP",
+        }],
+        "modelVersion": model,
+        "usageMetadata": {"promptTokenCount": 100, "candidatesTokenCount": 1290, "totalTokenCount": 1390},
+    })
+
+
+# Anthropic
+
+@app.route("/v1/messages", methods=["POST"])
+def anthropic_messages():
+    body = request.get_json() or {}
+    error = _simulate("anthropic", config.anthropic_latency)
+    if error:
+        return error
+
+    text = _story_json()
+    message_id = f"msg_{uuid.uuid4().hex[:24]}"
+    model = body.get("model", "stub")
+    usage = {"input_tokens": 500, "output_tokens": len(text) // 4,
+             "cache_creation_input_tokens": 0, "cache_read_input_tokens": 0}
+
+    if not body.get("stream"):
+        return jsonify({
+            "id": message_id, "type": "message", "role": "assistant", "model": model,
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn", "stop_sequence": None, "usage": usage,
+        })
+
+    def event(name, data):
+        return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+    def generate():
+        yield event("message_start", {"type": "message_start", "message": {
+            "id": message_id, "type": "message", "role": "assistant", "model": model, "content": [],
+            "stop_reason": None, "stop_sequence": None, "usage": dict(usage, output_tokens=1),
+        }})
+        yield event("content_block_start", {"type": "content_block_start", "index": 0,
+                                            "content_block": {"type": "text", "text": ""}})
+        for start in range(0, len(text), config.chunk_chars):
+            time.sleep(config.chunk_delay)
+            yield event("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                                "delta": {"type": "text_delta", "text": text[start:start + config.chunk_chars]}})
+        yield event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        yield event("message_delta", {"type": "message_delta",
+                                      "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                      "usage": {"output_tokens": usage["output_tokens"]}})
+        yield event("message_stop", {"type": "message_stop"})
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream")
+
+
+# Luma
+
+def _generation_view(generation):
+    elapsed = time.time() - generation["created"]
+    view = {key: value for key, value in generation.items() if key != "fail"}
+    if elapsed < config.luma_seconds:
+        view["state"] = "queued" if elapsed < 1 else "dreaming"
+    elif generation["fail"]:
+        view["state"] = "failed"
+        view["failure_reason"] = "Simulated Luma failure"
+    else:
+        view["state"] = "completed"
+        view["assets"] = {"video": f"{request.host_url}media/{generation['id']}.mp4"}
+    return view
+
+
+@app.route("/dream-machine/v1/generations", methods=["POST"])
+def luma_create():
+    body = request.get_json() or {}
+    error = _simulate("luma")
+    if error:
+        return error
+
+    generation = {
+        "id": str(uuid.uuid4()),
+        "created": time.time(),
+        "request": body,
+        # Some generations fail late, like the real service
+        "fail": random.random() < config.error_rate,
+    }
+    with _generations_lock:
+        _generations[generation["id"]] = generation
+    return jsonify(_generation_view(generation)), 201
+
+
+@app.route("/dream-machine/v1/generations", methods=["GET"])
+def luma_list():
+    limit = int(request.args.get("limit", 10))
+    offset = int(request.args.get("offset", 0))
+    with _generations_lock:
+        generations = sorted(_generations.values(), key=lambda g: g["created"], reverse=True)
+    _count("luma_status", "ok")
+    return jsonify({"generations": [_generation_view(g) for g in generations[offset:offset + limit]]})
+
+
+@app.route("/dream-machine/v1/generations/<generation_id>", methods=["GET"])
+def luma_get(generation_id):
+    with _generations_lock:
+        generation = _generations.get(generation_id)
+    if generation is None:
+        return jsonify({"detail": "Generation not found"}), 404
+    _count("luma_status", "ok")
+    return jsonify(_generation_view(generation))
+
+
+@app.route("/media/<generation_id>.mp4", methods=["GET"])
+def luma_media(generation_id):
+    path = _ffmpeg_asset("video", [
+        "-f", "lavfi", "-i", f"testsrc=size=1280x720:rate=24:duration={config.video_seconds}",
+        "-c:v", "libx264", "-pix_fmt", "yuv420p", "-preset", "ultrafast",
+    ], ".mp4")
+    if path is None:
+        return Response(os.urandom(256 * 1024), mimetype="video/mp4")
+    # conditional=True gives ETag and Range support, which the downloader relies on
+    return send_file(path, mimetype="video/mp4", conditional=True, etag=True)
+
+
+# ElevenLabs
+
+@app.route("/v1/text-to-speech/<voice_id>", methods=["POST"])
+@app.route("/v1/text-to-speech/<voice_id>/stream", methods=["POST"])
+def elevenlabs_tts(voice_id):
+    error = _simulate("elevenlabs", config.elevenlabs_latency)
+    if error:
+        return error
+
+    path = _ffmpeg_asset("audio", [
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={config.audio_seconds}",
+        "-c:a", "libmp3lame", "-b:a", "32k",
+    ], ".mp3")
+    if path is None:
+        return Response(os.urandom(16 * 1024), mimetype="audio/mpeg")
+    with open(path, "rb") as f:
+        return Response(f.read(), mimetype="audio/mpeg")
+
+
+# Introspection
+
+@app.route("/", methods=["GET"])
+def health_check():
+    return jsonify({"status": "Provider stubs are running", "config": vars(config)})
+
+
+@app.route("/stats", methods=["GET"])
+def stats():
+    with _stats_lock:
+        return jsonify(dict(_stats))
+
+
+def main():
+    global config
+
+    parser = argparse.ArgumentParser(description="Run local stand-ins for Gemini, Anthropic, Luma and ElevenLabs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--latency", type=float, default=0.5, help="Base response latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Extra random latency up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls that fail (0-1)")
+    parser.add_argument("--gemini-latency", type=float, help="Override --latency for Gemini")
+    parser.add_argument("--anthropic-latency", type=float, help="Override --latency for Anthropic")
+    parser.add_argument("--elevenlabs-latency", type=float, help="Override --latency for ElevenLabs")
+    parser.add_argument("--luma-seconds", type=float, default=10.0, help="Time until a Luma generation completes")
+    parser.add_argument("--image-kb", type=int, default=512, help="Approximate size of generated images")
+    parser.add_argument("--video-seconds", type=int, default=5, help="Length of the served video clip")
+    parser.add_argument("--audio-seconds", type=int, default=3, help="Length of the served speech clip")
+    parser.add_argument("--scenes", type=int, default=5, help="Scenes in the generated story")
+    parser.add_argument("--characters", type=int, default=2, help="Characters in the generated story")
+    parser.add_argument("--chunk-chars", type=int, default=40, help="Characters per streamed Anthropic delta")
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="Seconds between streamed Anthropic deltas")
+    args = parser.parse_args()
+
+    config = args
+    print(f"🧪 Provider stubs on http://{args.host}:{args.port} "
+          f"(latency {args.latency}s, error rate {args.error_rate:.0%}, Luma {args.luma_seconds}s)")
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
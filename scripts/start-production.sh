@@ -0,0 +1,46 @@
+#!/bin/bash
+
+echo "🚀 Starting all backend services in production mode..."
+
+cd "$(dirname "$0")/.."
+
+# Function to cleanup on exit
+cleanup() {
+    echo "🛑 Stopping all services (waiting for in-flight requests)..."
+    kill -TERM $(jobs -p) 2>/dev/null
+    wait
+    exit 0
+}
+
+# Set trap to cleanup on script exit
+trap cleanup INT TERM
+
+# Check if .env file exists
+if [ ! -f .env ]; then
+    echo "❌ .env file not found!"
+    echo "Create a .env file with your API keys"
+    exit 1
+fi
+
+# Check if gunicorn is installed
+if ! python -c "import gunicorn" &> /dev/null; then
+    echo "❌ gunicorn is not installed"
+    echo "💡 Install it with: pip install gunicorn"
+    exit 1
+fi
+
+echo "📝 Starting Writer Service on port 5000..."
+python component/serve.py writer &
+
+echo "🖼️  Starting Image Service on port 5001..."
+python component/serve.py image &
+
+echo "🎬 Starting Video Service on port 5002..."
+python component/serve.py video &
+
+echo "👥 Starting Character Service on port 5003..."
+python component/serve.py character &
+
+echo "✅ All services started. Press Ctrl+C to stop."
+echo "💡 Tune with e.g. WRITER_THREADS=64 IMAGE_THREADS=32 VIDEO_THREADS=128"
+wait
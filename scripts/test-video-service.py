@@ -30,7 +30,8 @@ def test_video_service():
             "prompt": "A basketball player dribbling on a court",
             "imageUrl": "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8/5+hHgAHggJ/PchI7wAAAABJRU5ErkJggg==",
             "aspectRatio": "16:9",
-            "sceneNumber": 1
+            "sceneNumber": 1,
+            "wait": True
         }
         
         print("🎬 Testing video generation...")
@@ -38,7 +39,7 @@ def test_video_service():
             f"{base_url}/api/video",
             headers={"Content-Type": "application/json"},
             json=test_data,
-            timeout=30
+            timeout=330
         )
         
         if response.status_code == 200: